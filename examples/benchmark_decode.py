@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+#
+# Benchmark decoding of a (synthetic) CAN log
+#
+# compares a hand written loop around CanMatrix.decode with the
+# streaming decoder CanMatrix.iter_decode
+#
+
+import random
+import sys
+import time
+
+import canmatrix.formats
+
+usage = """
+%prog  matrix  [count]
+
+matrix can be any of *.dbc|*.dbf|*.kcd|*.arxml
+count is the number of random messages to decode (default 100000)
+"""
+
+if len(sys.argv) < 2:
+    print(usage)
+    sys.exit(1)
+
+db = canmatrix.formats.loadp_flat(sys.argv[1])
+count = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+
+# random messages of known frames
+rand = random.Random(0)
+frames = [frame for frame in db.frames if not frame.is_pdu_container]
+messages = []
+for index in range(count):
+    frame = rand.choice(frames)
+    data = bytes(rand.getrandbits(8) for _ in range(frame.size))
+    messages.append((index * 0.001, frame.arbitration_id.to_compound_integer(), data))
+
+
+def decode_loop():
+    for timestamp, can_id, data in messages:
+        arbitration_id = canmatrix.ArbitrationId.from_compound_integer(can_id)
+        frame = db.frame_by_id(arbitration_id)
+        if frame is not None and len(data) == frame.size:
+            frame.decode(data)
+
+
+def decode_stream():
+    for message in db.iter_decode(messages):
+        pass
+
+
+def decode_batches():
+    for batch in db.iter_decode_batches(messages, batch_size=10000):
+        pass
+
+
+for name, function in [("decode loop", decode_loop), ("iter_decode", decode_stream), ("iter_decode_batches", decode_batches)]:
+    start = time.perf_counter()
+    function()
+    duration = time.perf_counter() - start
+    print("{:20s} {:8.3f} s  {:10.0f} messages/s".format(name, duration, count / duration))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+#
+# Benchmark parallel decoding of a (synthetic) candump log
+#
+# decodes the same log with canmatrix.parallel.decode_parallel using
+# 1, 2, 4, ... worker processes and prints the speedup against one process
+#
+
+import multiprocessing
+import random
+import sys
+import time
+
+import canmatrix.formats
+import canmatrix.parallel
+
+usage = """
+%prog  matrix  [count]
+
+matrix can be any of *.dbc|*.dbf|*.kcd|*.arxml
+count is the number of random messages to decode (default 1000000)
+"""
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    db = canmatrix.formats.loadp_flat(sys.argv[1])
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+
+    # random messages of known frames as candump log lines
+    rand = random.Random(0)
+    frames = [frame for frame in db.frames if not frame.is_pdu_container]
+    lines = []
+    for index in range(count):
+        frame = rand.choice(frames)
+        data = bytes(rand.getrandbits(8) for _ in range(frame.size))
+        arbitration_id = frame.arbitration_id
+        can_id = "{:08X}".format(arbitration_id.id) if arbitration_id.extended else "{:03X}".format(arbitration_id.id)
+        lines.append("({:.6f}) can0 {}#{}\n".format(index * 0.001, can_id, data.hex().upper()))
+
+    processes = 1
+    reference = None
+    while processes <= multiprocessing.cpu_count():
+        start = time.perf_counter()
+        for _ in canmatrix.parallel.decode_parallel(
+                db, lines, processes=processes, parser=canmatrix.parallel.parse_candump_line,
+                formatter=canmatrix.parallel.format_decoded):
+            pass
+        duration = time.perf_counter() - start
+        reference = reference or duration
+        print("{:3d} processes {:8.3f} s  {:10.0f} messages/s  speedup {:5.2f}".format(
+            processes, duration, count / duration, reference / duration))
+        processes *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -106,6 +106,7 @@ setup(
         "json": [],
         "kcd": ["lxml"],
         "ldf": ["ldfparser"],
+        "numpy": ["numpy"],
         "odx": ["lxml"],
         "scapy": [],
         "sym": [],
@@ -121,5 +122,6 @@ setup(
     package_dir = {"": "src"},
     package_data = {"canmatrix" : ["tests/*.dbc", "tests/*.arxml", "j1939.dbc"]},
     entry_points={'console_scripts': ['cancompare = canmatrix.cli.compare:cli_compare',
-                                      'canconvert = canmatrix.cli.convert:cli_convert']}
+                                      'canconvert = canmatrix.cli.convert:cli_convert',
+                                      'candecode = canmatrix.cli.decode:cli_decode']}
 )
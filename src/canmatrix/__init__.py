@@ -13,6 +13,7 @@ from canmatrix.canmatrix import (
     Signal,
     SignalGroup,
     DecodedSignal,
+    DecodedMessage,
     ArbitrationId,
     Frame,
     Define,
@@ -25,6 +26,7 @@ from canmatrix.canmatrix import (
     MissingMuxSignal,
     DecodingComplexMultiplexed,
     DecodingFrameLength,
+    DecodingUnknownId,
     ArbitrationIdOutOfRange
 )
 
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2013, Eduard Broecker
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that
+# the following conditions are met:
+#
+#    Redistributions of source code must retain the above copyright notice, this list of conditions and the
+#    following disclaimer.
+#    Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+#    following disclaimer in the documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED
+# WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH
+# DAMAGE.
+
+# Vectorized decoding and encoding of many payloads of one frame (needs numpy)
+#
+# Every signal is extracted from all payloads at once: the bytes covered by the
+# signal are combined into an uint64 column, shifted and masked.
+# Encoding does the reverse: a column of raw values is masked, shifted and split
+# into the bytes covered by the signal.
+
+from __future__ import absolute_import, division, print_function
+
+import typing
+from builtins import *
+
+import numpy
+
+import canmatrix.canmatrix
+import canmatrix.codec
+
+
+def as_payload_array(payloads, size, stride=None, offset=0):
+    # type: (typing.Any, int, typing.Optional[int], int) -> numpy.ndarray
+    """Get a (N, size) uint8 view of the payloads.
+
+    :param payloads: (N, size) array like of uint8 or a bytes like buffer (if stride is given)
+    :param size: payload size in bytes
+    :param stride: distance of two payloads in the buffer in bytes
+    :param offset: offset of the payload inside each stride
+    :return: uint8 array with one payload per row
+    """
+    if stride is not None:
+        buffer = numpy.frombuffer(payloads, dtype=numpy.uint8)
+        count = len(buffer) // stride
+        return buffer[:count * stride].reshape(count, stride)[:, offset:offset + size]
+    return numpy.asarray(payloads, dtype=numpy.uint8)
+
+
+def extract_signal(payloads, signal):  # type: (numpy.ndarray, canmatrix.Signal) -> typing.Optional[numpy.ndarray]
+    """Extract raw values of one signal from all payloads.
+
+    :param payloads: (N, size) uint8 array
+    :param signal: signal to extract
+    :return: array of raw values or None if the signal can't be extracted vectorized
+    """
+    frame_bits = payloads.shape[1] * 8
+    if not canmatrix.codec.signal_fits(signal, frame_bits):
+        return None
+    first_byte = signal.start_bit // 8
+    last_byte = (signal.start_bit + signal.size - 1) // 8
+    if last_byte - first_byte >= 8:
+        return None
+
+    column = numpy.zeros(payloads.shape[0], dtype=numpy.uint64)
+    if signal.is_little_endian:
+        for index, byte in enumerate(range(first_byte, last_byte + 1)):
+            column |= payloads[:, byte].astype(numpy.uint64) << numpy.uint64(8 * index)
+        column >>= numpy.uint64(signal.start_bit - 8 * first_byte)
+    else:
+        for byte in range(first_byte, last_byte + 1):
+            column = (column << numpy.uint64(8)) | payloads[:, byte].astype(numpy.uint64)
+        column >>= numpy.uint64(8 * (last_byte + 1) - signal.start_bit - signal.size)
+    if signal.size < 64:
+        column &= numpy.uint64((1 << signal.size) - 1)
+
+    if signal.is_float:
+        if signal.size == 32:
+            return column.astype(numpy.uint32).view(numpy.float32)
+        return column.view(numpy.float64)
+    if signal.is_signed:
+        if signal.size == 64:
+            return column.view(numpy.int64)
+        values = column.astype(numpy.int64)
+        values -= ((column >> numpy.uint64(signal.size - 1)).astype(numpy.int64) & 1) << signal.size
+        return values
+    return column
+
+
+def decode_many(frame, payloads, physical=False, stride=None, offset=0):
+    # type: (canmatrix.Frame, typing.Any, bool, typing.Optional[int], int) -> typing.Dict[str, numpy.ndarray]
+    """Decode many payloads of one frame, see `Frame.decode_many`."""
+    if frame.is_complex_multiplexed:
+        raise canmatrix.canmatrix.DecodingComplexMultiplexed(
+            "Batch decoding of complex multiplexed frame {} not supported".format(frame.name))
+    if frame.is_pdu_container:
+        raise canmatrix.canmatrix.DecodingConatainerPdu(
+            "Batch decoding of container frame {} not supported".format(frame.name))
+
+    payloads = as_payload_array(payloads, frame.size, stride, offset)
+    if payloads.ndim != 2 or payloads.shape[1] != frame.size:
+        raise canmatrix.canmatrix.DecodingFrameLength(
+            "Received payloads with shape {} for frame {} of size {}".format(payloads.shape, frame.name, frame.size))
+
+    decoded = {}
+    fallback = []
+    for signal in frame.signals:
+        values = extract_signal(payloads, signal)
+        if values is None:
+            fallback.append(signal)
+        else:
+            decoded[signal.name] = values
+    if fallback:
+        codec = canmatrix.codec.FrameCodec(fallback, frame.size)
+        rows = [codec.unpack(bytes(payload)) for payload in payloads]
+        for index, signal in enumerate(fallback):
+            decoded[signal.name] = numpy.array([row[index] for row in rows], dtype=object)
+
+    multiplexer = frame.get_multiplexer
+    mux_values = decoded[multiplexer.name] if multiplexer is not None else None
+
+    if physical:
+        for signal in frame.signals:
+            values = decoded[signal.name]
+            if values.dtype != object:
+                values = values.astype(numpy.float64)
+            decoded[signal.name] = values * float(signal.factor) + float(signal.offset)
+
+    if multiplexer is not None:
+        for signal in frame.signals:
+            if signal.mux_val is not None:
+                decoded[signal.name] = numpy.ma.masked_array(
+                    decoded[signal.name], mask=mux_values != signal.mux_val)
+    return decoded
+
+
+def _signal_bytes(signal, frame_bits):
+    # type: (canmatrix.Signal, int) -> typing.Optional[typing.Tuple[int, int]]
+    """Get first and last byte of a signal or None if it can't be handled in an uint64 column."""
+    if not canmatrix.codec.signal_fits(signal, frame_bits):
+        return None
+    first_byte = signal.start_bit // 8
+    last_byte = (signal.start_bit + signal.size - 1) // 8
+    if last_byte - first_byte >= 8:
+        return None
+    return first_byte, last_byte
+
+
+def raw_column(signal, values, physical=False):
+    # type: (canmatrix.Signal, typing.Any, bool) -> numpy.ndarray
+    """Convert a column of values of one signal into raw values.
+
+    Physical values are scaled in float arithmetic and rounded to the nearest integer (like `Signal.phys2raw`),
+    raw values of integer signals given as float are truncated like `Frame.encode` does.
+    Value descriptions ("Init") in columns of strings or objects are looked up in `Signal.value_index`.
+
+    :param signal: signal of the column
+    :param values: sequence or array of values
+    :param bool physical: values are physical values
+    :return: float64 array for float signals, int64 or uint64 array otherwise
+    """
+    column = numpy.asarray(values)
+    named = None
+    if column.dtype.kind in "OUS":
+        index = signal.value_index
+        items = column.tolist()
+        named = numpy.array([isinstance(value, str) and value in index for value in items], dtype=bool)
+        column = numpy.array([index[value] if is_named else value for value, is_named in zip(items, named)],
+                             dtype=numpy.float64)
+    if physical:
+        scaled = (column.astype(numpy.float64) - float(signal.offset)) / float(signal.factor)
+        column = scaled if named is None else numpy.where(named, column, scaled)
+        if not signal.is_float:
+            column = numpy.rint(column)
+    if signal.is_float:
+        return column.astype(numpy.float64)
+    if column.dtype.kind == "u":
+        return column.astype(numpy.uint64)
+    if column.dtype.kind == "f":
+        column = numpy.floor(column)
+    return column.astype(numpy.int64)
+
+
+def pack_signal(payloads, signal, raw, rows=None):
+    # type: (numpy.ndarray, canmatrix.Signal, numpy.ndarray, typing.Optional[numpy.ndarray]) -> bool
+    """Write the raw values of one signal into all payloads.
+
+    Bits of the signal are overwritten, other bits are kept.
+
+    :param payloads: (N, size) uint8 array to write to
+    :param signal: signal to pack
+    :param raw: raw values as returned by `raw_column`
+    :param rows: boolean array of the rows to write, None for all rows
+    :return: False if the signal can't be packed vectorized
+    """
+    span = _signal_bytes(signal, payloads.shape[1] * 8)
+    if span is None:
+        return False
+    first_byte, last_byte = span
+
+    if signal.is_float:
+        if signal.size == 32:
+            column = raw.astype(numpy.float32).view(numpy.uint32).astype(numpy.uint64)
+        else:
+            column = raw.astype(numpy.float64).view(numpy.uint64)
+    elif raw.dtype == numpy.uint64:
+        column = raw.copy()
+    else:
+        column = raw.astype(numpy.int64).view(numpy.uint64)
+    if signal.size < 64:
+        column &= numpy.uint64((1 << signal.size) - 1)
+    mask = (1 << signal.size) - 1
+
+    if signal.is_little_endian:
+        shift = signal.start_bit - 8 * first_byte
+        positions = [(byte, 8 * index) for index, byte in enumerate(range(first_byte, last_byte + 1))]
+    else:
+        shift = 8 * (last_byte + 1) - signal.start_bit - signal.size
+        positions = [(byte, 8 * (last_byte - byte)) for byte in range(first_byte, last_byte + 1)]
+    mask <<= shift
+    for byte, byte_shift in positions:
+        byte_mask = (mask >> byte_shift) & 0xFF
+        if not byte_mask:
+            continue
+        if byte_shift >= shift:
+            bits = column >> numpy.uint64(byte_shift - shift)
+        else:
+            bits = column << numpy.uint64(shift - byte_shift)
+        bits = (bits & numpy.uint64(byte_mask)).astype(numpy.uint8)
+        updated = (payloads[:, byte] & numpy.uint8(~byte_mask & 0xFF)) | bits
+        if rows is None:
+            payloads[:, byte] = updated
+        else:
+            payloads[rows, byte] = updated[rows]
+    return True
+
+
+def encode_many(frame, values, physical=False):
+    # type: (canmatrix.Frame, typing.Mapping[str, typing.Any], bool) -> numpy.ndarray
+    """Encode many payloads of one frame, see `Frame.encode_many`."""
+    if frame.is_complex_multiplexed:
+        raise canmatrix.canmatrix.EncodingComplexMultiplexed(
+            "Batch encoding of complex multiplexed frame {} not supported".format(frame.name))
+    if frame.is_pdu_container:
+        raise canmatrix.canmatrix.EncodingConatainerPdu(
+            "Batch encoding of container frame {} not supported".format(frame.name))
+
+    raw = {}  # type: typing.Dict[str, numpy.ndarray]
+    count = None
+    for signal in frame.signals:
+        if signal.name in values and signal.name not in raw:
+            raw[signal.name] = raw_column(signal, values[signal.name], physical)
+            if count is None:
+                count = len(raw[signal.name])
+            elif len(raw[signal.name]) != count:
+                raise ValueError("Column {} has {} values instead of {}".format(
+                    signal.name, len(raw[signal.name]), count))
+    payloads = numpy.zeros((count or 0, frame.size), dtype=numpy.uint8)
+
+    # rows of every signal: all for signals not multiplexed, rows with matching multiplexer value otherwise
+    codec = frame.codec
+    multiplexer = frame.signals[codec.root_multiplexer] if codec.root_multiplexer is not None else None
+    mux_values = raw.get(multiplexer.name) if multiplexer is not None else None
+
+    def rows_of(signal):  # type: (canmatrix.Signal) -> typing.Any
+        if signal.mux_val is None:
+            return None
+        if mux_values is None:
+            return False
+        return mux_values == signal.mux_val
+
+    # big endian signals first, little endian ones take precedence (like `Frame.encode`)
+    fallback = []
+    for signal in sorted(frame.signals, key=lambda signal: bool(signal.is_little_endian)):
+        if signal.name not in raw:
+            continue
+        rows = rows_of(signal)
+        if rows is False or rows is not None and not rows.any():
+            continue
+        if not pack_signal(payloads, signal, raw[signal.name], rows):
+            fallback.append(signal)
+    if fallback:
+        for row in range(len(payloads)):
+            data = {}
+            for signal in frame.signals:
+                rows = rows_of(signal)
+                if signal.name in raw and rows is not False and (rows is None or rows[row]):
+                    data[signal.name] = raw[signal.name][row].item()
+            payloads[row] = numpy.frombuffer(bytes(frame.signals_to_bytes(data)), dtype=numpy.uint8)
+    return payloads
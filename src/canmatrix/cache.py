@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2013, Eduard Broecker
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that
+# the following conditions are met:
+#
+#    Redistributions of source code must retain the above copyright notice, this list of conditions and the
+#    following disclaimer.
+#    Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+#    following disclaimer in the documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED
+# WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH
+# DAMAGE.
+
+
+# Persistent on disk cache for data derived from the package (e.g. parsed bundled databases)
+#
+# The cache directory is $CANMATRIX_CACHE_DIR or the canmatrix folder in the user cache directory.
+# Entries are pickled, written atomically and keyed by the package version, so a new
+# canmatrix release never reads entries of an older one.
+# The cache is best effort: any error reading or writing an entry just means a cache miss.
+
+from __future__ import absolute_import, division, print_function
+
+import glob
+import logging
+import os
+import pickle
+import tempfile
+import typing
+from builtins import *
+
+import canmatrix
+
+logger = logging.getLogger(__name__)
+
+
+def cache_dir():  # type: () -> str
+    """Get the cache directory (not created)."""
+    directory = os.environ.get("CANMATRIX_CACHE_DIR")
+    if directory:
+        return directory
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "canmatrix")
+
+
+def cache_path(name):  # type: (str) -> str
+    """Get the file of the cache entry name for the installed canmatrix version."""
+    version = canmatrix.__version__.replace("+", "_").replace(os.sep, "_")
+    return os.path.join(cache_dir(), "{}-{}.pickle".format(name, version))
+
+
+def load(name, touch=False):  # type: (str, bool) -> typing.Any
+    """Load the cache entry name.
+
+    :param str name: entry name
+    :param bool touch: update the modification time of the entry (for `prune`)
+    :return: cached object or None if there is no (usable) entry
+    """
+    path = cache_path(name)
+    try:
+        with open(path, "rb") as cache_file:
+            value = pickle.load(cache_file)
+        if touch:
+            os.utime(path)
+        return value
+    except FileNotFoundError:
+        return None
+    except Exception as error:
+        logger.debug("Ignoring cache entry %s: %s", name, error)
+        return None
+
+
+def store(name, value):  # type: (str, typing.Any) -> bool
+    """Store the cache entry name.
+
+    :param str name: entry name
+    :param value: picklable object
+    :return: True if the entry was written
+    """
+    path = cache_path(name)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as cache_file:
+                pickle.dump(value, cache_file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+    except Exception as error:
+        logger.debug("Can't write cache entry %s: %s", name, error)
+        return False
+    return True
+
+
+def entries(prefix):  # type: (str) -> typing.List[str]
+    """Get the names of all entries of the installed canmatrix version starting with prefix."""
+    pattern = os.path.basename(cache_path(glob.escape(prefix) + "*"))
+    suffix = pattern[pattern.index("*") + 1:]
+    return sorted(
+        os.path.basename(path)[:-len(suffix)]
+        for path in glob.glob(os.path.join(glob.escape(cache_dir()), pattern))
+    )
+
+
+def remove(name):  # type: (str) -> None
+    """Remove the cache entry name (if it exists)."""
+    try:
+        os.remove(cache_path(name))
+    except OSError:
+        pass
+
+
+def evict(prefix, keep=()):  # type: (str, typing.Container[str]) -> None
+    """Remove all entries starting with prefix except the ones in keep."""
+    for name in entries(prefix):
+        if name not in keep:
+            remove(name)
+
+
+def prune(prefix, max_entries):  # type: (str, int) -> None
+    """Remove the least recently used entries starting with prefix, so at most max_entries are left."""
+    names = entries(prefix)
+    if len(names) <= max_entries:
+        return
+
+    def last_use(name):  # type: (str) -> float
+        try:
+            return os.path.getmtime(cache_path(name))
+        except OSError:
+            return 0.0
+
+    for name in sorted(names, key=last_use)[:len(names) - max_entries]:
+        remove(name)
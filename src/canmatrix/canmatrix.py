@@ -28,6 +28,7 @@
 
 import decimal
 import fnmatch
+import hashlib
 import itertools
 import logging
 import math
@@ -40,6 +41,8 @@ from builtins import *
 import attr
 from itertools import zip_longest
 
+import canmatrix.cache
+import canmatrix.codec
 import canmatrix.copy
 import canmatrix.types
 import canmatrix.utils
@@ -54,6 +57,12 @@ if version("attrs") < '17.4.0':
 
 logger = logging.getLogger(__name__)
 defaultFloatFactory = decimal.Decimal  # type: typing.Callable[[typing.Any], canmatrix.types.PhysicalValue]
+# incremented on every change of any Signal, compiled frame codecs are rebuilt if it differs
+_signal_generation = 0
+# incremented if an ArbitrationId or the id of a Frame changes, frame indexes are rebuilt if it differs
+_arbitration_id_generation = 0
+# running canmatrix.profiling.Profiler or None, see `canmatrix.profiling.enable`
+_profiler = None  # type: typing.Any
 
 
 class ExceptionTemplate(Exception):
@@ -70,6 +79,8 @@ class ArbitrationIdOutOfRange(ExceptionTemplate): pass
 class J1939NeedsExtendedIdentifier(ExceptionTemplate): pass
 class DecodingConatainerPdu(ExceptionTemplate): pass
 class EncodingConatainerPdu(ExceptionTemplate): pass
+class EncodingValueOutOfRange(ExceptionTemplate): pass
+class DecodingUnknownId(ExceptionTemplate): pass
 
 
 def arbitration_id_converter(source):  # type: (typing.Union[int, ArbitrationId]) -> ArbitrationId
@@ -217,6 +228,49 @@ class Signal(object):
     def __attrs_post_init__(self):
         self.multiplex = self.multiplex_setter(self.multiplex)
 
+    # scale with float arithmetic instead of decimal, see `CanMatrix.set_float_scaling`
+    float_scaling = False  # type: bool
+    # (signal generation, float factor, offset, min, max), cache for float scaling
+    _float_scaling_cache = None  # type: typing.Optional[typing.Tuple[typing.Any, ...]]
+    # (values, len(values), inverse value table), cache of `value_index`
+    _value_index_cache = None  # type: typing.Optional[typing.Tuple[typing.Any, ...]]
+
+    def __setattr__(self, name, value):
+        global _signal_generation
+        _signal_generation += 1
+        object.__setattr__(self, name, value)
+
+    def __getstate__(self):
+        # float scaling cache and value index are caches only, don't copy/pickle/dump them
+        state = self.__dict__.copy()
+        state.pop("_float_scaling_cache", None)
+        state.pop("_value_index_cache", None)
+        return state
+
+    def _float_scaling_values(self):  # type: () -> typing.Tuple[typing.Any, ...]
+        cache = self._float_scaling_cache
+        if cache is None or cache[0] != _signal_generation:
+            cache = (_signal_generation,) + tuple(
+                None if value is None else float(value) for value in (self.factor, self.offset, self.min, self.max))
+            object.__setattr__(self, "_float_scaling_cache", cache)
+        return cache
+
+    @property
+    def value_index(self):  # type: () -> typing.Mapping[str, int]
+        """Inverse value table: value description -> raw value.
+
+        For descriptions used more than once the first raw value is returned, like the linear search did.
+        The index is built on first use and rebuilt if `values` is replaced or entries are added.
+        """
+        cache = self._value_index_cache
+        values = self.values
+        if cache is None or cache[0] is not values or cache[1] != len(values):
+            index = {}  # type: typing.Dict[str, int]
+            for value_key, value_string in values.items():
+                index.setdefault(value_string, value_key)
+            cache = (values, len(values), index)
+            object.__setattr__(self, "_value_index_cache", cache)
+        return cache[2]
 
     @property
     def spn(self):  # type: () -> typing.Optional[int]
@@ -326,6 +380,7 @@ class Signal(object):
             self.values[value.to_integral()] = valueName
         else:
             self.values[int(str(value), 0)] = valueName
+        object.__setattr__(self, "_value_index_cache", None)
 
     def set_startbit(self, start_bit, bitNumbering=None, startLittle=None):
         """
@@ -429,7 +484,7 @@ class Signal(object):
 
         :param value: (scaled) value compatible with `decimal` or value choice to encode
         :return: raw unscaled value as it appears on the bus
-        :rtype: int or decimal.Decimal
+        :rtype: int or decimal.Decimal (float with `float_scaling`)
         """
         if value is None:
             value = self.initial_value
@@ -437,10 +492,19 @@ class Signal(object):
                 value = self.min
 
         if isinstance(value, str) and self.values:
-            for value_key, value_string in self.values.items():
-                if value_string == value:
-                    value = value_key
-                    return value
+            raw_value = self.value_index.get(value)
+            if raw_value is not None:
+                return raw_value
+
+        if self.float_scaling:
+            _, factor, offset, minimum, maximum = self._float_scaling_values()
+            value = float(value)
+            if not (minimum <= value <= maximum):
+                logger.warning("Value %s is not valid for %s. Min=%s and Max=%s", value, self, self.min, self.max)
+            raw_value = (value - offset) / factor
+            if not self.is_float:
+                raw_value = int(round(raw_value))
+            return raw_value
 
         try:
             value = decimal.Decimal(value)
@@ -449,10 +513,7 @@ class Signal(object):
 
         # if not (0 <= value <= 10):
         if not (self.min <= value <= self.max):
-            logger.warning(
-                "Value {} is not valid for {}. Min={} and Max={}".format(
-                    value, self, self.min, self.max)
-                )
+            logger.warning("Value %s is not valid for %s. Min=%s and Max=%s", value, self, self.min, self.max)
         raw_value = (self.float_factory(value) - self.float_factory(self.offset)) / self.float_factory(self.factor)
 
         if not self.is_float:
@@ -466,21 +527,61 @@ class Signal(object):
 
         :param value: raw value compatible with `decimal`.
         :param bool decode_to_str: If True, try to get value representation as *string* ('Init' etc.)
-        :return: physical value (scaled)
+        :return: physical value (scaled), float with `float_scaling`
         """
+        if self.float_scaling:
+            if decode_to_str and self.values:
+                value_string = self.values.get(value)
+                if value_string is not None:
+                    return value_string
+            _, factor, offset, _, _ = self._float_scaling_values()
+            return value * factor + offset
+
         if self.is_float:
             value = self.float_factory(value)
 
-        if decode_to_str:
-            for value_key, value_string in self.values.items():
-                if value_key == value:
-                    return value_string
-                    break
+        if decode_to_str and self.values:
+            value_string = self.values.get(value)
+            if value_string is not None:
+                return value_string
 
         result = value * self.factor + self.offset  # type: typing.Union[canmatrix.types.PhysicalValue, str]
 
         return result
 
+    def phys2raw_many(self, values):
+        # type: (typing.Iterable[typing.Any]) -> typing.List[canmatrix.types.RawValue]
+        """Convert a column of values, e.g. value descriptions ("Init") as read from a table.
+
+        Value descriptions are looked up in `value_index`, all other values are converted with `phys2raw`.
+
+        :param values: iterable of value descriptions or physical values
+        :return: list of raw values
+        """
+        index = self.value_index
+        phys2raw = self.phys2raw
+        converted = []
+        for value in values:
+            raw_value = index.get(value) if isinstance(value, str) else None
+            converted.append(phys2raw(value) if raw_value is None else raw_value)
+        return converted
+
+    def raw2phys_many(self, values, decode_to_str=False):
+        # type: (typing.Iterable[canmatrix.types.RawValue], bool) -> typing.List[typing.Union[canmatrix.types.PhysicalValue, str]]
+        """Convert a column of raw values, see `raw2phys`.
+
+        :param values: iterable of raw values
+        :param bool decode_to_str: If True, return the value description ('Init' etc.) for values in the value table
+        :return: list of physical values or value descriptions
+        """
+        table = self.values if decode_to_str else None
+        raw2phys = self.raw2phys
+        converted = []
+        for value in values:
+            value_string = table.get(value) if table else None
+            converted.append(raw2phys(value) if value_string is None else value_string)
+        return converted
+
     def __str__(self):  # type: () -> str
         return self.name
 
@@ -566,6 +667,23 @@ class DecodedSignal(object):
         return self.signal.raw2phys(self.raw_value, decode_to_str=True)
 
 
+@attr.s
+class DecodedMessage(object):
+    """
+    Contains a decoded message of a stream (see CanMatrix.iter_decode)
+
+    * timestamp: timestamp as given in the stream
+    * arbitration_id: arbitration id as given in the stream
+    * frame: the Frame used for decoding, None for unknown ids
+    * signals: dictionary with Signal Name: DecodedSignal (or plain value, see mode of iter_decode),
+      None if the message was not decoded
+    """
+    timestamp = attr.ib()  # type: typing.Any
+    arbitration_id = attr.ib()  # type: typing.Union[int, ArbitrationId]
+    frame = attr.ib()  # type: typing.Optional[Frame]
+    signals = attr.ib()  # type: typing.Optional[typing.Mapping[str, typing.Any]]
+
+
 # https://docs.python.org/3/library/itertools.html
 def grouper(iterable, n, fillvalue=None):
     """Collect data into fixed-length chunks or blocks."""
@@ -653,6 +771,13 @@ class ArbitrationId(object):
         if self.id != self.id & mask:
             raise ArbitrationIdOutOfRange('ID out of range')
 
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            # changed after creation, the id may be part of a frame index
+            global _arbitration_id_generation
+            _arbitration_id_generation += 1
+        object.__setattr__(self, name, value)
+
     @property
     def j1939_pgn(self):
         return self.pgn
@@ -768,6 +893,20 @@ class ArbitrationId(object):
             id = (pgn << 8), extended = True
         )
 
+    @staticmethod
+    def normalize_pgn(pgn):  # type: (int) -> int
+        """Get the PGN as returned by `pgn` of an id with the given PGN.
+
+        Same as ``ArbitrationId.from_pgn(pgn).pgn``: for PDU1 PGNs (PF < 240) the destination address is removed.
+
+        :param int pgn: pgn
+        :rtype: int
+        """
+        pgn &= 0x3FFFF
+        if (pgn >> 8) & 0xFF < 240:
+            pgn &= 0x3FF00
+        return pgn
+
     def to_compound_integer(self):
         if self.extended:
             return self.id | self.compound_extended_mask
@@ -836,6 +975,13 @@ class Pdu(object):
     signalGroups = attr.ib(factory=list)  # type: typing.MutableSequence[SignalGroup]
     cycle_time = attr.ib(default=0)  # type: int
 
+    def __setattr__(self, name, value):
+        if name in ("id", "signals"):
+            # the PDU layout may be compiled into the codec of a container frame
+            global _signal_generation
+            _signal_generation += 1
+        object.__setattr__(self, name, value)
+
     def add_signal(self, signal):
         # type: (Signal) -> Signal
         """
@@ -939,6 +1085,50 @@ class Frame(object):
 
     secOC_properties = attr.ib(default=None)  # type:  Optional[AutosarSecOCProperties]
 
+    _codec = None  # type: typing.Optional[canmatrix.codec.FrameCodec]
+    _container_codec = None  # type: typing.Optional[canmatrix.codec.ContainerCodec]
+
+    def __setattr__(self, name, value):
+        if name in ("arbitration_id", "is_j1939") and name in self.__dict__:
+            global _arbitration_id_generation
+            _arbitration_id_generation += 1
+        object.__setattr__(self, name, value)
+
+    def __getstate__(self):
+        # compiled codecs are caches only, don't copy/pickle/dump them
+        state = self.__dict__.copy()
+        state.pop("_codec", None)
+        state.pop("_container_codec", None)
+        return state
+
+    @property
+    def codec(self):  # type: () -> canmatrix.codec.FrameCodec
+        """Compiled codec for the signals of this frame.
+
+        The codec is cached and rebuilt automatically if signals, any signal attribute, the frame size
+        or the multiplexing type changed.
+        """
+        codec = self._codec
+        if codec is None or codec.generation != _signal_generation or codec.size != self.size \
+                or codec.complex_multiplexed != self.is_complex_multiplexed or codec.signals != self.signals:
+            codec = self._codec = canmatrix.codec.FrameCodec(
+                self.signals, self.size, _signal_generation, self.is_complex_multiplexed)
+        return codec
+
+    @property
+    def container_codec(self):  # type: () -> canmatrix.codec.ContainerCodec
+        """Compiled codec for the headers and contained PDUs of this container frame.
+
+        The codec is cached and rebuilt automatically if signals, PDUs, any signal or PDU attribute
+        or the frame size changed.
+        """
+        codec = self._container_codec
+        if codec is None or codec.generation != _signal_generation or codec.size != self.size \
+                or codec.signals != self.signals or codec.pdus != self.pdus:
+            codec = self._container_codec = canmatrix.codec.ContainerCodec(
+                self.signals, self.pdus, self.size, _signal_generation)
+        return codec
+
     @property
     def is_multiplexed(self):  # type: () -> bool
         """Frame is multiplexed if at least one of its signals is a multiplexer."""
@@ -1334,9 +1524,7 @@ class Frame(object):
         :param data: data dictionary of signal : rawValue
         :return: A byte string of the packed values.
         """
-
-        little_bits = [None] * (self.size * 8)  # type: typing.List[typing.Optional[str]]
-        big_bits = list(little_bits)
+        raw_data = {}
         for signal in self.signals:
             if signal.name in data:
                 value = data.get(signal.name)
@@ -1345,6 +1533,21 @@ class Frame(object):
                     if value is None:
                         # TODO Error Handling
                         value = 0
+                raw_data[signal.name] = value
+
+        codec = self.codec
+        if codec.can_pack:
+            return codec.pack(raw_data)
+        return self._signals_to_bytes_bitstring(raw_data)
+
+    def _signals_to_bytes_bitstring(self, data):
+        # type: (typing.Mapping[str, canmatrix.types.RawValue]) -> bytes
+        """Pack raw values using bit lists, used for signals not fitting into the frame."""
+        little_bits = [None] * (self.size * 8)  # type: typing.List[typing.Optional[str]]
+        big_bits = list(little_bits)
+        for signal in self.signals:
+            if signal.name in data:
+                value = data[signal.name]
                 bits = pack_bitstring(signal.size, signal.is_float, value, signal.is_signed)
 
                 if signal.is_little_endian:
@@ -1369,42 +1572,108 @@ class Frame(object):
             for b in grouper(bitstring, 8)
         )
 
+    def _container_raw_data(self, data):
+        # type: (typing.Any) -> typing.List[typing.Tuple[str, typing.Dict[str, canmatrix.types.RawValue]]]
+        """Convert {pdu name: {signal name: value}} or [(pdu name, {signal name: value})] to raw values."""
+        items = data.items() if isinstance(data, typing.Mapping) else data
+        contained = []
+        codec = self.container_codec
+        for pdu_name, values in items:
+            pdu = codec.pdu_by_name.get(pdu_name)
+            if pdu is not None and any(isinstance(value, str) for value in values.values()):
+                values = dict(values)
+                for signal in pdu.signals:
+                    if isinstance(values.get(signal.name), str):
+                        value = signal.phys2raw(values[signal.name])
+                        values[signal.name] = 0 if value is None else value
+            contained.append((pdu_name, values))
+        return contained
+
     def encode(self, data=None):
         # type: (typing.Optional[typing.Mapping[str, typing.Any]]) -> bytes
         """Return a byte string containing the values from data packed
         according to the frame format.
 
+        Container frames take a dictionary {PDU name: {signal name: value}} (or a list of
+        (PDU name, {signal name: value}) to send a PDU more than once); the PDUs are packed
+        with their headers in the given order.
+
         :param dict data: data dictionary
         :return: A byte string of the packed values.
         """
 
         data = dict() if data is None else data
-        if self.is_complex_multiplexed:
-            raise EncodingComplexMultiplexed
-        elif self.is_pdu_container:
-            raise EncodingConatainerPdu  # TODO add encoding
-        elif self.is_multiplexed:
-            # search for mulitplexer-signal
-            for signal in self.signals:
-                if signal.is_multiplexer:
-                    muxSignal = signal
-                    muxVal = data.get(signal.name)
-                    break
-            else:
-                raise MissingMuxSignal
-            # create list of signals which belong to muxgroup
-            encodeSignals = [muxSignal.name]
-            for signal in self.signals:
-                if signal.mux_val == muxVal or signal.mux_val is None:
-                    encodeSignals.append(signal.name)
-            newData = dict()
-            # kick out signals, which do not belong to this mux-id
-            for signalName in data:
-                if signalName in encodeSignals:
-                    newData[signalName] = data[signalName]
-            data = newData
+        if self.is_pdu_container:
+            return self.container_codec.pack(self._container_raw_data(data))
+        elif self.is_multiplexed or self.is_complex_multiplexed:
+            def multiplexer_value(index):  # type: (int) -> typing.Optional[canmatrix.types.RawValue]
+                signal = self.signals[index]
+                value = data.get(signal.name)
+                if isinstance(value, str):
+                    value = signal.phys2raw(value)
+                return value
+
+            # kick out signals, which do not belong to the selected mux-ids
+            selected = {self.signals[index].name for index in self.codec.select(multiplexer_value)}
+            data = {name: value for name, value in data.items() if name in selected}
         return self.signals_to_bytes(data)
 
+    def encode_values(self, data, mode="phys", range_policy="clamp", violations=None):
+        # type: (typing.Mapping[str, typing.Any], str, str, typing.Optional[typing.MutableMapping[str, int]]) -> bytearray
+        """Encode physical (or raw) values with a range policy instead of per value warnings.
+
+        Counterpart of `decode_values` for generating many messages: values are converted with the
+        compiled encoder of the frame, physical values in int or float arithmetic (not as decimal.Decimal
+        like `Signal.phys2raw`). Values out of the signal range are handled by range_policy and never logged:
+        "clamp" to the nearest limit, "raise" `EncodingValueOutOfRange`, "ignore" (no check) or
+        "count" (keep the value). Limits are precomputed raw values of `Signal.min` and `Signal.max`,
+        restricted to the range the signal size can hold for integer signals.
+
+        :param dict data: dictionary of signal name : value, value descriptions ("Init") are allowed
+        :param str mode: "phys" (physical values) or "raw" (raw values)
+        :param str range_policy: "clamp", "raise", "ignore" or "count"
+        :param violations: counters signal name -> number of values out of range (e.g. collections.Counter),
+            updated for "clamp" and "count"
+        :return: A byte string of the packed values.
+        """
+        if mode not in (canmatrix.codec.RAW, canmatrix.codec.PHYS):
+            raise ValueError("Unknown encoding mode {}".format(mode))
+        if range_policy not in canmatrix.codec.RANGE_POLICIES:
+            raise ValueError("Unknown range policy {}".format(range_policy))
+        if self.is_pdu_container:
+            raise EncodingConatainerPdu(
+                "Encoding values of container frame {} not supported, use encode".format(self.name))
+        codec = self.codec
+        raw_data = codec.to_raw(data, mode, range_policy, violations)
+        if self.is_multiplexed or self.is_complex_multiplexed:
+            signals = self.signals
+            selected = {signals[index].name for index in codec.select(lambda index: raw_data.get(signals[index].name))}
+            raw_data = {name: value for name, value in raw_data.items() if name in selected}
+        if codec.can_pack:
+            return codec.pack(raw_data)
+        return self._signals_to_bytes_bitstring(raw_data)
+
+    def encode_into(self, buffer, data=None, offset=0):
+        # type: (bytearray, typing.Optional[typing.Mapping[str, typing.Any]], int) -> bytearray
+        """Encode like `encode`, but write the payload into buffer[offset:offset + size].
+
+        Container frames are packed directly into the buffer, so many payloads can be
+        written into one preallocated buffer.
+
+        :param buffer: writable buffer, e.g. bytearray
+        :param dict data: data dictionary, see `encode`
+        :param int offset: offset of the payload in buffer
+        :return: buffer
+        """
+        if self.is_pdu_container:
+            return self.container_codec.pack(self._container_raw_data({} if data is None else data), buffer, offset)
+        if len(buffer) < offset + self.size:
+            raise ValueError(
+                "Buffer of {} bytes too small for payload of {} bytes at offset {}".format(
+                    len(buffer), self.size, offset))
+        buffer[offset:offset + self.size] = self.encode(data)
+        return buffer
+
     @staticmethod
     def bytes_to_bitstrings(data):
         # type: (bytes) -> typing.Tuple[str, str]
@@ -1448,95 +1717,117 @@ class Frame(object):
 
         return unpacked
 
+    def _unpack_container_bitstrings(self, data, codec):
+        # type: (bytes, canmatrix.codec.ContainerCodec) -> typing.Dict[str, typing.Any]
+        """Decode a container frame whose headers are not byte aligned using bit strings."""
+        header_id_signal, header_dlc_signal = codec.header_signals
+        # TODO: may be we need to check that ID/DLC signals are contiguous
+        header_size = header_id_signal.size + header_dlc_signal.size
+        little, big = self.bytes_to_bitstrings(data)
+        size = self.size * 8
+        return_dict = dict({"pdus": []})  # type: typing.Dict[str, typing.Any]
+        # decode signal which are not in PDUs
+        signals = codec.static_signals
+        if signals:
+            unpacked = self.bitstring_to_signal_list(signals, big, little, size)
+            for s, v in zip(signals, unpacked):
+                return_dict[s.name] = DecodedSignal(v, s)
+        # decode PDUs
+        offset = header_id_signal.start_bit
+        header_signals = [header_id_signal, header_dlc_signal]
+        while (offset + header_size) < size:
+            unpacked = self.bitstring_to_signal_list(
+                header_signals,
+                big[offset:offset + header_size],
+                little[size - offset - header_size:size - offset],
+                header_size
+            )
+            offset += header_size
+            pdu_id = unpacked[0]
+            pdu_dlc = unpacked[1]
+            for s, v in zip(header_signals, unpacked):
+                if s.name not in return_dict:
+                    return_dict[s.name] = []
+                return_dict[s.name].append(DecodedSignal(v, s))
+            pdu = codec.pdu_by_id.get(pdu_id)
+            if pdu is None:
+                return_dict['pdus'].append(None)
+            else:
+                unpacked = self.bitstring_to_signal_list(
+                    pdu.signals,
+                    big[offset:offset + pdu_dlc * 8],
+                    little[size - offset - pdu_dlc * 8:size - offset],
+                    pdu_dlc * 8
+                )
+                pdu_dict = dict()
+                for s, v in zip(pdu.signals, unpacked):
+                    pdu_dict[s.name] = DecodedSignal(v, s)
+                return_dict["pdus"].append({pdu.name: pdu_dict})
+            offset += (pdu_dlc * 8)
+        return return_dict
+
     def unpack(self, data: bytes,
                allow_truncated: bool = False,
                allow_exceeded: bool = False,
+               offset: int = 0,
+               length: typing.Optional[int] = None,
                ) -> typing.Mapping[str, DecodedSignal]:
         """Return OrderedDictionary with Signal Name: object decodedSignal (flat / without support for multiplexed frames)
         decodes every signal in signal-list.
 
-        :param data: bytearray
+        :param data: bytearray or any other bytes like object (memoryview, mmap, ...)
             i.e. bytearray([0xA1, 0xA2, 0xA3, 0xA4, 0xA5, 0xA6, 0xA7, 0xA8])
-        :param report_error: set to False to silence error output
+        :param allow_truncated: decode payloads shorter than the frame, padded with 0xFF
+        :param allow_exceeded: decode payloads longer than the frame, truncated to the frame size
+        :param offset: offset of the payload in data, the payload is read without copying
+        :param length: length of the payload, None for the rest of data
         :return: OrderedDictionary
         """
 
-        rx_length = len(data)
+        rx_length = len(data) - offset if length is None else length
         if rx_length != self.size:
             msg_id = self.arbitration_id.id if self.arbitration_id.id != 0 else self.header_id
 
             logging.warning(f"Received message 0x{msg_id:08X} with length {rx_length}, expected {self.size}")
 
-            if allow_truncated:
-                # pad the data with 0xff to prevent the codec from
-                # raising an exception.
-                data = data.ljust(self.size, b"\xFF")
-
-            if allow_exceeded:
-                # trim the payload data to match the expected size
-                data = data[:self.size]
-
-            if len(data) != self.size:
+            if not (allow_truncated and rx_length < self.size or allow_exceeded and rx_length > self.size):
                 # return None
                 raise DecodingFrameLength(
                     f"Received message 0x{msg_id:04X} with wrong data size: {rx_length} instead of {self.size}")
 
         if self.is_pdu_container:
-            header_id_signal = self.signal_by_name("Header_ID")
-            header_dlc_signal = self.signal_by_name("Header_DLC")
-            if header_id_signal is None or header_dlc_signal is None:
+            codec = self.container_codec
+            if codec.header_signals is None:
                 raise DecodingConatainerPdu(
                     'Received message 0x{:08X} without Header_ID or '
                     'Header_DLC signal'.format(self.arbitration_id.id)
                 )
-            # TODO: may be we need to check that ID/DLC signals are contiguous
-            header_size = header_id_signal.size + header_dlc_signal.size
-            little, big = self.bytes_to_bitstrings(data)
-            size = self.size * 8
-            return_dict = dict({"pdus": []})
-            # decode signal which are not in PDUs
-            signals = [s for s in self.signals if s not in [header_id_signal, header_dlc_signal]]
-            if signals:
-                unpacked = self.bitstring_to_signal_list(signals, big, little, size)
-                for s, v in zip(signals, unpacked):
-                    return_dict[s.name] = DecodedSignal(v, s)
-            # decode PDUs
-            offset = header_id_signal.start_bit
-            header_signals = [header_id_signal, header_dlc_signal]
-            while (offset + header_size) < size:
-                unpacked = self.bitstring_to_signal_list(
-                    header_signals,
-                    big[offset:offset + header_size],
-                    little[size - offset - header_size:size - offset],
-                    header_size
-                )
-                offset += header_size
-                pdu_id = unpacked[0]
-                pdu_dlc = unpacked[1]
-                for s, v in zip(header_signals, unpacked):
-                    if s.name not in return_dict:
-                        return_dict[s.name] = []
-                    return_dict[s.name].append(DecodedSignal(v, s))
-                pdu = self.pdu_by_id(pdu_id)
+            if rx_length != self.size or len(data) - offset < self.size:
+                # padded with 0xFF or truncated to the frame size
+                data = bytes(memoryview(data)[offset:offset + rx_length])[:self.size].ljust(self.size, b"\xFF")
+                offset = 0
+            if not codec.byte_aligned:
+                return self._unpack_container_bitstrings(data[offset:offset + self.size], codec)
+
+            static, contained = codec.unpack(data, offset)
+            return_dict = dict({"pdus": []})  # type: typing.Dict[str, typing.Any]
+            for s, v in zip(codec.static_signals, static):
+                return_dict[s.name] = DecodedSignal(v, s)
+            if contained:
+                header_id_signal, header_dlc_signal = codec.header_signals
+                return_dict.setdefault(header_id_signal.name, [])
+                return_dict.setdefault(header_dlc_signal.name, [])
+            for pdu_id, pdu_dlc, pdu, values in contained:
+                return_dict[header_id_signal.name].append(DecodedSignal(pdu_id, header_id_signal))
+                return_dict[header_dlc_signal.name].append(DecodedSignal(pdu_dlc, header_dlc_signal))
                 if pdu is None:
-                    return_dict['pdus'].append(None)
+                    return_dict["pdus"].append(None)
                 else:
-                    unpacked = self.bitstring_to_signal_list(
-                        pdu.signals,
-                        big[offset:offset + pdu_dlc * 8],
-                        little[size - offset - pdu_dlc * 8:size - offset],
-                        pdu_dlc * 8
-                    )
-                    pdu_dict = dict()
-                    for s, v in zip(pdu.signals, unpacked):
-                        pdu_dict[s.name] = DecodedSignal(v, s)
-                    return_dict["pdus"].append({pdu.name: pdu_dict})
-                offset += (pdu_dlc * 8)
+                    return_dict["pdus"].append(
+                        {pdu.name: {s.name: DecodedSignal(v, s) for s, v in zip(pdu.signals, values)}})
             return return_dict
         else:
-            little, big = self.bytes_to_bitstrings(data)
-
-            unpacked = self.bitstring_to_signal_list(self.signals, big, little, self.size * 8)
+            unpacked = self.codec.unpack(data, offset, rx_length)
 
             return_dict = dict()
 
@@ -1545,84 +1836,102 @@ class Frame(object):
 
             return return_dict
 
-    def _get_sub_multiplexer(self, parent_multiplexer_name, parent_multiplexer_value):
-        """
-        get any sub-multiplexer in frame used
-        for complex-multiplexed frame decoding
-
-        :param parent_multiplexer_name: string with name of parent multiplexer
-        :param parent_multiplexer_value: raw_value (int) of parent multiplexer
-        :return: muxer signal or None
-        """
-        for signal in self.signals:
-            if signal.is_multiplexer and signal.muxer_for_signal == parent_multiplexer_name and signal.multiplexer_value_in_range(parent_multiplexer_value):
-                return signal
-
-    def _filter_signals_for_multiplexer(self, multiplexer_name, multiplexer_value):
-        """
-        filter a list of signals with given multiplexer (name and value)
-        used for complex-multiplexed frame decoding
-
-
-        :param multiplexer_name: string with name of parent multiplexer
-        :param multiplexer_value: raw_value (int) of parent multiplexer
-        :return: filtered array of canmatrix.Signal
-        """
-        filtered_signals = []
-        for signal in self.signals:
-            if signal.multiplexer_value_in_range(multiplexer_value) and signal.muxer_for_signal == multiplexer_name and not signal.is_multiplexer:
-                filtered_signals.append(signal)
-            elif signal.name == multiplexer_name:
-                filtered_signals.append(signal)
-        return filtered_signals
-
-    def decode(self, data):
-        # type: (bytes) -> typing.Mapping[str, typing.Any]
+    def decode(self, data, offset=0, length=None, allow_truncated=False, allow_exceeded=False):
+        # type: (bytes, int, typing.Optional[int], bool, bool) -> typing.Mapping[str, typing.Any]
         """Return OrderedDictionary with Signal Name: object decodedSignal (support for multiplexed frames)
         decodes only signals matching to muxgroup
 
-        :param data: bytearray .
+        :param data: bytearray or any other bytes like object (memoryview, mmap, ...)
             i.e. bytearray([0xA1, 0xA2, 0xA3, 0xA4, 0xA5, 0xA6, 0xA7, 0xA8])
+        :param offset: offset of the payload in data, the payload is read without copying
+        :param length: length of the payload, None for the rest of data
+        :param allow_truncated: decode payloads shorter than the frame, padded with 0xFF
+        :param allow_exceeded: decode payloads longer than the frame, truncated to the frame size
         :return: OrderedDictionary
         """
-        decoded = self.unpack(data)
-
-        if self.is_complex_multiplexed:
-            decoded_values = dict()
-            filtered_signals = self._filter_signals_for_multiplexer(None, None)
-
-            multiplex_name = None
-            multiplex_value = None
-
-            sub_multiplexer = self._get_sub_multiplexer(multiplex_name, multiplex_value)
-            while sub_multiplexer is not None:
-                multiplex_name = sub_multiplexer.name
-                multiplex_signal = decoded_values[multiplex_name] = decoded[multiplex_name]
-                multiplex_value = multiplex_signal.raw_value
-                filtered_signals += self._filter_signals_for_multiplexer(multiplex_name, multiplex_value)
-
-                sub_multiplexer = self._get_sub_multiplexer(multiplex_name, multiplex_value)
-
-            for signal in filtered_signals:
-                decoded_values[signal.name] = decoded[signal.name]
-            return decoded_values
+        if length is None:
+            length = len(data) - offset
+        if self.is_pdu_container or length < self.size and not allow_truncated \
+                or length > self.size and not allow_exceeded:
+            return self.unpack(data, allow_truncated, allow_exceeded, offset, length)
 
-        elif self.is_multiplexed and not self.is_pdu_container:
-            decoded_values = dict()
-            # find multiplexer and decode only its value:
+        # decode only the multiplexers and the signals selected by them
+        selected, unpacked = self.codec.unpack_selected(data, offset, length)
+        signals = self.signals
+        return {signals[index].name: DecodedSignal(value, signals[index]) for index, value in zip(selected, unpacked)}
 
-            for signal in self.signals:
-                if signal.is_multiplexer:
-                    muxVal = decoded[signal.name].raw_value
+    def decode_values(self, data, mode="phys", as_tuple=False, offset=0, length=None,
+                      allow_truncated=False, allow_exceeded=False):
+        # type: (bytes, str, bool, int, typing.Optional[int], bool, bool) -> typing.Union[typing.Dict[str, typing.Any], typing.Tuple[typing.Any, ...]]
+        """Decode a payload into plain values (support for multiplexed frames).
 
-            # find all signals with the identified multiplexer-value
-            for signal in self.signals:
-                if signal.mux_val == muxVal or signal.mux_val is None:
-                    decoded_values[signal.name] = decoded[signal.name]
-            return decoded_values
+        Lightweight alternative to `decode` which doesn't create DecodedSignal objects.
+        Physical values are computed as raw * factor + offset in int arithmetic if factor and offset
+        are integral and in float arithmetic otherwise (not as decimal.Decimal like `DecodedSignal.phys_value`).
 
-        else:
-            return decoded
+        :param data: bytearray or any other bytes like object (memoryview, mmap, ...)
+            i.e. bytearray([0xA1, 0xA2, 0xA3, 0xA4, 0xA5, 0xA6, 0xA7, 0xA8])
+        :param str mode: "raw", "phys" (physical values) or "named" (value table entry, physical value if there is none)
+        :param bool as_tuple: return a tuple of values in order of `signals` instead of a dictionary,
+            signals not decoded (other multiplexer value) are None
+        :param offset: offset of the payload in data, the payload is read without copying
+        :param length: length of the payload, None for the rest of data
+        :param allow_truncated: decode payloads shorter than the frame, padded with 0xFF
+        :param allow_exceeded: decode payloads longer than the frame, truncated to the frame size
+        :return: dictionary with Signal Name: value (same order like `decode`) or tuple of values
+        """
+        if mode not in (canmatrix.codec.RAW, canmatrix.codec.PHYS, canmatrix.codec.NAMED):
+            raise ValueError("Unknown decoding mode {}".format(mode))
+        if self.is_pdu_container:
+            raise DecodingConatainerPdu(
+                "Decoding values of container frame {} not supported, use decode".format(self.name))
+        if length is None:
+            length = len(data) - offset
+        if length < self.size and not allow_truncated or length > self.size and not allow_exceeded:
+            raise DecodingFrameLength(
+                "Received message {} with wrong data size: {} instead of {}".format(self.name, length, self.size))
+
+        codec = self.codec
+        selected, unpacked = codec.unpack_selected(data, offset, length)
+        values = codec.convert(unpacked, mode, selected)
+
+        if as_tuple:
+            ordered = [None] * len(self.signals)  # type: typing.List[typing.Any]
+            for index, value in zip(selected, values):
+                ordered[index] = value
+            return tuple(ordered)
+        signals = self.signals
+        return {signals[index].name: value for index, value in zip(selected, values)}
+
+    def decode_many(self, payloads, physical=False, stride=None, offset=0):
+        # type: (typing.Any, bool, typing.Optional[int], int) -> typing.Mapping[str, typing.Any]
+        """Decode many payloads of this frame at once (needs numpy).
+
+        Signals of a multiplexed frame are returned as numpy masked arrays, masked where
+        the multiplexer value doesn't match the signal.
+
+        :param payloads: numpy array (N, frame size) of uint8 or, if stride is given, a bytes like buffer
+        :param bool physical: return physical values (factor and offset applied) as float instead of raw values
+        :param stride: distance of two payloads in the buffer in bytes
+        :param offset: offset of the payload inside each stride
+        :return: dictionary with Signal Name: numpy array of values
+        """
+        import canmatrix.batch
+        return canmatrix.batch.decode_many(self, payloads, physical=physical, stride=stride, offset=offset)
+
+    def encode_many(self, values, physical=False):
+        # type: (typing.Mapping[str, typing.Any], bool) -> typing.Any
+        """Encode many payloads of this frame at once (needs numpy).
+
+        Signals missing in values are left zero. For multiplexed frames the column of the multiplexer
+        selects per row which multiplexed signals are packed, like `encode` does for a single message.
+
+        :param values: dictionary with Signal Name: sequence or numpy array of N values
+        :param bool physical: values are physical values (scaled and rounded in float arithmetic) instead of raw values
+        :return: numpy array (N, frame size) of uint8, one payload per row
+        """
+        import canmatrix.batch
+        return canmatrix.batch.encode_many(self, values, physical=physical)
 
     def _compress_little(self):
         for signal in self.signals:
@@ -1753,6 +2062,44 @@ class Define(object):
             return
         self.definition = 'ENUM "' + '","' .join(self.values) +'"'
 
+class FrameIndex(object):
+    """
+    Hash index of a list of frames by arbitration id, J1939 PGN and J1939 (PGN, source address).
+
+    The index keeps the first frame for every key like the linear search does.
+    Use `CanMatrix.frame_index` which keeps the index up to date.
+    """
+
+    def __init__(self, frames):  # type: (typing.Sequence[Frame]) -> None
+        self.frames = frames
+        self.generation = _arbitration_id_generation
+        self.count = 0
+        self.last_frame = None  # type: typing.Optional[Frame]
+        self.by_id = {}  # type: typing.Dict[typing.Tuple[int, bool], Frame]
+        self.by_pgn = {}  # type: typing.Dict[int, Frame]
+        self.by_pgn_source = {}  # type: typing.Dict[typing.Tuple[int, int], Frame]
+        self.exact = True  # False if any frame has an undefined extended flag
+        self.contains_j1939 = False
+        self.extend(frames)
+
+    def extend(self, frames):  # type: (typing.Iterable[Frame]) -> None
+        """Add frames appended to the indexed list."""
+        for frame in frames:
+            arbitration_id = frame.arbitration_id
+            if arbitration_id.extended is None:
+                self.exact = False
+            else:
+                self.by_id.setdefault((arbitration_id.id, bool(arbitration_id.extended)), frame)
+            if arbitration_id.extended:
+                pgn = arbitration_id.pgn
+                self.by_pgn.setdefault(pgn, frame)
+                self.by_pgn_source.setdefault((pgn, arbitration_id.id & 0xFF), frame)
+            if frame.is_j1939:
+                self.contains_j1939 = True
+            self.count += 1
+            self.last_frame = frame
+
+
 import enum
 
 
@@ -1796,10 +2143,118 @@ class CanMatrix(object):
     vlan = attr.ib(default=None)  # type:int
     load_errors = attr.ib(factory=list)  # type: typing.MutableSequence[Exception]
 
+    _frame_index = None  # type: typing.Optional[FrameIndex]
+
+    def __getstate__(self):
+        # frame index is a cache only, don't copy/pickle/dump it
+        state = self.__dict__.copy()
+        state.pop("_frame_index", None)
+        return state
+
     def __iter__(self):  # type: () -> typing.Iterator[Frame]
         """Matrix iterates over Frames (Messages)."""
         return iter(self.frames)
 
+    @property
+    def frame_index(self):  # type: () -> FrameIndex
+        """Index of all frames by arbitration id and PGN.
+
+        Frames appended to `frames` are added on the next access, the index is rebuilt if
+        frames were removed or any arbitration id changed.
+        """
+        index = self._frame_index
+        frames = self.frames
+        if index is None or index.frames is not frames or index.generation != _arbitration_id_generation \
+                or len(frames) < index.count:
+            index = self._frame_index = FrameIndex(frames)
+        elif len(frames) > index.count:
+            if index.count == 0 or frames[index.count - 1] is index.last_frame:
+                index.extend(frames[index.count:])
+            else:
+                index = self._frame_index = FrameIndex(frames)
+        return index
+
+    def fingerprint(self):  # type: () -> str
+        """Content hash of everything the frame codecs are compiled from.
+
+        Covers the frames (name, arbitration id, size, multiplexing type), the layout of their signals
+        (position, size, byte order, type, scaling, limits, multiplexing) and of their PDUs.
+        Comments, attributes, ecus and defines are not part of the fingerprint.
+
+        :return: hex digest
+        """
+        digest = hashlib.sha256()
+
+        def add_signals(signals):  # type: (typing.Sequence[Signal]) -> None
+            for signal in signals:
+                digest.update(repr((
+                    signal.name, signal.start_bit, signal.size, signal.is_little_endian, signal.is_signed,
+                    signal.is_float, str(signal.factor), str(signal.offset), str(signal.min), str(signal.max),
+                    signal.is_multiplexer, signal.mux_val, signal.muxer_for_signal, signal.mux_val_grp,
+                )).encode("utf-8"))
+
+        for frame in self.frames:
+            digest.update(repr((
+                "frame", frame.name, frame.arbitration_id.id, frame.arbitration_id.extended, frame.size,
+                frame.is_complex_multiplexed, len(frame.signals), len(frame.pdus),
+            )).encode("utf-8"))
+            add_signals(frame.signals)
+            for pdu in frame.pdus:
+                digest.update(repr(("pdu", pdu.name, pdu.id, pdu.size, len(pdu.signals))).encode("utf-8"))
+                add_signals(pdu.signals)
+        return digest.hexdigest()
+
+    def compile_codecs(self, persist=True, source=None, max_entries=32):
+        # type: (bool, typing.Optional[str], int) -> bool
+        """Compile the codecs of all frames (see `Frame.codec`).
+
+        With persist the compiled plans are kept in the on disk cache (see `canmatrix.cache`) under the
+        `fingerprint` of the matrix, so other processes (restarts, workers) load them instead of compiling.
+        If source (e.g. the path of the database) is given, entries of older versions of the same source
+        are removed when a new entry is stored. Besides that only the max_entries least recently used
+        entries are kept.
+        Computing the fingerprint is not free, compiling the codecs is usually faster than loading them,
+        so persist is only worth it where compiling is expensive.
+
+        :param bool persist: use the on disk cache
+        :param source: name of the database the matrix was loaded from
+        :param int max_entries: maximum number of cached entries
+        :return: True if the codecs were loaded from the cache
+        """
+        if not persist:
+            for frame in self.frames:
+                frame.codec.precompile()
+            return False
+        prefix = "codecs-"
+        if source is not None:
+            prefix += hashlib.sha256(source.encode("utf-8")).hexdigest()[:16] + "-"
+        name = prefix + self.fingerprint()
+        plans = canmatrix.cache.load(name, touch=True)
+        if isinstance(plans, list) and len(plans) == len(self.frames):
+            try:
+                codecs = [
+                    canmatrix.codec.FrameCodec.from_plan(frame.signals, plan, _signal_generation)
+                    for frame, plan in zip(self.frames, plans)
+                ]
+            except (ValueError, TypeError, KeyError, IndexError):
+                logger.warning("Ignoring unusable codec cache entry %s", name)
+            else:
+                for frame, codec in zip(self.frames, codecs):
+                    if codec.size == frame.size and codec.complex_multiplexed == frame.is_complex_multiplexed:
+                        frame._codec = codec
+                return True
+
+        plans = []
+        for frame in self.frames:
+            codec = frame.codec
+            codec.precompile()
+            plans.append(codec.export_plan())
+        if source is not None:
+            canmatrix.cache.evict(prefix)
+        if canmatrix.cache.store(name, plans):
+            canmatrix.cache.prune("codecs-", max_entries)
+        return False
+
     def add_env_var(self, name, envVarDict):  # type: (str, typing.MutableMapping) -> None
         self.env_vars[name] = envVarDict
 
@@ -1820,10 +2275,7 @@ class CanMatrix(object):
     @property
     def contains_j1939(self):  # type: () -> bool
         """Check whether the Matrix contains any J1939 Frame."""
-        for frame in self.frames:
-            if frame.is_j1939:
-                return True
-        return False
+        return self.frame_index.contains_j1939
 
     def attribute(self, attributeName, default=None):  # type(str, typing.Any) -> typing.Any
         """Return custom Matrix attribute by name.
@@ -1974,6 +2426,9 @@ class CanMatrix(object):
         :param ArbitrationId arbitration_id: Frame id as canmatrix.ArbitrationId
         :rtype: Frame or None
         """
+        index = self.frame_index
+        if index.exact and arbitration_id.extended is not None:
+            return index.by_id.get((arbitration_id.id, bool(arbitration_id.extended)))
         for test in self.frames:
             if test.arbitration_id == arbitration_id:
                 # found ID while ignoring extended or standard
@@ -2001,19 +2456,21 @@ class CanMatrix(object):
 
         return self.frames_dict_id[id]
 
-    def frame_by_pgn(self, pgn):  # type: (int) -> typing.Union[Frame, None]
+    def frame_by_pgn(self, pgn, source=None):  # type: (int, typing.Optional[int]) -> typing.Union[Frame, None]
         """Get Frame by pgn (j1939).
 
         :param int pgn: pgn to search for
+        :param int source: source address, if given a frame sent from this address is preferred
         :rtype: Frame or None
         """
-
-        for test in self.frames:
-            if test.arbitration_id.pgn == canmatrix.ArbitrationId.from_pgn(pgn).pgn:
-                # canmatrix.ArbitrationId.from_pgn(pgn).pgn instead
-                # of just pgn is needed to do the pf >= 240 check
-                return test
-        return None
+        # the normalized pgn is needed to do the pf >= 240 check
+        pgn = ArbitrationId.normalize_pgn(pgn)
+        index = self.frame_index
+        if source is not None:
+            frame = index.by_pgn_source.get((pgn, source))
+            if frame is not None:
+                return frame
+        return index.by_pgn.get(pgn)
 
     def frame_by_name(self, name):  # type: (str) -> typing.Union[Frame, None]
         """Get Frame by name.
@@ -2094,6 +2551,12 @@ class CanMatrix(object):
         :param Frame frame: frame to remove from CAN Matrix
         """
         self.frames.remove(frame)
+        self._frame_index = None
+        if self.frames_dict_name.get(frame.name) is frame:
+            del self.frames_dict_name[frame.name]
+        for frame_id in [frame.header_id, frame.arbitration_id.id]:
+            if frame_id is not None and self.frames_dict_id.get(frame_id) is frame:
+                del self.frames_dict_id[frame_id]
 
     def add_signal(self, signal):  # type: (Signal) -> Signal
         """
@@ -2224,6 +2687,7 @@ class CanMatrix(object):
         """
         old_name = frame_or_name.name if isinstance(frame_or_name, Frame) else frame_or_name
         for frame in self.frames:
+            name_before = frame.name
             if old_name[-1] == '*':
                 old_prefix_len = len(old_name)-1
                 if frame.name[:old_prefix_len] == old_name[:-1]:
@@ -2234,6 +2698,9 @@ class CanMatrix(object):
                     frame.name = frame.name[:-old_suffix_len] + new_name
             elif frame.name == old_name:
                 frame.name = new_name
+            if frame.name != name_before and self.frames_dict_name.get(name_before) is frame:
+                del self.frames_dict_name[name_before]
+                self.frames_dict_name[frame.name] = frame
 
     def del_frame(self, frame_or_name):  # type: (typing.Union[Frame, str]) -> None
         """Delete Frame from Matrix.
@@ -2241,7 +2708,7 @@ class CanMatrix(object):
         :param Frame or str frame_or_name: Frame or name to delete"""
         frame = frame_or_name if isinstance(frame_or_name, Frame) else self.frame_by_name(frame_or_name)
         if frame:
-            self.frames.remove(frame)
+            self.remove_frame(frame)
 
     def rename_signal(self, signal_or_name, new_name):  # type: (typing.Union[Signal, str], str) -> None
         """Rename Signal.
@@ -2400,17 +2867,187 @@ class CanMatrix(object):
         :return: OrderedDictionary
         """
         if not self.contains_j1939:
-            return self.frame_by_id(frame_id).decode(data)
+            frame = self.frame_by_id(frame_id)
+            if frame is None and _profiler is not None:
+                _profiler.record_unknown_id(frame_id)
+            return frame.decode(data)
+        frame = self.frame_for_decode(frame_id)
+        if frame:
+            return frame.decode(data)
+        else:
+            if _profiler is not None:
+                _profiler.record_unknown_id(frame_id)
+            return {}
+
+    def frame_for_decode(self, frame_id):  # type: (ArbitrationId) -> typing.Union[Frame, None]
+        """Get the Frame used to decode a message with the given id.
+
+        Like `frame_by_id`, but for J1939 matrices extended ids are also looked up by PGN and
+        standard ids are ignored.
+
+        :param ArbitrationId frame_id: received arbitration id
+        :rtype: Frame or None
+        """
+        if not self.contains_j1939:
+            return self.frame_by_id(frame_id)
         elif frame_id.extended:
             frame = self.frame_by_id(frame_id)
             if frame is None:
-                frame = self.frame_by_pgn(frame_id.pgn)
-            if frame:
-                return frame.decode(data)
-            else:
-                return {}
+                frame = self.frame_by_pgn(frame_id.pgn, frame_id.id & 0xFF)
+            return frame
         else:
-            return {}
+            return None
+
+    def iter_decode(self, messages, frames=None, signals=None, unknown_id="skip", wrong_length="skip", mode=None):
+        # type: (typing.Iterable[typing.Tuple[typing.Any, typing.Union[int, ArbitrationId], bytes]], typing.Optional[typing.Collection[str]], typing.Optional[typing.Collection[str]], typing.Any, typing.Any, typing.Optional[str]) -> typing.Iterator[DecodedMessage]
+        """Decode a stream of raw messages lazily.
+
+        Messages are decoded one by one while iterating, so arbitrary long logs can be decoded in constant memory.
+
+        :param messages: iterable of (timestamp, arbitration id, data). The arbitration id is an ArbitrationId
+            or a compound integer (bit 31 set for extended ids, see `ArbitrationId.from_compound_integer`).
+            data is a bytes like object or a tuple (buffer, offset, length) to decode a payload inside a
+            larger buffer (e.g. a mmap of a trace file) without copying it.
+        :param frames: names of frames to decode, messages of other frames are skipped. None decodes all frames.
+        :param signals: names of signals to return. None returns all signals.
+        :param unknown_id: what to do with messages without frame: "skip" them, "yield" them
+            with frame None, "raise" DecodingUnknownId or a callable(timestamp, arbitration_id, data)
+            which result is yielded unless it is None
+        :param wrong_length: what to do with messages which length doesn't match the frame size: "skip" them,
+            "yield" them with signals None, "raise" DecodingFrameLength, "pad" them (with 0xFF) or truncate them
+            or a callable(timestamp, frame, data) returning the data to decode or None to skip the message
+        :param mode: None to decode into DecodedSignal objects or "raw", "phys" or "named" to decode into
+            plain values, see `Frame.decode_values`
+        :return: generator of DecodedMessage
+        """
+        frame_cache = {}  # type: typing.Dict[int, typing.Tuple[typing.Optional[Frame], bool]]
+        index = None
+        index_count = 0
+        for timestamp, arbitration_id, data in messages:
+            current_index = self.frame_index
+            if current_index is not index or index.count != index_count:
+                # frames were added, removed or changed
+                index = current_index
+                index_count = index.count
+                frame_cache.clear()
+            key = arbitration_id if isinstance(arbitration_id, int) else arbitration_id.to_compound_integer()
+            try:
+                frame, wanted = frame_cache[key]
+            except KeyError:
+                frame = self.frame_for_decode(ArbitrationId.from_compound_integer(key))
+                wanted = frame is not None and (frames is None or frame.name in frames)
+                frame_cache[key] = frame, wanted
+
+            if frame is None:
+                if _profiler is not None:
+                    _profiler.record_unknown_id(key)
+                if unknown_id == "skip":
+                    continue
+                elif unknown_id == "yield":
+                    yield DecodedMessage(timestamp, arbitration_id, None, None)
+                elif unknown_id == "raise":
+                    raise DecodingUnknownId("Received message with unknown id 0x{:08X}".format(key))
+                else:
+                    result = unknown_id(timestamp, arbitration_id, data)
+                    if result is not None:
+                        yield result
+                continue
+            if not wanted:
+                continue
+
+            if isinstance(data, tuple):
+                buffer, offset, length = data
+            else:
+                buffer, offset, length = data, 0, len(data)
+            pad = False
+            if length != frame.size:
+                if _profiler is not None and wrong_length != "pad":
+                    _profiler.record_error(frame, "DecodingFrameLength", length)
+                if wrong_length == "skip":
+                    continue
+                elif wrong_length == "yield":
+                    yield DecodedMessage(timestamp, arbitration_id, frame, None)
+                    continue
+                elif wrong_length == "raise":
+                    raise DecodingFrameLength(
+                        "Received message {} with wrong data size: {} instead of {}".format(
+                            frame.name, length, frame.size))
+                elif wrong_length == "pad":
+                    pad = True
+                else:
+                    data = wrong_length(timestamp, frame, data)
+                    if data is None:
+                        continue
+                    buffer, offset, length = data, 0, len(data)
+
+            if mode is None:
+                decoded = frame.decode(buffer, offset, length, pad, pad)
+            else:
+                decoded = frame.decode_values(buffer, mode, False, offset, length, pad, pad)
+            if signals is not None:
+                decoded = {name: value for name, value in decoded.items() if name in signals}
+            yield DecodedMessage(timestamp, arbitration_id, frame, decoded)
+
+    def iter_decode_batches(self, messages, batch_size=1000, physical=False, **options):
+        # type: (typing.Iterable[typing.Tuple[typing.Any, typing.Union[int, ArbitrationId], bytes]], int, bool, **typing.Any) -> typing.Iterator[typing.Dict[str, typing.Dict[str, typing.List[typing.Any]]]]
+        """Decode a stream of raw messages lazily into columnar batches.
+
+        Every batch contains up to batch_size decoded messages as dictionary with
+        Frame Name: {"timestamp": [...], Signal Name: [...]}.
+        Signals not decoded in a message (other multiplexer value) are None.
+
+        :param messages: iterable of (timestamp, arbitration id, data), see `iter_decode`
+        :param int batch_size: maximal number of messages per batch
+        :param bool physical: collect physical values instead of raw values
+        :param options: frames, signals, unknown_id and wrong_length, see `iter_decode`
+        :return: generator of batches
+        """
+        decoded_messages = (
+            message for message in self.iter_decode(messages, **options)
+            if isinstance(message, DecodedMessage) and message.signals is not None
+        )
+        while True:
+            batch = {}  # type: typing.Dict[str, typing.Dict[str, typing.List[typing.Any]]]
+            for message in itertools.islice(decoded_messages, batch_size):
+                columns = batch.get(message.frame.name)
+                if columns is None:
+                    columns = batch[message.frame.name] = {"timestamp": []}
+                    for signal in message.frame.signals:
+                        if options.get("signals") is None or signal.name in options["signals"]:
+                            columns[signal.name] = []
+                columns["timestamp"].append(message.timestamp)
+                for name, column in columns.items():
+                    if name == "timestamp":
+                        continue
+                    value = message.signals.get(name)
+                    if value is not None:
+                        value = value.phys_value if physical else value.raw_value
+                    column.append(value)
+            if not batch:
+                return
+            yield batch
+
+    def set_float_scaling(self, enabled=True):  # type: (bool) -> None
+        """Scale all signals of the matrix in float arithmetic.
+
+        Factor, offset, min and max stay as loaded (decimal.Decimal by default), so exported
+        files are not changed. Only `Signal.raw2phys` and `Signal.phys2raw` (and so decode and encode)
+        compute in native float arithmetic, which is much faster.
+
+        Precision: physical values are float (IEEE 754 double), with a relative error of about 1e-16 per
+        operation compared to decimal scaling. Raw values of integer signals are rounded like in decimal
+        mode; they can differ by one only if the physical value is (close to) exactly between two raw values.
+
+        Signals added later keep their own setting, set `Signal.float_scaling` for them.
+
+        :param bool enabled: True for float scaling, False for decimal scaling
+        """
+        for frame in self.frames:
+            for signal in frame.signals:
+                signal.float_scaling = enabled
+            for pdu in frame.pdus:
+                for signal in pdu.signals:
+                    signal.float_scaling = enabled
 
     def enum_attribs_to_values(self):  # type: () -> None
         for define in self.ecu_defines:
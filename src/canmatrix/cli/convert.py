@@ -97,6 +97,9 @@ Example --signalNameFromAttrib SysSignalName\nARXML known Attributes: SysSignalN
 @click.option('--arxmlExportVersion', 'arVersion',  default="3.2.3", help="Set output AUTOSAR version\ncurrently only 3.2.3 and 4.1.0 are supported\ndefault 3.2.3")
 @click.option('--arxmlFlexray/--no-arxmlFlexray', 'decode_flexray', default = False, help="EXPERIMENTAL: import basic flexray data from ARXML")
 @click.option('--arxmlEthernet/--no-arxmlEthernet', 'decode_ethernet', default = False, help="EXPERIMENTAL: import basic ethernet data from ARXML")
+@click.option('--arxmlStreaming/--no-arxmlStreaming', 'arxmlStreaming', default=False, help="Parse only the parts of the arxml needed for the imported clusters (for huge system descriptions)\ndefault False")
+@click.option('--arxmlClusters', 'arxmlClusters', multiple=True, help="Short name or path of a cluster to import with --arxmlStreaming, can be given multiple times\ndefault all clusters")
+@click.option('--arxmlProcesses', 'arxmlProcesses', type=int, default=0, help="Decode the arxml clusters in this many worker processes\ndefault 0 (no worker processes)")
 
 
 # dbc switches
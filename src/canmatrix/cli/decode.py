@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2013, Eduard Broecker
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that
+# the following conditions are met:
+#
+#    Redistributions of source code must retain the above copyright notice, this list of conditions and the
+#    following disclaimer.
+#    Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+#    following disclaimer in the documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED
+# WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH
+# DAMAGE.
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import sys
+import typing
+from builtins import *
+
+import click
+
+logger = logging.getLogger(__name__)
+
+
+@click.command()
+@click.option('-v', '--verbose', 'verbosity', help="Output verbosity", count=True, default=1)
+@click.option('-s', '--silent', is_flag=True, default=False, help="don't print status messages to stdout. (only errors)")
+@click.option('-j', '--jobs', default=0, help="number of worker processes\ndefault number of CPUs")
+@click.option('--chunkSize', 'chunk_size', default=10000, help="number of log lines decoded by a worker at once\ndefault 10000")
+@click.option('-p', '--physical', is_flag=True, default=False, help="print physical instead of raw values")
+@click.option('--frames', default="", help="comma separated list of frames to decode\ndefault all frames")
+@click.option('-o', '--output', default="-", help="output file\ndefault stdout")
+@click.argument('matrix', required=True)
+@click.argument('logfile', required=True)
+def cli_decode(matrix, logfile, verbosity, silent, jobs, chunk_size, physical, frames, output):
+    """
+        canmatrix.cli.decode [options] matrix logfile
+
+        matrix can be any of *.dbc|*.dbf|*.kcd|*.arxml|*.xls(x)|*.sym
+        logfile is a candump log file (candump -l), - reads from stdin
+    """
+
+    import canmatrix.log
+    root_logger = canmatrix.log.setup_logger()
+
+    if silent:
+        # Only print ERROR messages (ignore import warnings)
+        verbosity = -1
+    canmatrix.log.set_log_level(root_logger, verbosity)
+
+    # import only after setting log level, to also disable warning messages in silent mode.
+    import canmatrix.formats
+    import canmatrix.parallel
+
+    logger.info("Importing " + matrix + " ... ")
+    db = canmatrix.formats.loadp_flat(matrix)
+    logger.info("%d Frames found" % (db.frames.__len__()))
+
+    options = {}  # type: typing.Dict[str, typing.Any]
+    if frames:
+        options["frames"] = frames.split(",")
+
+    with click.open_file(logfile) as infile, click.open_file(output, "w") as outfile:
+        for line in canmatrix.parallel.decode_parallel(
+                db, infile, processes=jobs or None, chunk_size=chunk_size, physical=physical,
+                parser=canmatrix.parallel.parse_candump_line, formatter=canmatrix.parallel.format_decoded, **options):
+            outfile.write(line)
+    return 0
+
+
+# to be run as module `python -m canmatrix.cli.decode`, NOT as script with argument `canmatrix/cli/decode.py`
+if __name__ == '__main__':
+    sys.exit(cli_decode())
@@ -0,0 +1,744 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2013, Eduard Broecker
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that
+# the following conditions are met:
+#
+#    Redistributions of source code must retain the above copyright notice, this list of conditions and the
+#    following disclaimer.
+#    Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+#    following disclaimer in the documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED
+# WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH
+# DAMAGE.
+
+# Compiled frame codecs
+#
+# The signal layout of a frame (start_bit, size, byte order, signedness, float)
+# is translated once into integer shift/mask plans. Decoding a payload then only
+# needs int.from_bytes and some integer operations per signal instead of
+# building and slicing bit strings.
+
+from __future__ import absolute_import, division, print_function
+
+import decimal
+import math
+import struct
+import typing
+from builtins import *
+
+import canmatrix.canmatrix
+
+# plan kinds
+INTEGER = 0
+FLOAT = 1
+BITSTRING = 2  # signal does not fit the shift/mask scheme, decode like the bitstring implementation
+
+# lightweight decoding modes, see `Frame.decode_values`
+RAW = "raw"
+PHYS = "phys"
+NAMED = "named"
+
+# range policies of `FrameCodec.to_raw`, see `Frame.encode_values`
+CLAMP = "clamp"
+RAISE = "raise"
+IGNORE = "ignore"
+COUNT = "count"
+RANGE_POLICIES = (CLAMP, RAISE, IGNORE, COUNT)
+
+_float_formats = {
+    32: struct.Struct('>f'),
+    64: struct.Struct('>d'),
+}
+
+
+def signal_fits(signal, frame_bits):  # type: (canmatrix.Signal, int) -> bool
+    """Check whether the signal can be decoded with a shift/mask plan.
+
+    :param signal: signal to check
+    :param frame_bits: length of the payload in bits
+    :return: True if the signal is completely located inside the payload
+    """
+    if not isinstance(signal.start_bit, int) or not isinstance(signal.size, int):
+        return False
+    if signal.size <= 0 or signal.start_bit < 0:
+        return False
+    if signal.is_float and signal.size not in _float_formats:
+        return False
+    return signal.start_bit + signal.size <= frame_bits
+
+
+def compile_signal(signal, frame_bits):
+    # type: (canmatrix.Signal, int) -> typing.Tuple[int, bool, int, int, int, typing.Any]
+    """Compile the decoding plan of one signal.
+
+    The plan is a tuple (kind, is_little_endian, shift, mask, sign_bit, extra).
+    For INTEGER plans sign_bit is 0 for unsigned signals, for FLOAT plans
+    extra is the struct used for conversion, for BITSTRING plans extra is the signal itself.
+
+    :param signal: signal to compile
+    :param frame_bits: length of the payload in bits
+    :return: decoding plan
+    """
+    if not signal_fits(signal, frame_bits):
+        return BITSTRING, signal.is_little_endian, 0, 0, 0, signal
+
+    if signal.is_little_endian:
+        shift = signal.start_bit
+    else:
+        shift = frame_bits - signal.start_bit - signal.size
+    mask = (1 << signal.size) - 1
+
+    if signal.is_float:
+        return FLOAT, signal.is_little_endian, shift, mask, 0, _float_formats[signal.size]
+    sign_bit = 1 << (signal.size - 1) if signal.is_signed else 0
+    return INTEGER, signal.is_little_endian, shift, mask, sign_bit, None
+
+
+def compile_conversion(signal):
+    # type: (canmatrix.Signal) -> typing.Tuple[typing.Union[int, float], typing.Union[int, float], typing.Mapping[int, str]]
+    """Compile the physical conversion of one signal.
+
+    The conversion is a tuple (factor, offset, values). Factor and offset are int if they
+    are integral (so integer signals are scaled exactly) and float otherwise.
+    values is the value table of the signal itself (not a copy), so it follows `Signal.add_values`.
+
+    :param signal: signal to compile
+    :return: conversion
+    """
+    factor = signal.factor
+    offset = signal.offset
+    if signal.is_float or factor != int(factor) or offset != int(offset):
+        return float(factor), float(offset), signal.values
+    return int(factor), int(offset), signal.values
+
+
+def compile_encoding(signal):
+    # type: (canmatrix.Signal) -> typing.Tuple[typing.Union[int, float], typing.Union[int, float], typing.Any, typing.Any, bool]
+    """Compile the physical to raw conversion of one signal.
+
+    The encoding is a tuple (factor, offset, raw minimum, raw maximum, is_float). Factor and offset are
+    int if they are integral and float otherwise. The raw limits correspond to the physical limits
+    `Signal.min` and `Signal.max`; for integer signals they are rounded inwards and restricted to
+    the values representable with the signal size. A limit is None if there is none.
+
+    :param signal: signal to compile
+    :return: encoding
+    """
+    factor = decimal.Decimal(signal.factor)
+    offset = decimal.Decimal(signal.offset)
+    limits = [None if limit is None else (decimal.Decimal(limit) - offset) / factor for limit in (signal.min, signal.max)]
+    if factor < 0:
+        limits.reverse()
+    low, high = limits
+    if signal.is_float:
+        low = None if low is None else float(low)
+        high = None if high is None else float(high)
+        factor, offset = float(factor), float(offset)
+        return factor, offset, low, high, True
+
+    if signal.is_signed:
+        type_low, type_high = -(1 << (signal.size - 1)), (1 << (signal.size - 1)) - 1
+    else:
+        type_low, type_high = 0, (1 << signal.size) - 1
+    low = type_low if low is None else max(type_low, int(math.ceil(low)))
+    high = type_high if high is None else min(type_high, int(math.floor(high)))
+    if factor == int(factor) and offset == int(offset):
+        return int(factor), int(offset), low, high, False
+    return float(factor), float(offset), low, high, False
+
+
+def unpack_signal_bitstring(signal, data, frame_bits):
+    # type: (canmatrix.Signal, typing.Iterable[int], int) -> canmatrix.types.RawValue
+    """Decode a single signal the same way the bitstring implementation does.
+
+    Used for signals which do not fit into the payload, so error behaviour stays unchanged.
+    """
+    little, big = canmatrix.canmatrix.Frame.bytes_to_bitstrings(data)
+    return canmatrix.canmatrix.Frame.bitstring_to_signal_list([signal], big, little, frame_bits)[0]
+
+
+class FrameCodec(object):
+    """
+    Compiled decoder for a fixed list of signals in a payload of fixed size.
+
+    Besides the shift/mask plans the codec contains the multiplexer tree of the signals:
+    which signals are always decoded, which multiplexer is evaluated first and a dispatch table
+    multiplexer value -> selected signals and sub multiplexer.
+
+    The codec does not track changes of the signals, see `Frame.codec` for invalidation.
+    """
+
+    def __init__(self, signals, size, generation=None, complex_multiplexed=False):
+        # type: (typing.Sequence[canmatrix.Signal], int, typing.Optional[int], bool) -> None
+        """
+        :param signals: signals to decode
+        :param size: payload size in bytes
+        :param generation: signal generation the codec was built for
+        :param complex_multiplexed: signals use complex multiplexing (nested multiplexers, value ranges)
+        """
+        self.signals = list(signals)
+        self.size = size
+        self.generation = generation
+        self.complex_multiplexed = complex_multiplexed
+        frame_bits = size * 8
+        self.plans = [compile_signal(signal, frame_bits) for signal in self.signals]
+        self.needs_little = any(plan[1] for plan in self.plans)
+        self.needs_big = not all(plan[1] for plan in self.plans)
+        self._compile_multiplexing()
+        self._conversions = None  # type: typing.Optional[typing.List[typing.Tuple[typing.Any, typing.Any, typing.Mapping[int, str]]]]
+        self._encodings = None  # type: typing.Optional[typing.Dict[str, typing.Tuple[canmatrix.Signal, typing.Tuple[typing.Any, ...]]]]
+
+    def precompile(self):  # type: () -> None
+        """Compile the dispatch table entries of all multiplexer values used by the signals."""
+        for multiplexer in self.multiplexers:
+            name = self.signals[multiplexer].name
+            for signal in self.signals:
+                if signal.mux_val is None:
+                    continue
+                if self.complex_multiplexed and signal.muxer_for_signal != name:
+                    continue
+                if not self.complex_multiplexed and multiplexer != self.root_multiplexer:
+                    continue
+                self.dispatch(multiplexer, signal.mux_val)
+
+    def export_plan(self):  # type: () -> typing.Tuple[typing.Any, ...]
+        """Get the compiled plans and multiplexer tree as plain data (picklable without the signals).
+
+        Dispatch table entries compiled so far are included. See `from_plan`.
+        """
+        plans = [
+            (kind, is_little_endian, shift, mask, sign_bit, extra.size * 8 if kind == FLOAT else None)
+            for kind, is_little_endian, shift, mask, sign_bit, extra in self.plans
+        ]
+        dispatch = [(key, entry[0], entry[1], entry[2]) for key, entry in self._dispatch.items()]
+        return (self.size, self.complex_multiplexed, len(self.signals), plans, self.multiplexers,
+                self.static_indices, self.root_multiplexer, dispatch)
+
+    @classmethod
+    def from_plan(cls, signals, plan, generation=None):
+        # type: (typing.Sequence[canmatrix.Signal], typing.Tuple[typing.Any, ...], typing.Optional[int]) -> FrameCodec
+        """Create a codec from an exported plan without compiling the signals again.
+
+        :param signals: signals the plan was exported for (same layout and order)
+        :param plan: plan as returned by `export_plan`
+        :param generation: signal generation the codec is valid for
+        :return: codec
+        """
+        size, complex_multiplexed, signal_count, plans, multiplexers, static_indices, root_multiplexer, dispatch = plan
+        if signal_count != len(signals):
+            raise ValueError("Plan for {} signals doesn't match {} signals".format(signal_count, len(signals)))
+        codec = cls.__new__(cls)
+        codec.signals = list(signals)
+        codec.size = size
+        codec.generation = generation
+        codec.complex_multiplexed = complex_multiplexed
+        codec.plans = [
+            (kind, is_little_endian, shift, mask, sign_bit,
+             _float_formats[extra] if kind == FLOAT else codec.signals[index] if kind == BITSTRING else None)
+            for index, (kind, is_little_endian, shift, mask, sign_bit, extra) in enumerate(plans)
+        ]
+        codec.needs_little = any(plan[1] for plan in codec.plans)
+        codec.needs_big = not all(plan[1] for plan in codec.plans)
+        codec.multiplexers = multiplexers
+        codec.static_indices = static_indices
+        codec.static_plans = [codec.plans[index] for index in static_indices]
+        codec.root_multiplexer = root_multiplexer
+        codec._dispatch = {
+            key: (selected, sub_multiplexer, decoded, [codec.plans[index] for index in decoded])
+            for key, selected, sub_multiplexer, decoded in dispatch
+        }
+        codec._conversions = None
+        codec._encodings = None
+        return codec
+
+    def _compile_multiplexing(self):  # type: () -> None
+        self.multiplexers = [index for index, signal in enumerate(self.signals) if signal.is_multiplexer]
+        if self.complex_multiplexed:
+            self.static_indices = [
+                index for index, signal in enumerate(self.signals)
+                if not signal.is_multiplexer and signal.muxer_for_signal is None and signal.mux_val is None
+            ]
+            self.root_multiplexer = self._sub_multiplexer(None, None)
+        elif self.multiplexers:
+            self.static_indices = [index for index, signal in enumerate(self.signals) if signal.mux_val is None]
+            self.root_multiplexer = self.multiplexers[-1]  # type: typing.Optional[int]
+        else:
+            self.static_indices = list(range(len(self.signals)))
+            self.root_multiplexer = None
+        self.static_plans = [self.plans[index] for index in self.static_indices]
+        # (multiplexer index, raw value) -> dispatch table entry
+        self._dispatch = {}  # type: typing.Dict[typing.Tuple[int, typing.Any], typing.Tuple[typing.Any, ...]]
+
+    def _sub_multiplexer(self, multiplexer_name, value):
+        # type: (typing.Optional[str], typing.Any) -> typing.Optional[int]
+        for index in self.multiplexers:
+            signal = self.signals[index]
+            if signal.muxer_for_signal == multiplexer_name and signal.multiplexer_value_in_range(value):
+                return index
+        return None
+
+    def dispatch(self, multiplexer, value):
+        # type: (int, canmatrix.types.RawValue) -> typing.Tuple[typing.List[int], typing.Optional[int], typing.List[int], typing.List[typing.Tuple[int, bool, int, int, int, typing.Any]]]
+        """Get the dispatch table entry of a multiplexer value.
+
+        The entry is a tuple (selected, sub multiplexer, decoded, plans):
+
+        * selected: indices of the signals selected by the value
+        * sub multiplexer: index of the multiplexer selected by the value (complex multiplexing) or None
+        * decoded: indices of all signals to decode in signal order (simple multiplexing) or selected
+        * plans: decoding plans of decoded
+
+        Entries are compiled on first use of a value.
+
+        :param multiplexer: index of the multiplexer signal
+        :param value: raw value of the multiplexer
+        :return: dispatch table entry
+        """
+        key = (multiplexer, value)
+        entry = self._dispatch.get(key)
+        if entry is None:
+            if self.complex_multiplexed:
+                name = self.signals[multiplexer].name
+                selected = [
+                    index for index, signal in enumerate(self.signals)
+                    if not signal.is_multiplexer and signal.muxer_for_signal == name
+                    and signal.multiplexer_value_in_range(value)
+                ]
+                sub_multiplexer = self._sub_multiplexer(name, value)
+                decoded = selected
+            else:
+                selected = [
+                    index for index, signal in enumerate(self.signals)
+                    if signal.mux_val is not None and signal.mux_val == value
+                ]
+                sub_multiplexer = None
+                decoded = sorted(self.static_indices + selected)
+            entry = self._dispatch[key] = selected, sub_multiplexer, decoded, [self.plans[index] for index in decoded]
+        return entry
+
+    def select(self, multiplexer_value):
+        # type: (typing.Callable[[int], typing.Optional[canmatrix.types.RawValue]]) -> typing.List[int]
+        """Walk the multiplexer tree and get the signals to decode or encode.
+
+        The order is the order `Frame.decode` returns the signals in: signal order for simple multiplexing,
+        the multiplexer chain followed by the selected signals of every level for complex multiplexing.
+
+        :param multiplexer_value: callable(index of multiplexer signal) returning its raw value, None stops the walk
+        :return: indices of selected signals
+        """
+        multiplexer = self.root_multiplexer
+        if multiplexer is None:
+            return self.static_indices
+        if not self.complex_multiplexed:
+            value = multiplexer_value(multiplexer)
+            if value is None:
+                return self.static_indices
+            return self.dispatch(multiplexer, value)[2]
+
+        chain = []  # type: typing.List[int]
+        selected = list(self.static_indices)
+        while multiplexer is not None and multiplexer not in chain:
+            value = multiplexer_value(multiplexer)
+            if value is None:
+                break
+            chain.append(multiplexer)
+            level_selected, multiplexer, _, _ = self.dispatch(multiplexer, value)
+            selected += level_selected
+        return chain + selected
+
+    def payload(self, data, offset=0, length=None):
+        # type: (typing.Any, int, typing.Optional[int]) -> typing.Tuple[int, int]
+        """Read a payload as little and big endian integer.
+
+        The payload is read from data[offset:offset + length] without copying it, data can be
+        any bytes like object (bytes, bytearray, memoryview, mmap, ...).
+        Shorter payloads are padded with 0xFF, longer ones are truncated to `size`.
+
+        :param data: buffer containing the payload
+        :param offset: offset of the payload in data
+        :param length: length of the payload, None for the rest of data
+        :return: payload as little endian and as big endian integer (0 if not needed by any signal)
+        """
+        if offset or len(data) != self.size or (length is not None and length != self.size):
+            data = memoryview(data)[offset:]
+            if length is not None and length < len(data):
+                data = data[:length]
+            if len(data) > self.size:
+                data = data[:self.size]
+        little = int.from_bytes(data, "little") if self.needs_little else 0
+        big = int.from_bytes(data, "big") if self.needs_big else 0
+        missing = self.size - len(data)
+        if missing > 0:
+            padding = (1 << (8 * missing)) - 1
+            little |= padding << (8 * len(data))
+            big = (big << (8 * missing)) | padding
+        return little, big
+
+    def _unpack_plans(self, plans, little, big):
+        # type: (typing.Iterable[typing.Tuple[int, bool, int, int, int, typing.Any]], int, int) -> typing.List[canmatrix.types.RawValue]
+        unpacked = []
+        for kind, is_little_endian, shift, mask, sign_bit, extra in plans:
+            if kind == INTEGER:
+                value = ((little if is_little_endian else big) >> shift) & mask
+                if value & sign_bit:
+                    value -= sign_bit << 1
+            elif kind == FLOAT:
+                value = ((little if is_little_endian else big) >> shift) & mask
+                value, = extra.unpack(value.to_bytes(extra.size, "big"))
+            else:
+                if self.needs_little:
+                    data = little.to_bytes(self.size, "little")
+                else:
+                    data = big.to_bytes(self.size, "big")
+                value = unpack_signal_bitstring(extra, data, self.size * 8)
+            unpacked.append(value)
+        return unpacked
+
+    def unpack(self, data, offset=0, length=None):
+        # type: (typing.Any, int, typing.Optional[int]) -> typing.List[canmatrix.types.RawValue]
+        """Decode the raw values of all signals.
+
+        :param data: buffer containing the payload, see `payload`
+        :param offset: offset of the payload in data
+        :param length: length of the payload, None for the rest of data
+        :return: list with raw values (same order like signals)
+        """
+        little, big = self.payload(data, offset, length)
+        return self._unpack_plans(self.plans, little, big)
+
+    def unpack_selected(self, data, offset=0, length=None):
+        # type: (typing.Any, int, typing.Optional[int]) -> typing.Tuple[typing.List[int], typing.List[canmatrix.types.RawValue]]
+        """Decode the raw values of the multiplexers and the signals selected by them only.
+
+        :param data: buffer containing the payload, see `payload`
+        :param offset: offset of the payload in data
+        :param length: length of the payload, None for the rest of data
+        :return: indices of the decoded signals (see `select`) and their raw values
+        """
+        little, big = self.payload(data, offset, length)
+        multiplexer = self.root_multiplexer
+        if multiplexer is None:
+            return self.static_indices, self._unpack_plans(self.static_plans, little, big)
+        plans = self.plans
+        if not self.complex_multiplexed:
+            value, = self._unpack_plans((plans[multiplexer],), little, big)
+            _, _, decoded, decoded_plans = self.dispatch(multiplexer, value)
+            return decoded, self._unpack_plans(decoded_plans, little, big)
+
+        def multiplexer_value(index):  # type: (int) -> canmatrix.types.RawValue
+            return self._unpack_plans((plans[index],), little, big)[0]
+
+        decoded = self.select(multiplexer_value)
+        return decoded, self._unpack_plans([plans[index] for index in decoded], little, big)
+
+    @property
+    def conversions(self):  # type: () -> typing.List[typing.Tuple[typing.Any, typing.Any, typing.Mapping[int, str]]]
+        """Physical conversions of all signals (same order like signals), see `compile_conversion`."""
+        if self._conversions is None:
+            self._conversions = [compile_conversion(signal) for signal in self.signals]
+        return self._conversions
+
+    def convert(self, raw_values, mode, indices=None):
+        # type: (typing.Sequence[canmatrix.types.RawValue], str, typing.Optional[typing.Sequence[int]]) -> typing.List[typing.Any]
+        """Convert raw values (as returned by unpack) to physical or named values.
+
+        Physical values are computed as raw * factor + offset in int or float arithmetic,
+        named values are looked up in the value table and fall back to the physical value.
+
+        :param raw_values: raw values
+        :param mode: RAW, PHYS or NAMED
+        :param indices: indices of the signals of raw_values, None if raw_values contains all signals
+        :return: list of converted values
+        """
+        if mode == RAW:
+            return list(raw_values)
+        conversions = self.conversions
+        if indices is not None:
+            conversions = [conversions[index] for index in indices]
+        if mode == PHYS:
+            return [value * factor + offset for value, (factor, offset, _) in zip(raw_values, conversions)]
+        converted = []
+        for value, (factor, offset, values) in zip(raw_values, conversions):
+            named = values.get(value) if values else None
+            converted.append(value * factor + offset if named is None else named)
+        return converted
+
+    @property
+    def encodings(self):  # type: () -> typing.Dict[str, typing.Tuple[canmatrix.Signal, typing.Tuple[typing.Any, ...]]]
+        """Signal name -> (signal, encoding) of the first signal with this name, see `compile_encoding`."""
+        if self._encodings is None:
+            encodings = {}  # type: typing.Dict[str, typing.Tuple[canmatrix.Signal, typing.Tuple[typing.Any, ...]]]
+            for signal in self.signals:
+                if signal.name not in encodings:
+                    encodings[signal.name] = (signal, compile_encoding(signal))
+            self._encodings = encodings
+        return self._encodings
+
+    def to_raw(self, values, mode=PHYS, range_policy=CLAMP, violations=None):
+        # type: (typing.Mapping[str, typing.Any], str, str, typing.Optional[typing.MutableMapping[str, int]]) -> typing.Dict[str, canmatrix.types.RawValue]
+        """Convert values to raw values and apply the range policy.
+
+        Physical values are converted as (value - offset) / factor in int or float arithmetic, strings
+        are looked up in the value table (`Signal.value_index`). The range is checked on the raw values
+        against the precomputed raw limits (see `compile_encoding`), no warnings are logged:
+
+        * CLAMP: values out of range are replaced by the nearest limit and counted
+        * RAISE: values out of range raise `EncodingValueOutOfRange`
+        * IGNORE: values are not checked
+        * COUNT: values are kept and counted
+
+        :param values: dictionary of signal name : value, names of other signals are ignored
+        :param mode: PHYS (physical values or value descriptions) or RAW
+        :param range_policy: CLAMP, RAISE, IGNORE or COUNT
+        :param violations: counters signal name -> number of values out of range (e.g. collections.Counter),
+            updated for CLAMP and COUNT
+        :return: dictionary of signal name : raw value
+        """
+        encodings = self.encodings
+        check = range_policy != IGNORE
+        raw_values = {}
+        for name, value in values.items():
+            entry = encodings.get(name)
+            if entry is None:
+                continue
+            signal, (factor, offset, low, high, is_float) = entry
+            if isinstance(value, str):
+                raw = signal.value_index.get(value) if signal.values else None
+                if raw is not None:
+                    raw_values[name] = raw
+                    continue
+                value = float(value)
+            if mode == PHYS:
+                if type(value) is not int and type(value) is not float:
+                    value = float(value)
+                if factor == 1:
+                    value = value - offset
+                else:
+                    value = (value - offset) / factor
+            if not is_float and type(value) is not int:
+                value = int(round(value))
+            if check and (low is not None and value < low or high is not None and value > high):
+                if range_policy == RAISE:
+                    raise canmatrix.canmatrix.EncodingValueOutOfRange(
+                        "Value {} of {} out of range, raw limits {} .. {}".format(value, name, low, high))
+                if violations is not None:
+                    violations[name] = violations.get(name, 0) + 1
+                if range_policy == CLAMP:
+                    value = low if low is not None and value < low else high
+            raw_values[name] = value
+        return raw_values
+
+    @property
+    def can_pack(self):  # type: () -> bool
+        """True if all signals can be packed with their shift/mask plan."""
+        return all(plan[0] != BITSTRING for plan in self.plans)
+
+    def pack(self, data):
+        # type: (typing.Mapping[str, canmatrix.types.RawValue]) -> bytearray
+        """Pack raw values into a payload.
+
+        Signals missing in data are left zero. Overlapping signals are resolved like the
+        bitstring implementation: later signals overwrite earlier ones of the same byte order,
+        little endian signals take precedence over big endian ones.
+
+        :param data: dictionary of signal name : raw value
+        :return: payload of `size` bytes
+        """
+        little = little_used = big = big_used = 0
+        for signal, (kind, is_little_endian, shift, mask, _, extra) in zip(self.signals, self.plans):
+            if signal.name not in data:
+                continue
+            value = data[signal.name]
+            if kind == FLOAT:
+                value = int.from_bytes(extra.pack(value), "big")
+            elif type(value) is not int:
+                value = int(((mask + 1) << 1) + value)
+            value = (value & mask) << shift
+            mask <<= shift
+            if is_little_endian:
+                little = (little & ~mask) | value
+                little_used |= mask
+            else:
+                big = (big & ~mask) | value
+                big_used |= mask
+        if big_used:
+            big = int.from_bytes(big.to_bytes(self.size, "big"), "little")
+            little |= big & ~little_used
+        return bytearray(little.to_bytes(self.size, "little"))
+
+
+class ContainerCodec(object):
+    """
+    Compiled decoder and encoder for container frames (contained PDUs, each preceded by a Header_ID/Header_DLC header).
+
+    Headers are read with one fixed width integer read each, the contained PDU is looked up by header id
+    in a dictionary and decoded by a `FrameCodec` of the PDU directly at its byte offset in the payload.
+    Only byte aligned header layouts are supported, see `byte_aligned`.
+
+    The codec does not track changes of the signals or PDUs, see `Frame.container_codec` for invalidation.
+    """
+
+    def __init__(self, signals, pdus, size, generation=None):
+        # type: (typing.Sequence[canmatrix.Signal], typing.Sequence[canmatrix.Pdu], int, typing.Optional[int]) -> None
+        """
+        :param signals: signals of the container frame (including Header_ID and Header_DLC)
+        :param pdus: contained PDUs
+        :param size: payload size in bytes
+        :param generation: signal generation the codec was built for
+        """
+        self.signals = list(signals)
+        self.pdus = list(pdus)
+        self.size = size
+        self.generation = generation
+
+        by_name = {}  # type: typing.Dict[str, canmatrix.Signal]
+        for signal in self.signals:
+            by_name.setdefault(signal.name, signal)
+        header_id = by_name.get("Header_ID")
+        header_dlc = by_name.get("Header_DLC")
+        if header_id is None or header_dlc is None:
+            self.header_signals = None  # type: typing.Optional[typing.List[canmatrix.Signal]]
+            self.static_signals = self.signals
+        else:
+            self.header_signals = [header_id, header_dlc]
+            self.static_signals = [signal for signal in self.signals if signal not in self.header_signals]
+        self.static_codec = FrameCodec(self.static_signals, size)
+
+        # header id / name -> first PDU with this id / name (like `Frame.pdu_by_id` / `Frame.pdu_by_name`)
+        self.pdu_by_id = {}  # type: typing.Dict[int, canmatrix.Pdu]
+        self.pdu_by_name = {}  # type: typing.Dict[str, canmatrix.Pdu]
+        for pdu in self.pdus:
+            self.pdu_by_id.setdefault(pdu.id, pdu)
+            self.pdu_by_name.setdefault(pdu.name, pdu)
+        # (header id, dlc) -> codec of the PDU
+        self._pdu_codecs = {}  # type: typing.Dict[typing.Tuple[int, int], FrameCodec]
+
+        self.byte_aligned = False
+        self.header_format = None  # type: typing.Optional[typing.Tuple[str, int, int, int, int]]
+        if self.header_signals is not None:
+            header_bits = header_id.size + header_dlc.size
+            start_bit = header_id.start_bit
+            if isinstance(start_bit, int) and isinstance(header_bits, int) and start_bit % 8 == 0 \
+                    and header_bits % 8 == 0:
+                self.byte_aligned = True
+                self.header_start = start_bit // 8
+                self.header_length = header_bits // 8
+                self.header_codec = FrameCodec(self.header_signals, self.header_length)
+                (id_kind, id_little, id_shift, id_mask, id_sign, _), (dlc_kind, dlc_little, dlc_shift, dlc_mask, dlc_sign, _) = \
+                    self.header_codec.plans
+                if id_kind == dlc_kind == INTEGER and id_little == dlc_little and not id_sign and not dlc_sign:
+                    # both header fields are read from one integer
+                    self.header_format = ("little" if id_little else "big", id_shift, id_mask, dlc_shift, dlc_mask)
+
+    def pdu_codec(self, pdu, dlc):  # type: (canmatrix.Pdu, int) -> FrameCodec
+        """Get the codec of a contained PDU with the given length (compiled on first use)."""
+        key = (pdu.id, dlc)
+        codec = self._pdu_codecs.get(key)
+        if codec is None or codec.signals != pdu.signals:
+            codec = self._pdu_codecs[key] = FrameCodec(pdu.signals, dlc)
+        return codec
+
+    def read_header(self, data, offset):  # type: (typing.Any, int) -> typing.Tuple[int, int]
+        """Read the header at data[offset:offset + header_length].
+
+        :return: (header id, dlc)
+        """
+        header_format = self.header_format
+        if header_format is not None:
+            byteorder, id_shift, id_mask, dlc_shift, dlc_mask = header_format
+            word = int.from_bytes(data[offset:offset + self.header_length], byteorder)
+            return (word >> id_shift) & id_mask, (word >> dlc_shift) & dlc_mask
+        header_id, dlc = self.header_codec.unpack(data, offset, self.header_length)
+        return header_id, dlc
+
+    def unpack(self, data, offset=0):
+        # type: (typing.Any, int) -> typing.Tuple[typing.List[canmatrix.types.RawValue], typing.List[typing.Tuple[int, int, typing.Optional[canmatrix.Pdu], typing.Optional[typing.List[canmatrix.types.RawValue]]]]]
+        """Decode the raw values of a container payload.
+
+        Headers are read while a complete header fits before the end of the payload.
+        PDUs exceeding the payload are padded with 0xFF.
+
+        :param data: buffer containing the payload of `size` bytes
+        :param offset: offset of the payload in data
+        :return: raw values of the static signals (same order like static_signals) and a list of
+            (header id, dlc, PDU, raw values of the PDU signals) per contained PDU,
+            PDU and values are None for unknown header ids
+        """
+        view = memoryview(data)
+        static = self.static_codec.unpack(view, offset, self.size)
+        contained = []  # type: typing.List[typing.Tuple[int, int, typing.Optional[canmatrix.Pdu], typing.Optional[typing.List[canmatrix.types.RawValue]]]]
+        end = offset + self.size
+        header_length = self.header_length
+        position = offset + self.header_start
+        while position + header_length < end:
+            header_id, dlc = self.read_header(view, position)
+            position += header_length
+            pdu = self.pdu_by_id.get(header_id)
+            if pdu is None:
+                contained.append((header_id, dlc, None, None))
+            else:
+                values = self.pdu_codec(pdu, dlc).unpack(view, position, min(dlc, end - position))
+                contained.append((header_id, dlc, pdu, values))
+            position += dlc
+        return static, contained
+
+    def write_header(self, buffer, offset, header_id, dlc):  # type: (typing.Any, int, int, int) -> None
+        """Write a header to buffer[offset:offset + header_length]."""
+        header_format = self.header_format
+        if header_format is not None:
+            byteorder, id_shift, id_mask, dlc_shift, dlc_mask = header_format
+            word = ((header_id & id_mask) << id_shift) | ((dlc & dlc_mask) << dlc_shift)
+            buffer[offset:offset + self.header_length] = word.to_bytes(self.header_length, byteorder)
+        else:
+            header_id_signal, header_dlc_signal = self.header_signals
+            buffer[offset:offset + self.header_length] = self.header_codec.pack(
+                {header_id_signal.name: header_id, header_dlc_signal.name: dlc})
+
+    def pack(self, contained, buffer=None, offset=0):
+        # type: (typing.Iterable[typing.Tuple[str, typing.Mapping[str, canmatrix.types.RawValue]]], typing.Optional[bytearray], int) -> bytearray
+        """Pack contained PDUs into a container payload.
+
+        Every PDU gets a header with its id and size as DLC, PDUs are packed in the given order.
+        Signals missing in the values are left zero, so is the space after the last PDU.
+
+        :param contained: (PDU name, dictionary of signal name : raw value) per contained PDU
+        :param buffer: writable buffer (e.g. bytearray) to pack the payload into, a new bytearray if None
+        :param offset: offset of the payload in buffer
+        :return: buffer
+        """
+        if self.header_signals is None or not self.byte_aligned:
+            raise canmatrix.canmatrix.EncodingConatainerPdu(
+                "Encoding needs byte aligned Header_ID and Header_DLC signals")
+        if buffer is None:
+            buffer = bytearray(offset + self.size)
+        elif len(buffer) < offset + self.size:
+            raise ValueError(
+                "Buffer of {} bytes too small for payload of {} bytes at offset {}".format(
+                    len(buffer), self.size, offset))
+        end = offset + self.size
+        buffer[offset:end] = bytes(self.size)
+        position = offset + self.header_start
+        for pdu_name, values in contained:
+            pdu = self.pdu_by_name.get(pdu_name)
+            if pdu is None:
+                raise canmatrix.canmatrix.EncodingConatainerPdu("Unknown PDU {}".format(pdu_name))
+            if position + self.header_length + pdu.size > end:
+                raise canmatrix.canmatrix.EncodingConatainerPdu(
+                    "PDU {} exceeds the container payload of {} bytes".format(pdu_name, self.size))
+            codec = self.pdu_codec(pdu, pdu.size)
+            if not codec.can_pack:
+                raise canmatrix.canmatrix.EncodingConatainerPdu(
+                    "Signals of PDU {} exceed its size of {} bytes".format(pdu_name, pdu.size))
+            self.write_header(buffer, position, pdu.id, pdu.size)
+            position += self.header_length
+            buffer[position:position + pdu.size] = codec.pack(values)
+            position += pdu.size
+        return buffer
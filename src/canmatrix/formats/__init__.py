@@ -82,12 +82,25 @@ def loadp_flat(path, import_type=None, key="", **options):
 
 def load(file_object, import_type, key="", **options):
     # type: (typing.BinaryIO, str, str, **str) -> typing.Union[typing.Dict[str, canmatrix.CanMatrix], None]
+    """Load matrices from file_object.
+
+    Besides the options of the format, all formats support:
+
+    * float_factory: callable used to store numbers like factor and offset (default decimal.Decimal)
+    * float_scaling: if True, scale signals in float arithmetic (see `CanMatrix.set_float_scaling`),
+      numbers are still stored by float_factory
+    """
+    float_scaling = options.pop("float_scaling", False)
     dbs = {}  # type: typing.Dict[str, canmatrix.CanMatrix]
     module_instance = sys.modules["canmatrix.formats." + import_type]
     if "clusterImporter" in supportedFormats[import_type]:
         dbs = module_instance.load(file_object, **options)  # type: ignore
     else:
         dbs[key] = module_instance.load(file_object, **options)  # type: ignore
+    if float_scaling:
+        for db in (dbs or {}).values():
+            if db is not None:
+                db.set_float_scaling()
     return dbs
 
 
@@ -29,7 +29,11 @@ from __future__ import absolute_import, division, print_function
 
 import copy
 import decimal
+import io
+import itertools
 import logging
+import multiprocessing
+import os
 import re
 import typing
 from builtins import *
@@ -53,17 +57,61 @@ _Element = lxml.etree._Element
 _MultiplexId = typing.Union[str, int, None]
 _FloatFactory = typing.Callable[[typing.Any], typing.Any]
 
+# tag names which can be looked up in the tag index of Earxml (no path, no predicate)
+_plain_tag_name = re.compile(r"[A-Z0-9-]+$")
+
 
 class Earxml:
     def __init__(self):
         self.xml_element_cache = dict()  # type: typing.Dict[str, _Element]
         self.path_cache = {}
         self.sn_cache = {}
+        self._element_paths = {}  # type: typing.Dict[_Element, str]
+        self._referencable_parents = {}  # type: typing.Dict[_Element, _Element]
+        # tag index, see fill_caches
+        self._tag_elements = {}  # type: typing.Dict[str, typing.List[_Element]]
+        self._plain_tags = {}  # type: typing.Dict[str, str]
+        # FRAME -> frame decoded from it, without the properties of a frame triggering, see get_frame
+        self.frame_layouts = {}  # type: typing.Dict[_Element, canmatrix.Frame]
 
     def fill_caches(self, start_element=None, ar_path=""):
+        """Build the caches of the document.
+
+        * xml_element_cache: AR path -> element
+        * path_cache: AR path -> referencing elements
+        * sn_cache: element -> short name
+        * AR path of every referencable element and the referencable parent of every referencing element
+
+        Besides that the elements of a tag are indexed (in document order) on the first search of the tag
+        in the whole document, later searches are lookups. The caches are not updated if the tree is modified.
+        """
         if start_element is None:
             start_element = self.root
             self.path_cache = {}
+            self.xml_element_cache = {}
+            self.sn_cache = {}
+            self._element_paths = {}
+            self._referencable_parents = {}
+            self._tag_elements = {}
+            self._plain_tags = {}
+        return self._fill_caches(start_element, ar_path, start_element)
+
+    def _plain_tag(self, tag_name):  # type: (str) -> str
+        """Get the namespaced tag of tag_name or "" if tag_name is no plain tag name (but a path)."""
+        tag = self._plain_tags.get(tag_name)
+        if tag is None:
+            tag = self._plain_tags[tag_name] = self.ns + tag_name if _plain_tag_name.match(tag_name) else ""
+        return tag
+
+    def _indexed(self, tag):  # type: (str) -> typing.List[_Element]
+        """Get all elements with the (namespaced) tag in document order."""
+        elements = self._tag_elements.get(tag)
+        if elements is None:
+            elements = self._tag_elements[tag] = list(self.root.iterdescendants(tag))
+        return elements
+
+    def _fill_caches(self, start_element, ar_path, referencable):
+        # type: (_Element, str, _Element) -> str
         if start_element.tag == self.ns + "SHORT-NAME":
             self.sn_cache[start_element.getparent()] = start_element.text
             return start_element.text
@@ -73,10 +121,13 @@ class Earxml:
                 if text not in self.path_cache:
                     self.path_cache[text] = []
                 self.path_cache[text].append(sub_element)
-            new_ar_path = self.fill_caches(sub_element, ar_path)
+                self._referencable_parents[sub_element] = referencable
+            new_ar_path = self._fill_caches(sub_element, ar_path, referencable)
             if new_ar_path != "":
                 ar_path += '/' + new_ar_path
                 self.xml_element_cache[ar_path] = start_element
+                self._element_paths[start_element] = ar_path
+                referencable = start_element
         return ''
 
     def open(self, filename):
@@ -87,15 +138,46 @@ class Earxml:
         self.nsp = self.tree.xpath('namespace-uri(.)')
         self.fill_caches()
 
+    def open_streaming(self, filename, keep):
+        # type: (typing.Any, typing.Container[str]) -> None
+        """Parse only the packaged elements in keep (see `ArxmlIndex`).
+
+        The file is parsed incrementally, every other packaged element is dropped as soon as it is parsed,
+        so the memory needed is bounded by the kept elements and the largest dropped element.
+
+        :param filename: file name or binary file object
+        :param keep: AR paths of the packaged elements to keep
+        """
+        context = lxml.etree.iterparse(filename, events=("end",), tag=("{*}SHORT-NAME", "{*}ELEMENTS"))
+        for ar_path, element in _iter_packaged_elements(context):
+            if ar_path not in keep:
+                element.getparent().remove(element)
+        self.root = context.root  # type: _Element
+        self.tree = self.root.getroottree()
+        self.nsp = lxml.etree.QName(self.root).namespace or ""
+        self.ns = "{" + self.nsp + "}"  # type: str
+        self.fill_caches()
+
     def findall(self, xpath, start_element=None):
         if start_element is None:
             start_element = self.root
-        return start_element.findall('.//' + self.ns + xpath)
+        tag = self._plain_tag(xpath)
+        if not tag:
+            return start_element.findall('.//' + self.ns + xpath)
+        if start_element is self.root:
+            return list(self._indexed(tag))
+        return list(start_element.iterdescendants(tag))
 
     def find(self, xpath, start_element=None):
         if start_element is None:
             start_element = self.root
-        return start_element.find('.//' + self.ns + xpath)
+        tag = self._plain_tag(xpath)
+        if not tag:
+            return start_element.find('.//' + self.ns + xpath)
+        if start_element is self.root:
+            elements = self._indexed(tag)
+            return elements[0] if elements else None
+        return next(start_element.iterdescendants(tag), None)
 
     @staticmethod
     def ar_path_to_x_path(ar_path, dest_element=None):
@@ -114,16 +196,18 @@ class Earxml:
         return xpath
 
     def get_short_name_path_of_element(self, xml_element):
-        path = ""
+        # the path of the closest referencable element
         while xml_element != self.root:
-            current_short_name = self.get_short_name(xml_element)
-            if len(current_short_name) > 0:
-                path = "/" + current_short_name + path
+            path = self._element_paths.get(xml_element)
+            if path is not None:
+                return path
             xml_element = xml_element.getparent()
-        return path.strip()
+        return ""
 
     def get_referencable_parent(self, xml_element):
-        path = ""
+        referencable = self._referencable_parents.get(xml_element)
+        if referencable is not None:
+            return referencable
         while xml_element != self.root:
             current_short_name = self.get_short_name(xml_element)
             if len(current_short_name) > 0:
@@ -193,6 +277,9 @@ class Earxml:
     def get_element_name(self, parent):
         # type: (_Element, str) -> str
         """Get element short name."""
+        name = self.sn_cache.get(parent)
+        if name is not None:
+            return name
         name = self.find('SHORT-NAME', parent)
         if name is not None and name.text is not None:
             return name.text
@@ -249,61 +336,198 @@ class Earxml:
             return None
 
     def selector(self, start_element, selector):
-        start_pos = 0
-        token = ""
+        # type: (_Element, str) -> typing.List[_Element]
+        """Select elements with a selector, see `compile_selector` for the syntax.
+
+        :param start_element: element to start from
+        :param selector: selector string
+        :return: selected elements without duplicates, in order of selection
+        """
         result_list = [start_element]
-        last_found_token = 0
-        while start_pos < len(selector):
-            token_match = re.search(r'//|/|>>|>|<<|<|#|:|$', selector[start_pos:])
-            found_token = token_match.span()
-
-            if start_pos > 0:  # at least one Token found...
-                value = selector[last_found_token:start_pos + found_token[0]]
-                if token == "//":
-                    result_list = [c for a in result_list for c in self.findall(value, a)]
-                elif token == "/":
-                    if value == "..":
-                        result_list = [self.get_referencable_parent(a.getparent()) for a in result_list]
-                    else:
-                        result_list = [self.get_sub_by_name(a, value) for a in result_list]
-                elif token == ">>":
-                    result_list = [self.xml_element_cache[a.text][0].getparent() for start in result_list for a in
-                                   self.get_all_sub_by_name(start, value) if a.text in self.xml_element_cache]
-                elif token == ">":
-                    result_list = [self.xml_element_cache[self.get_sub_by_name(a, value).text][0].getparent() for a in result_list
-                                   if self.get_sub_by_name(a, value) is not None and self.get_sub_by_name(a, value).text in self.xml_element_cache]
-                elif token == "<<":
-                    result_list = [c for a in result_list for c in
-                                   self.find_references_of_type(a, value, referencable_parent=True)]
-                elif token == "<":
-                    result_list = [self.find_references_of_type(a, value, referencable_parent=True)[0]
-                                   for a in result_list
-                                   if len(self.find_references_of_type(a, value, referencable_parent=True)) > 0]
-                elif token == ":":
-                    filtered_results = []
-                    for item in result_list:
-                        if value == item.text:
-                            filtered_results.append(item)
-                    result_list = filtered_results
-
-                elif token == "#":
-                    sn_snippets = value.split("|")
-                    filtered_results = []
-                    for tag in result_list:
-                        sn = self.get_short_name(tag)
-                        for test_name in sn_snippets:
-                            if test_name in sn:
-                                filtered_results.append(tag)
-                    result_list = filtered_results
-
-                result_list = list(set(result_list))
-                if None in result_list:
-                    result_list.remove(None)
-
-            last_found_token = found_token[1] + start_pos
-            token = selector[start_pos + found_token[0]:start_pos + found_token[1]]
-            start_pos += found_token[1]
-        return sorted(result_list, key=lambda element: element.sourceline)
+        for token, value in compile_selector(selector):
+            if token == "//":
+                result_list = [c for a in result_list for c in self.findall(value, a)]
+            elif token == "/":
+                if value == "..":
+                    result_list = [self.get_referencable_parent(a.getparent()) for a in result_list]
+                else:
+                    result_list = [self.get_sub_by_name(a, value) for a in result_list]
+            elif token == ">>":
+                result_list = [self.xml_element_cache.get(a.text) for start in result_list
+                               for a in self.get_all_sub_by_name(start, value)]
+            elif token == ">":
+                references = (self.get_sub_by_name(a, value) for a in result_list)
+                result_list = [self.xml_element_cache.get(a.text) for a in references if a is not None]
+            elif token == "<<":
+                result_list = [c for a in result_list for c in
+                               self.find_references_of_type(a, value, referencable_parent=True)]
+            elif token == "<":
+                references = (self.find_references_of_type(a, value, referencable_parent=True) for a in result_list)
+                result_list = [found[0] for found in references if found]
+            elif token == ":":
+                result_list = [item for item in result_list if value == item.text]
+            elif token == "#":
+                # value is a tuple of short name snippets
+                result_list = [item for item in result_list
+                               if any(test_name in self.get_short_name(item) for test_name in value)]
+            else:
+                continue
+            seen = set()  # type: typing.Set[_Element]
+            result_list = [item for item in result_list
+                           if item is not None and item not in seen and not seen.add(item)]
+        return result_list
+
+
+_selector_token = re.compile(r'//|/|>>|>|<<|<|#|:|$')
+_compiled_selectors = {}  # type: typing.Dict[str, typing.List[typing.Tuple[str, typing.Any]]]
+
+
+def compile_selector(selector):  # type: (str) -> typing.List[typing.Tuple[str, typing.Any]]
+    """Compile a selector of `Earxml.selector` into its steps (token, value).
+
+    Selector tokens, each followed by a value:
+
+    * ``//TAG``: all descendants with TAG
+    * ``/TAG``: first descendant with TAG, ``/..`` the referencable parent
+    * ``>>TAG``: elements referenced by all descendants with TAG
+    * ``>TAG``: element referenced by the first descendant with TAG
+    * ``<<TAG``: all referencing elements with TAG
+    * ``<TAG``: first referencing element with TAG
+    * ``:TEXT``: filter elements by text
+    * ``#NAME|NAME``: filter elements by parts of the short name
+
+    Anything before the first token is ignored. Compiled selectors are cached.
+    """
+    steps = _compiled_selectors.get(selector)
+    if steps is None:
+        steps = []
+        token = ""
+        position = 0
+        while position < len(selector):
+            token_match = _selector_token.search(selector, position)
+            if position > 0:  # at least one token found...
+                value = selector[position:token_match.start()]
+                steps.append((token, tuple(value.split("|")) if token == "#" else value))
+            token = token_match.group()
+            position = token_match.end()
+        _compiled_selectors[selector] = steps
+    return steps
+
+
+def _iter_packaged_elements(context):
+    # type: (lxml.etree.iterparse) -> typing.Iterator[typing.Tuple[str, _Element]]
+    """Yield AR path and element of the packaged elements (elements of AR-PACKAGEs) of an iterparse context.
+
+    An element is yielded as soon as it is parsed completely, it may be removed from the tree then.
+    The context has to yield the end events of SHORT-NAME and ELEMENTS.
+    """
+    package_paths = {}  # type: typing.Dict[_Element, str]  # ELEMENTS -> AR path of the package
+    pending = None  # type: typing.Optional[typing.Tuple[str, _Element]]
+    for _, element in context:
+        if element.tag.endswith("}ELEMENTS") or element.tag == "ELEMENTS":
+            if pending is not None:
+                yield pending
+                pending = None
+            continue
+        packaged = element.getparent()
+        elements = packaged.getparent() if packaged is not None else None
+        if elements is None or not (elements.tag.endswith("}ELEMENTS") or elements.tag == "ELEMENTS"):
+            continue
+        # a new packaged element started, the previous one is complete
+        if pending is not None:
+            yield pending
+        package_path = package_paths.get(elements)
+        if package_path is None:
+            package_path = ""
+            ancestor = elements.getparent()
+            while ancestor is not None:
+                short_name = ancestor.findtext("{*}SHORT-NAME")
+                if short_name:
+                    package_path = "/" + short_name + package_path
+                ancestor = ancestor.getparent()
+            package_paths[elements] = package_path
+        pending = (package_path + "/" + element.text, packaged)
+    if pending is not None:
+        yield pending
+
+
+class ArxmlIndex(object):
+    """Index of the packaged elements (the elements of the AR-PACKAGEs) of an ARXML file.
+
+    The index is built in one streaming pass which drops every packaged element after reading it, it only
+    records the AR path and tag of all packaged elements and their references to other elements.
+    It is used to select the elements needed for some clusters before parsing them, see `Earxml.open_streaming`.
+    """
+
+    # elements which are needed, but not the elements they reference
+    leaf_tags = ("ECU-INSTANCE",)
+
+    def __init__(self):
+        self.elements = {}  # type: typing.Dict[str, str]  # AR path -> tag (without namespace)
+        # AR path -> references (AR paths) from the element or its children to other elements,
+        # elements without references are left out
+        self.references = {}  # type: typing.Dict[str, typing.FrozenSet[str]]
+
+    @classmethod
+    def build(cls, filename):  # type: (typing.Any) -> ArxmlIndex
+        """Build the index of an ARXML file.
+
+        :param filename: file name or binary file object
+        :return: index
+        """
+        index = cls()
+        context = lxml.etree.iterparse(filename, events=("end",), tag=("{*}SHORT-NAME", "{*}ELEMENTS"))
+        for ar_path, element in _iter_packaged_elements(context):
+            index.elements[ar_path] = element.tag.rpartition("}")[2]
+            inner = ar_path + "/"
+            # plain iteration, the equivalent XPath (.//*) is quadratic in the size of the element
+            references = frozenset(
+                child.text for child in element.iter(lxml.etree.Element)
+                if child.text and child.text.startswith("/") and not child.text.startswith(inner))
+            if references:
+                index.references[ar_path] = references
+            element.getparent().remove(element)
+        return index
+
+    def element_of(self, ar_path):  # type: (str) -> typing.Optional[str]
+        """Get the path of the packaged element containing ar_path (or being ar_path)."""
+        while ar_path:
+            if ar_path in self.elements:
+                return ar_path
+            ar_path = ar_path.rpartition("/")[0]
+        return None
+
+    def find(self, tags, names=None):
+        # type: (typing.Iterable[str], typing.Optional[typing.Iterable[str]]) -> typing.List[str]
+        """Get the paths of all packaged elements with one of the tags.
+
+        :param tags: tags (without namespace)
+        :param names: if given only elements with these short names or AR paths
+        :return: AR paths in file order
+        """
+        tags = set(tags)
+        names = set(names) if names else None
+        return [
+            path for path, tag in self.elements.items()
+            if tag in tags and (names is None or path in names or path.rpartition("/")[2] in names)
+        ]
+
+    def closure(self, ar_paths):  # type: (typing.Iterable[str]) -> typing.Set[str]
+        """Get the packaged elements of ar_paths and all elements they (indirectly) reference."""
+        found = set()  # type: typing.Set[str]
+        pending = [path for path in (self.element_of(path) for path in ar_paths) if path is not None]
+        while pending:
+            path = pending.pop()
+            if path in found:
+                continue
+            found.add(path)
+            if self.elements[path] in self.leaf_tags:
+                continue
+            for reference in self.references.get(path, ()):
+                referenced = self.element_of(reference)
+                if referenced is not None and referenced not in found:
+                    pending.append(referenced)
+        return found
 
 
 def create_sub_element(parent, element_name, text=None, dest=None):
@@ -985,7 +1209,6 @@ def dump(dbs, f, **options):
 ###################################
 
 
-frames_cache = {}  # type: typing.Dict[_Element, canmatrix.Frame]
 
 
 def get_signalgrp_and_signals(sys_signal, sys_signal_array, frame, group_id, ea):
@@ -1569,10 +1792,49 @@ def store_frame_timings(target_frame, cyclic_timing, event_timing, minimum_delay
             target_frame.cycle_time = int(float_factory(value.text) * 1000)
 
 
+def copy_frame_layout(frame):  # type: (canmatrix.Frame) -> canmatrix.Frame
+    """Copy a frame for another frame triggering of the same FRAME.
+
+    Signals are copied shallow: the copies share the immutable values (start bit, size, scaling, value names, ...)
+    with the original, only their containers are new. Everything else is deep copied with the signal copies,
+    so PDUs and signal groups of the copy refer to the copied signals.
+    """
+    memo = {}  # type: typing.Dict[int, typing.Any]
+    for signal in itertools.chain(frame.signals, *(pdu.signals for pdu in frame.pdus)):
+        if id(signal) in memo:
+            continue
+        copied = copy.copy(signal)
+        copied.receivers = list(signal.receivers)
+        copied.comments = dict(signal.comments)
+        copied.attributes = dict(signal.attributes)
+        copied.values = dict(signal.values)
+        copied.mux_val_grp = [list(group) for group in signal.mux_val_grp]
+        memo[id(signal)] = copied
+    return copy.deepcopy(frame, memo)
+
+
+def set_frame_triggering(frame, frame_triggering, arbitration_id, ea):
+    # type: (canmatrix.Frame, _Element, int, Earxml) -> None
+    """Set the properties of the frame triggering (arbitration id, CAN FD) at the frame."""
+    address_mode = ea.get_child(frame_triggering, "CAN-ADDRESSING-MODE")
+    frame_rx_behaviour_elem = ea.get_child(frame_triggering, "CAN-FRAME-RX-BEHAVIOR")
+    frame_tx_behaviour_elem = ea.get_child(frame_triggering, "CAN-FRAME-TX-BEHAVIOR")
+    is_fd_elem = ea.get_child(frame_triggering, "CAN-FD-FRAME-SUPPORT")
+    if address_mode is not None and address_mode.text == 'EXTENDED':
+        frame.arbitration_id = canmatrix.ArbitrationId(arbitration_id, extended=True)
+    else:
+        frame.arbitration_id = canmatrix.ArbitrationId(arbitration_id, extended=False)
+
+    if (frame_rx_behaviour_elem is not None and frame_rx_behaviour_elem.text == 'CAN-FD') or \
+            (frame_tx_behaviour_elem is not None and frame_tx_behaviour_elem.text == 'CAN-FD') or \
+            (is_fd_elem is not None and is_fd_elem.text.lower() == 'true'):
+        frame.is_fd = True
+    else:
+        frame.is_fd = False
+
+
 def get_frame(frame_triggering, ea, multiplex_translation, float_factory, headers_are_littleendian):
     # type: (_Element, Earxml, dict, typing.Callable, bool) -> typing.Union[canmatrix.Frame, None]
-    global frames_cache
-
     arb_id = ea.get_child(frame_triggering, "IDENTIFIER")
     frame_elem = ea.follow_ref(frame_triggering, "FRAME-REF")
     frame_trig_name_elem = ea.get_child(frame_triggering, "SHORT-NAME")
@@ -1584,8 +1846,12 @@ def get_frame(frame_triggering, ea, multiplex_translation, float_factory, header
 
     if frame_elem is not None:
         logger.debug("Frame: %s", ea.get_element_name(frame_elem))
-        if frame_elem in frames_cache:
-            return copy.deepcopy(frames_cache[frame_elem])
+        layout = ea.frame_layouts.get(frame_elem)
+        if layout is not None:
+            new_frame = copy_frame_layout(layout)
+            new_frame.add_attribute("FrameTriggeringName", ea.get_short_name(frame_triggering))
+            set_frame_triggering(new_frame, frame_triggering, arbitration_id, ea)
+            return new_frame
         dlc_elem = ea.get_child(frame_elem, "FRAME-LENGTH")
         # pdu_mapping = ea.get_child(frame_elem, "PDU-TO-FRAME-MAPPING")
         # pdu = ea.follow_ref(pdu_mapping, "PDU-REF")  # SIGNAL-I-PDU
@@ -1681,21 +1947,7 @@ def get_frame(frame_triggering, ea, multiplex_translation, float_factory, header
     if new_frame.comment is None:
         new_frame.add_comment(ea.get_element_desc(pdu))
 
-    address_mode = ea.get_child(frame_triggering, "CAN-ADDRESSING-MODE")
-    frame_rx_behaviour_elem = ea.get_child(frame_triggering, "CAN-FRAME-RX-BEHAVIOR")
-    frame_tx_behaviour_elem = ea.get_child(frame_triggering, "CAN-FRAME-TX-BEHAVIOR")
-    is_fd_elem = ea.get_child(frame_triggering, "CAN-FD-FRAME-SUPPORT")
-    if address_mode is not None and address_mode.text == 'EXTENDED':
-        new_frame.arbitration_id = canmatrix.ArbitrationId(arbitration_id, extended=True)
-    else:
-        new_frame.arbitration_id = canmatrix.ArbitrationId(arbitration_id, extended=False)
-
-    if (frame_rx_behaviour_elem is not None and frame_rx_behaviour_elem.text == 'CAN-FD') or \
-            (frame_tx_behaviour_elem is not None and frame_tx_behaviour_elem.text == 'CAN-FD') or \
-            (is_fd_elem is not None and is_fd_elem.text.lower() == 'true'):
-        new_frame.is_fd = True
-    else:
-        new_frame.is_fd = False
+    set_frame_triggering(new_frame, frame_triggering, arbitration_id, ea)
 
     timing_spec = ea.get_child(pdu, "I-PDU-TIMING-SPECIFICATION")  # AR 3
     if timing_spec is None:
@@ -1739,10 +1991,11 @@ def get_frame(frame_triggering, ea, multiplex_translation, float_factory, header
                            new_frame.name, cycle_times, new_frame.cycle_time)
         new_frame.cycle_time = min(cycle_times)
     new_frame.fit_dlc()
-    if frame_elem is not None:
-        frames_cache[frame_elem] = new_frame
-
-    return copy.deepcopy(new_frame)
+    if frame_elem is None:
+        return new_frame
+    # the layout is shared by all triggerings of the frame, the caller gets a copy to modify
+    ea.frame_layouts[frame_elem] = new_frame
+    return copy_frame_layout(new_frame)
 
 
 def update_frame_with_pdu_triggerings(frame, ea, frame_triggering, float_factory):
@@ -2149,37 +2402,10 @@ def get_sig_ipdu_nb(ea):
     return len(sig_ipdu)
 
 
-def load(file, **options):
-    # type: (typing.IO, **typing.Any) -> typing.Dict[str, canmatrix.CanMatrix]
-
-    global frames_cache
-    frames_cache = {}
-
-    float_factory = options.get("float_factory", default_float_factory)  # type: typing.Callable
-    ignore_cluster_info = options.get("arxmlIgnoreClusterInfo", False)
-
-    decode_ethernet = options.get("decode_ethernet", False)
-    decode_flexray = options.get("decode_flexray", False)
-
+def decode_clusters(ea, float_factory, decode_ethernet=False, decode_flexray=False, ignore_cluster_info=False):
+    # type: (Earxml, _FloatFactory, bool, bool, bool) -> typing.Dict[str, canmatrix.CanMatrix]
+    """Decode all (ethernet, flexray and) can clusters of the document."""
     result = {}
-    logger.debug("Read arxml ...")
-
-    ea = Earxml()
-    ea.open(file)
-
-    com_module = ea.get_short_name_path("/ActiveEcuC/Com")
-
-    if com_module is not None and len(com_module) > 0:
-        logger.info("seems to be a ECUC arxml. Very limited support for extracting canmatrix.")
-        return extract_cm_from_ecuc(com_module, ea)
-
-    logger.debug("%d frames in arxml...", get_frames_nb(ea))
-    logger.debug("%d can-frame-triggering in arxml...", get_can_trigger_nb(ea))
-
-    logger.debug("%d SIGNAL-TO-PDU-MAPPINGS in arxml...", get_sig_pdu_map_nb(ea))
-
-    logger.debug("%d I-SIGNAL-TO-I-PDU-MAPPING in arxml...", get_sig_ipdu_nb(ea))
-
     if decode_ethernet:
         result.update(decode_ethernet_helper(ea, float_factory))
 
@@ -2187,9 +2413,12 @@ def load(file, **options):
         result.update(decode_flexray_helper(ea, float_factory))
 
     result.update(decode_can_helper(ea, float_factory, ignore_cluster_info))
+    return result
 
-    result = canmatrix.cancluster.CanCluster(result)
 
+def get_gateway_mappings(ea):
+    # type: (Earxml) -> typing.Tuple[typing.List[typing.Dict[str, str]], typing.List[typing.Dict[str, str]]]
+    """Get the pdu and the signal gateway mappings of the document."""
     def get_cluster_for_triggering(triggering):
         while triggering != ea.root:
             if triggering.tag.endswith("-CLUSTER"):
@@ -2243,7 +2472,6 @@ def load(file, **options):
 
         pdu_gateway_mappings.append(mapping_info)
 
-    result.pdu_gateway(pdu_gateway_mappings)
 
     signal_gateway_mappings = []
     for signal_mapping in ea.selector(ea.root, "//I-SIGNAL-MAPPING"):
@@ -2270,6 +2498,114 @@ def load(file, **options):
                         "source_type": source_type, "target_type": target_type}
 
         signal_gateway_mappings.append(mapping_info)
+    return pdu_gateway_mappings, signal_gateway_mappings
+
+
+def _decode_streamed_clusters(source, keep, float_factory, decode_ethernet, decode_flexray):
+    # type: (typing.Union[str, bytes], typing.Set[str], _FloatFactory, bool, bool) -> typing.Dict[str, canmatrix.CanMatrix]
+    ea = Earxml()
+    ea.open_streaming(io.BytesIO(source) if isinstance(source, bytes) else source, keep)
+    return decode_clusters(ea, float_factory, decode_ethernet, decode_flexray)
+
+
+def _load_parallel(file, index, clusters, processes, float_factory, decode_ethernet, decode_flexray):
+    # type: (typing.Any, ArxmlIndex, typing.Sequence[str], int, _FloatFactory, bool, bool) -> canmatrix.cancluster.CanCluster
+    """Decode every cluster in a worker process, see `load`."""
+    if isinstance(file, str):
+        source = file  # type: typing.Union[str, bytes]
+    elif os.path.isfile(getattr(file, "name", "")):
+        source = file.name
+    else:
+        file.seek(0)
+        source = file.read()
+    # same order as decode_clusters
+    order = {"ETHERNET-CLUSTER": 0, "FLEXRAY-CLUSTER": 1}
+    clusters = sorted(clusters, key=lambda cluster: order.get(index.elements[cluster], 2))
+    tasks = [(source, index.closure([cluster]), float_factory, decode_ethernet, decode_flexray) for cluster in clusters]
+    pool = multiprocessing.Pool(min(processes, len(tasks)))
+    try:
+        decoded = pool.starmap(_decode_streamed_clusters, tasks)
+    finally:
+        pool.close()
+        pool.join()
+    result = {}
+    for matrices in decoded:
+        result.update(matrices)
+    result = canmatrix.cancluster.CanCluster(result)
+
+    pdu_gateway_mappings = []  # type: typing.List[typing.Dict[str, str]]
+    signal_gateway_mappings = []  # type: typing.List[typing.Dict[str, str]]
+    gateways = index.find(["GATEWAY"])
+    if gateways:
+        ea = Earxml()
+        ea.open_streaming(io.BytesIO(source) if isinstance(source, bytes) else source, index.closure(gateways))
+        pdu_gateway_mappings, signal_gateway_mappings = get_gateway_mappings(ea)
+    result.pdu_gateway(pdu_gateway_mappings)
+    result.signal_gateway(signal_gateway_mappings)
+    return result
+
+
+def load(file, **options):
+    # type: (typing.IO, **typing.Any) -> typing.Dict[str, canmatrix.CanMatrix]
+
+    float_factory = options.get("float_factory", default_float_factory)  # type: typing.Callable
+    ignore_cluster_info = options.get("arxmlIgnoreClusterInfo", False)
+
+    decode_ethernet = options.get("decode_ethernet", False)
+    decode_flexray = options.get("decode_flexray", False)
+    processes = options.get("arxmlProcesses", 0)
+
+    logger.debug("Read arxml ...")
+
+    ea = Earxml()
+    if options.get("arxmlStreaming", False) or processes:
+        index = ArxmlIndex.build(file)
+        cluster_tags = ["CAN-CLUSTER", "J-1939-CLUSTER"]
+        if decode_flexray:
+            cluster_tags.append("FLEXRAY-CLUSTER")
+        if decode_ethernet:
+            cluster_tags.append("ETHERNET-CLUSTER")
+        cluster_names = options.get("arxmlClusters")
+        selected = index.find(cluster_tags, cluster_names)
+        com_module = index.element_of("/ActiveEcuC/Com")
+        if processes and len(selected) > 1 and not ignore_cluster_info and com_module is None:
+            logger.debug("Decode %d clusters in %d processes", len(selected), processes)
+            return _load_parallel(file, index, selected, processes, float_factory, decode_ethernet, decode_flexray)
+    if options.get("arxmlStreaming", False):
+        if not cluster_names:
+            # gateways reference the triggerings of all clusters they map
+            selected += index.find(["GATEWAY"])
+        keep = index.closure(selected)
+        if com_module is not None:
+            keep.add(com_module)
+        logger.debug("%d of %d packaged elements needed for %d clusters",
+                     len(keep), len(index.elements), len(selected))
+        if hasattr(file, "seek"):
+            file.seek(0)
+        ea.open_streaming(file, keep)
+    else:
+        if processes and hasattr(file, "seek"):
+            file.seek(0)
+        ea.open(file)
+
+    com_module = ea.get_short_name_path("/ActiveEcuC/Com")
+
+    if com_module is not None and len(com_module) > 0:
+        logger.info("seems to be a ECUC arxml. Very limited support for extracting canmatrix.")
+        return extract_cm_from_ecuc(com_module, ea)
+
+    logger.debug("%d frames in arxml...", get_frames_nb(ea))
+    logger.debug("%d can-frame-triggering in arxml...", get_can_trigger_nb(ea))
+
+    logger.debug("%d SIGNAL-TO-PDU-MAPPINGS in arxml...", get_sig_pdu_map_nb(ea))
+
+    logger.debug("%d I-SIGNAL-TO-I-PDU-MAPPING in arxml...", get_sig_ipdu_nb(ea))
+
+    result = canmatrix.cancluster.CanCluster(
+        decode_clusters(ea, float_factory, decode_ethernet, decode_flexray, ignore_cluster_info))
+
+    pdu_gateway_mappings, signal_gateway_mappings = get_gateway_mappings(ea)
+    result.pdu_gateway(pdu_gateway_mappings)
     result.signal_gateway(signal_gateway_mappings)
 
     return result
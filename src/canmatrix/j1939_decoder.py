@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+import collections
+import time
+import typing
 from builtins import *
 
 import attr
 
+import canmatrix.cache
 import canmatrix.formats
 
 try:
@@ -12,91 +16,279 @@ try:
 except ImportError:
     from pkgutil import get_data as read_binary
 
+# J1939-21 transport protocol
+TP_CM_PGN = 0xEC00  # connection management
+TP_DT_PGN = 0xEB00  # data transfer
+TP_MAX_SIZE = 1785  # 255 packets * 7 bytes
+ADDRESS_CLAIMED_PGN = 0xEE00
+
+# control bytes of TP.CM
+TP_CM_RTS = 16
+TP_CM_CTS = 17
+TP_CM_END_OF_MSG_ACK = 19
+TP_CM_BAM = 32
+TP_CM_ABORT = 255
+
+# events of TransportReassembler.process
+BAM = "BAM"
+RTS = "RTS"
+CTS = "CTS"
+DATA = "DATA"
+COMPLETE = "COMPLETE"
+ACK = "ACK"
+ABORT = "ABORT"
+
+
+@attr.s(eq=False)
+class TransportSession(object):
+    """
+    A J1939 transport protocol session: one multi packet message in reassembly.
+
+    The payload buffer is preallocated for all packets, packets are copied into it at their position.
+    """
+    source = attr.ib()  # type: int
+    destination = attr.ib()  # type: int
+    pgn = attr.ib()  # type: int
+    size = attr.ib()  # type: int
+    is_broadcast = attr.ib()  # type: bool
+    timestamp = attr.ib()  # type: float
+    packets = attr.ib(init=False)  # type: int
+    data = attr.ib(init=False)  # type: bytearray
+    received = attr.ib(init=False, default=0)  # type: int  # bit mask of received packets
+    received_count = attr.ib(init=False, default=0)  # type: int
+    next_packet = attr.ib(init=False, default=1)  # type: int
+
+    def __attrs_post_init__(self):
+        self.packets = (self.size + 6) // 7
+        self.data = bytearray(self.packets * 7)
+
+    def add_packet(self, data):  # type: (typing.Sequence[int]) -> None
+        """Store a TP.DT packet.
+
+        Broadcast (BAM) packets are stored in arrival order (BAM is sent in sequence without retransmission),
+        packets of RTS/CTS sessions at the position of their sequence number. Invalid sequence numbers are ignored.
+
+        :param data: TP.DT payload, sequence number followed by 7 data bytes
+        """
+        if self.is_broadcast:
+            index = self.received_count
+        else:
+            index = data[0] - 1
+        if not 0 <= index < self.packets or self.received & (1 << index):
+            return
+        self.data[index * 7:index * 7 + 7] = bytes(data[1:8]).ljust(7, b"\xFF")
+        self.received |= 1 << index
+        self.received_count += 1
+        self.next_packet = index + 2
+
+    @property
+    def complete(self):  # type: () -> bool
+        """All packets received."""
+        return self.received_count == self.packets
+
+    @property
+    def payload(self):  # type: () -> memoryview
+        """Reassembled payload (view into the session buffer)."""
+        return memoryview(self.data)[:self.size]
+
+
+@attr.s(eq=False)
+class TransportReassembler(object):
+    """
+    Reassembles J1939 transport protocol messages (BAM and RTS/CTS) of many concurrent sessions.
+
+    Sessions are identified by (source, destination, PGN), destination is 0xFF for BAM. A source can only
+    have one session per destination, a new BAM or RTS replaces a running one.
+    Sessions without traffic for timeout seconds are dropped. If max_sessions are running, the least
+    recently active session is dropped for a new one.
+    """
+    timeout = attr.ib(default=1.25)  # type: float  # J1939-21 T2/T3, the largest TP timeout
+    max_sessions = attr.ib(default=64)  # type: int
+    # (source, destination, pgn) -> session, least recently active first
+    sessions = attr.ib(init=False, factory=collections.OrderedDict)  # type: typing.MutableMapping[typing.Tuple[int, int, int], TransportSession]
+    # (source, destination) -> (source, destination, pgn)
+    _links = attr.ib(init=False, factory=dict)  # type: typing.Dict[typing.Tuple[int, int], typing.Tuple[int, int, int]]
+
+    def _remove(self, key):  # type: (typing.Tuple[int, int, int]) -> typing.Optional[TransportSession]
+        session = self.sessions.pop(key, None)
+        if session is not None:
+            self._links.pop(key[:2], None)
+        return session
+
+    def expire(self, now):  # type: (float) -> None
+        """Drop all sessions without traffic since now - timeout."""
+        while self.sessions:
+            key, session = next(iter(self.sessions.items()))
+            if session.timestamp + self.timeout >= now:
+                break
+            self._remove(key)
+
+    def _session(self, source, destination, pgn):
+        # type: (int, int, int) -> typing.Optional[typing.Tuple[typing.Tuple[int, int, int], TransportSession]]
+        for key in ((source, destination, pgn), (destination, source, pgn)):
+            session = self.sessions.get(key)
+            if session is not None:
+                return key, session
+        return None
+
+    def process(self, arbitration_id, data, timestamp=None):
+        # type: (canmatrix.ArbitrationId, typing.Sequence[int], typing.Optional[float]) -> typing.Tuple[typing.Optional[str], typing.Optional[TransportSession]]
+        """Process a received message.
+
+        :param arbitration_id: arbitration id of the message
+        :param data: payload of the message
+        :param timestamp: receive time in seconds (e.g. of the trace), default is the current time
+        :return: (event, session): event is one of BAM, RTS, CTS, DATA, COMPLETE, ACK, ABORT
+            or None if the message is no transport protocol message or doesn't belong to a session
+        """
+        if not arbitration_id.extended:
+            return None, None
+        pgn = arbitration_id.pgn
+        if pgn != TP_CM_PGN and pgn != TP_DT_PGN or len(data) < 8:
+            return None, None
+        now = time.monotonic() if timestamp is None else timestamp
+        self.expire(now)
+        source = arbitration_id.id & 0xFF
+        destination = (arbitration_id.id >> 8) & 0xFF
+
+        if pgn == TP_DT_PGN:
+            key = self._links.get((source, destination))
+            if key is None:
+                return None, None
+            session = self.sessions[key]
+            session.add_packet(data)
+            if not session.complete:
+                session.timestamp = now
+                self.sessions.move_to_end(key)
+                return DATA, session
+            self._remove(key)
+            return COMPLETE, session
+
+        control = data[0]
+        transferred_pgn = data[5] | (data[6] << 8) | (data[7] << 16)
+        if control in (TP_CM_BAM, TP_CM_RTS):
+            size = data[1] | (data[2] << 8)
+            if size > TP_MAX_SIZE:
+                return None, None
+            key = (source, destination, transferred_pgn)
+            self._remove(key)
+            replaced = self._links.get((source, destination))
+            if replaced is not None:
+                self._remove(replaced)
+            while len(self.sessions) >= self.max_sessions:
+                self._remove(next(iter(self.sessions)))
+            session = TransportSession(source, destination, transferred_pgn, size, control == TP_CM_BAM, now)
+            self.sessions[key] = session
+            self._links[(source, destination)] = key
+            return (BAM if session.is_broadcast else RTS), session
+
+        found = self._session(source, destination, transferred_pgn)
+        if found is None:
+            return None, None
+        key, session = found
+        if control == TP_CM_CTS:
+            if data[1]:
+                session.next_packet = data[2]
+            session.timestamp = now
+            self.sessions.move_to_end(key)
+            return CTS, session
+        elif control == TP_CM_END_OF_MSG_ACK:
+            self._remove(key)
+            return ACK, session
+        elif control == TP_CM_ABORT:
+            self._remove(key)
+            return ABORT, session
+        return None, None
+
+
+_j1939_db = None  # type: typing.Optional[canmatrix.CanMatrix]
+
+
+def j1939_dbc():  # type: () -> bytes
+    """Get the bundled j1939.dbc."""
+    return read_binary(__name__.rpartition('.')[0], "j1939.dbc")
+
+
+def load_j1939_db():  # type: () -> canmatrix.CanMatrix
+    """Get the matrix of the bundled j1939.dbc.
+
+    The dbc is parsed on the first call only. The parsed matrix is kept in the on disk cache
+    (see `canmatrix.cache`), so later processes just unpickle it.
+    """
+    global _j1939_db
+    if _j1939_db is None:
+        db = canmatrix.cache.load("j1939")
+        if not isinstance(db, canmatrix.CanMatrix):
+            db = canmatrix.formats.loads_flat(j1939_dbc(), import_type="dbc", dbcImportEncoding="utf8")
+            canmatrix.cache.store("j1939", db)
+        _j1939_db = db
+    return _j1939_db
+
+
+class _LazyAttribute(object):
+    """Class attribute computed on first access."""
+
+    def __init__(self, function):  # type: (typing.Callable[[], typing.Any]) -> None
+        self.function = function
+
+    def __get__(self, instance, owner):  # type: (typing.Any, typing.Any) -> typing.Any
+        return self.function()
+
 
 @attr.s
 class j1939_decoder(object):
-    string = read_binary(__name__.rpartition('.')[0], "j1939.dbc")
-    j1939_db = canmatrix.formats.loads_flat(
-        string, import_type="dbc", dbcImportEncoding="utf8"
-    )
-    length = attr.ib(default=0)  # type: int
-    count_succesive_frames = attr.ib(default=0)  # type: int
-    transfered_pgn = attr.ib(default=0)  # type: int
-    _data = attr.ib(init=False, default=bytearray())
-
-    def decode(self, arbitration_id, can_data, matrix = None):
+    string = _LazyAttribute(j1939_dbc)
+    j1939_db = _LazyAttribute(load_j1939_db)
+    transport = attr.ib(factory=TransportReassembler)  # type: TransportReassembler
+
+    def _decode_transported(self, session, matrix):
+        # type: (TransportSession, typing.Optional[canmatrix.CanMatrix]) -> typing.Mapping[str, typing.Any]
+        frame = matrix.frame_by_pgn(session.pgn, session.source) if matrix is not None else None
+        if frame is None:
+            frame = self.j1939_db.frame_by_pgn(session.pgn, session.source)
+        if frame is None:
+            return {}
+        # decode straight from the session buffer
+        return frame.decode(session.data, 0, session.size, allow_truncated=True, allow_exceeded=True)
+
+    def decode(self, arbitration_id, can_data, matrix = None, timestamp = None):
+        pgn = arbitration_id.pgn
+        source = arbitration_id.id & 0xFF
         if matrix is not None:
-            frame = matrix.frame_by_pgn(arbitration_id.pgn)
-        else:
-            frame = None
+            frame = matrix.frame_by_pgn(pgn, source)
+            if frame is not None:
+                return ("regular " + frame.name, frame.decode(can_data))
+
+        if pgn == TP_CM_PGN or pgn == TP_DT_PGN:
+            event, session = self.transport.process(arbitration_id, can_data, timestamp)
+            if event == BAM:
+                return ("BAM          ", {})
+            elif event == RTS:
+                return ("RTS          ", {})
+            elif event == CTS:
+                return ("CTS          ", {})
+            elif event == ACK:
+                return ("ACK          ", {})
+            elif event == ABORT:
+                return ("Connection Abort", {})
+            elif event == DATA:
+                return ("BAM data     " if session.is_broadcast else "RTS data     ", {})
+            elif event == COMPLETE:
+                return (
+                    "BAM last data" if session.is_broadcast else "RTS last data",
+                    self._decode_transported(session, matrix)
+                )
+            return ("", {})
+
+        frame = self.j1939_db.frame_by_id(arbitration_id) or self.j1939_db.frame_by_pgn(pgn, source)
         if frame is not None:
-            return ("regular " + frame.name, frame.decode(can_data))
-        elif self.j1939_db.frame_by_pgn(arbitration_id.pgn) is not None:
-            signals = self.j1939_db.decode(arbitration_id,can_data)
-            frame_name = self.j1939_db.frame_by_pgn(arbitration_id.pgn).name
-            return ("J1939 known: " + frame_name, signals)
-
-        elif arbitration_id.pgn == canmatrix.ArbitrationId.from_pgn(0xECFF).pgn and can_data[0] == 32:
-            # BAM detected
-            self.length = (int(can_data[2]) << 8) + int(can_data[1])
-            self.count_succesive_frames = int(can_data[3])
-            self.transfered_pgn = (int(can_data[7]) << 16) + (int(can_data[6]) << 8) + int(can_data[5])
-            self.bytes_left = self.length
-            self._data = bytearray()
-            return ("BAM          ", {})
-
-        elif arbitration_id.pgn == canmatrix.ArbitrationId.from_pgn(0xECFF).pgn and can_data[0] == 16:
-            # RTS detected
-            self.length = (int(can_data[2]) << 8) + int(can_data[1])
-            self.count_of_packets = int(can_data[3])
-            self.total_count_of_packet_sent = int(can_data[4])
-            self.transfered_pgn = (int(can_data[7]) << 16) + (int(can_data[6]) << 8) + int(can_data[5])
-            return ("ERROR - decoding RTS not yet implemented")
-
-        elif arbitration_id.pgn == canmatrix.ArbitrationId.from_pgn(0xECFF).pgn and can_data[0] == 17:
-            # CTS detected
-            self.max_packets_at_once = can_data[1]
-            self.sequence_number_to_start = can_data[2]
-            self.transfered_pgn = (int(can_data[7]) << 16) + (int(can_data[6]) << 8) + int(can_data[5])
-            return ("ERROR - decoding CTS not yet implemented")
-
-        elif arbitration_id.pgn == canmatrix.ArbitrationId.from_pgn(0xECFF).pgn and can_data[0] == 19:
-            # ACK detected
-            self.message_size = (int(can_data[2]) << 8) + int(can_data[1])
-            self.count_of_packets = int(can_data[3])
-            self.transfered_pgn = (int(can_data[7]) << 16) + (int(can_data[6]) << 8) + int(can_data[5])
-            return ("ERROR - decoding ACK not yet implemented")
-
-        elif arbitration_id.pgn == canmatrix.ArbitrationId.from_pgn(0xECFF).pgn and can_data[0] == 255:
-            # Connection Abort
-            self.abort_reason = can_data[1]
-            self.transfered_pgn = (int(can_data[7]) << 16) + (int(can_data[6]) << 8) + int(can_data[5])
-            return ("ERROR - decoding Connection Abbort not yet implemented")
-
-
-        elif arbitration_id.pgn == canmatrix.ArbitrationId.from_pgn(0xEEFF).pgn:
+            return ("J1939 known: " + frame.name, frame.decode(can_data))
+
+        elif pgn == ADDRESS_CLAIMED_PGN:
             #Address Claimed
             #arbitration_id.j1939_source
             #name in can_data[0:8]
             return ("ERROR - address claim detected not yet implemented")
             pass
 
-        elif arbitration_id.pgn == canmatrix.ArbitrationId.from_pgn(0xEBFF).pgn:
-            # transfer data
-            self._data = self._data + can_data[1:min(8, self.bytes_left + 1)]
-            self.bytes_left = max(self.bytes_left - 7, 0)
-
-            if self.count_succesive_frames == 0:
-                #print(self._data)
-                frame = matrix.frame_by_pgn(self.transfered_pgn)
-                if frame is not None:
-                    signals = frame.decode(self._data)
-                    return ("BAM last data", signals)
-                return ("BAM last data", {})
-            else:
-                self.count_succesive_frames -= 1
-                return ("BAM data     ", {})
         return ("",{})
-
-
-
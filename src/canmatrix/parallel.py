@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2013, Eduard Broecker
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that
+# the following conditions are met:
+#
+#    Redistributions of source code must retain the above copyright notice, this list of conditions and the
+#    following disclaimer.
+#    Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+#    following disclaimer in the documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED
+# WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH
+# DAMAGE.
+
+
+# Parallel decoding of large traces
+#
+# The trace is split into chunks which are decoded by a pool of worker processes.
+# Every worker receives a compact pickled copy of the matrix once (at start), so
+# the matrix file is not parsed again. Results are returned in the order of the
+# input stream.
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import copy
+import multiprocessing
+import pickle
+import typing
+from builtins import *
+
+import canmatrix.canmatrix
+
+_worker_matrix = None  # type: typing.Optional[canmatrix.canmatrix.CanMatrix]
+
+# (timestamp, arbitration id, frame name, {signal name: value})
+DecodedTuple = typing.Tuple[typing.Any, typing.Any, typing.Optional[str], typing.Optional[typing.Dict[str, typing.Any]]]
+
+
+def _compact_signal(signal):  # type: (canmatrix.Signal) -> canmatrix.Signal
+    compact = copy.copy(signal)
+    compact.comment = None
+    compact.comments = {}
+    compact.attributes = {}
+    compact.receivers = []
+    return compact
+
+
+def compact_matrix(matrix):  # type: (canmatrix.CanMatrix) -> canmatrix.CanMatrix
+    """Get a copy of the matrix which only contains what is needed for decoding.
+
+    Comments, attributes, ecus, defines and signal groups are dropped, value tables are kept.
+
+    :param matrix: matrix to copy
+    :return: compact matrix
+    """
+    compact = canmatrix.canmatrix.CanMatrix(type=matrix.type)
+    for frame in matrix.frames:
+        compact_frame = copy.copy(frame)
+        compact_frame.comment = ""
+        compact_frame.attributes = {}
+        compact_frame.transmitters = []
+        compact_frame.receivers = []
+        compact_frame.signalGroups = []
+        compact_frame.signals = [_compact_signal(signal) for signal in frame.signals]
+        compact_frame.pdus = []
+        for pdu in frame.pdus:
+            compact_pdu = copy.copy(pdu)
+            compact_pdu.signals = [_compact_signal(signal) for signal in pdu.signals]
+            compact_frame.pdus.append(compact_pdu)
+        compact.frames.append(compact_frame)
+    return compact
+
+
+def parse_candump_line(line):  # type: (str) -> typing.Optional[typing.Tuple[float, int, bytes]]
+    """Parse one line of a candump log file, e.g. ``(1436509052.249713) vcan0 12345678#1122334455667788``.
+
+    Ids with more than 3 hex digits are extended ids. CAN FD frames (``123##1AABB``) are supported.
+
+    :param line: log line
+    :return: (timestamp, compound arbitration id, data) or None for lines which are no data frames
+    """
+    fields = line.split()
+    if len(fields) < 3 or not fields[0].startswith("("):
+        return None
+    can_id, _, data = fields[2].partition("#")
+    if data.startswith("R"):
+        return None
+    if data.startswith("#"):
+        # CAN FD: flags nibble follows the separator
+        data = data[2:]
+    try:
+        arbitration_id = int(can_id, 16)
+        if len(can_id) > 3:
+            arbitration_id |= canmatrix.canmatrix.ArbitrationId.compound_extended_mask
+        return float(fields[0][1:-1]), arbitration_id, bytes(bytearray.fromhex(data))
+    except ValueError:
+        return None
+
+
+def format_decoded(timestamp, arbitration_id, frame_name, values):
+    # type: (typing.Any, int, typing.Optional[str], typing.Optional[typing.Mapping[str, typing.Any]]) -> str
+    """Format a decoded message as one output line."""
+    signals = " ".join("{}={}".format(name, value) for name, value in sorted((values or {}).items()))
+    return "({:.6f}) {} {}\n".format(timestamp, frame_name, signals)
+
+
+def _init_worker(matrix_data):  # type: (bytes) -> None
+    global _worker_matrix
+    _worker_matrix = pickle.loads(matrix_data)
+
+
+def _decode_chunk(chunk, parser, formatter, physical, options):
+    # type: (typing.List[typing.Any], typing.Optional[typing.Callable], typing.Optional[typing.Callable], bool, typing.Dict[str, typing.Any]) -> typing.List[typing.Any]
+    if parser is not None:
+        chunk = [message for message in map(parser, chunk) if message is not None]
+    results = []
+    for message in _worker_matrix.iter_decode(chunk, **options):
+        if not isinstance(message, canmatrix.canmatrix.DecodedMessage):
+            # result of an unknown_id callback
+            results.append(message)
+            continue
+        values = None
+        if message.signals is not None:
+            if physical:
+                values = {name: value.phys_value for name, value in message.signals.items()}
+            else:
+                values = {name: value.raw_value for name, value in message.signals.items()}
+        frame_name = message.frame.name if message.frame is not None else None
+        arbitration_id = message.arbitration_id
+        if not isinstance(arbitration_id, int):
+            arbitration_id = arbitration_id.to_compound_integer()
+        result = (message.timestamp, arbitration_id, frame_name, values)
+        results.append(formatter(*result) if formatter is not None else result)
+    return results
+
+
+def _chunks(messages, chunk_size):  # type: (typing.Iterable[typing.Any], int) -> typing.Iterator[typing.List[typing.Any]]
+    chunk = []
+    for message in messages:
+        chunk.append(message)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def decode_parallel(matrix, messages, processes=None, chunk_size=10000, physical=False,
+                    parser=None, formatter=None, **options):
+    # type: (canmatrix.CanMatrix, typing.Iterable[typing.Any], typing.Optional[int], int, bool, typing.Optional[typing.Callable], typing.Optional[typing.Callable], **typing.Any) -> typing.Iterator[typing.Any]
+    """Decode a stream of raw messages in a pool of worker processes.
+
+    The stream is read lazily in chunks of chunk_size messages, at most two chunks per process are
+    in flight. The decoded messages are returned in the order of the input stream, so a
+    (timestamp ordered) trace gives timestamp ordered results.
+
+    Results are plain tuples (timestamp, arbitration id, frame name, {signal name: value}) to keep the
+    transfer between the processes cheap. The arbitration id is given as compound integer,
+    frame name and values are None for unknown ids, values are None for messages with wrong length
+    if wrong_length is "yield".
+
+    parser, formatter and the options have to be picklable (module level functions).
+
+    :param matrix: matrix to decode with
+    :param messages: iterable of (timestamp, arbitration id, data) or of items for parser
+    :param processes: number of worker processes, default is the number of CPUs
+    :param chunk_size: number of messages decoded by a worker at once
+    :param physical: return physical instead of raw values
+    :param parser: callable(item) -> (timestamp, arbitration id, data) or None to skip the item,
+        called in the workers for every item of messages
+    :param formatter: callable(timestamp, arbitration id, frame name, values) called in the workers,
+        its result is returned instead of the tuple
+    :param options: frames, signals, unknown_id and wrong_length, see `CanMatrix.iter_decode`
+    :return: generator of decoded messages
+    """
+    processes = processes or multiprocessing.cpu_count()
+    matrix_data = pickle.dumps(compact_matrix(matrix), pickle.HIGHEST_PROTOCOL)
+    pool = multiprocessing.Pool(processes, _init_worker, (matrix_data,))
+    try:
+        pending = collections.deque()  # type: typing.Deque[typing.Any]
+        for chunk in _chunks(messages, chunk_size):
+            pending.append(pool.apply_async(_decode_chunk, (chunk, parser, formatter, physical, options)))
+            if len(pending) >= 2 * processes:
+                for result in pending.popleft().get():
+                    yield result
+        while pending:
+            for result in pending.popleft().get():
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2013, Eduard Broecker
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that
+# the following conditions are met:
+#
+#    Redistributions of source code must retain the above copyright notice, this list of conditions and the
+#    following disclaimer.
+#    Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+#    following disclaimer in the documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED
+# WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+# PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR
+# OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH
+# DAMAGE.
+
+
+# Optional instrumentation of decoding and encoding
+#
+# Profiling is off by default and costs nothing then: `enable` replaces the decode and
+# encode methods of `Frame` by wrappers recording counts, time, errors and payload lengths
+# per frame, `disable` puts the original methods back.
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import importlib
+import time
+import typing
+from builtins import *
+
+import attr
+
+import canmatrix.canmatrix
+
+# the module itself (canmatrix.canmatrix is shadowed by the package re-exporting its names)
+_module = importlib.import_module("canmatrix.canmatrix")
+
+
+@attr.s
+class FrameStats(object):
+    """Counters of one frame."""
+
+    decode_count = attr.ib(default=0)  # type: int
+    decode_time = attr.ib(default=0.0)  # type: float  # seconds
+    encode_count = attr.ib(default=0)  # type: int
+    encode_time = attr.ib(default=0.0)  # type: float  # seconds
+    # exception class name or "mux_miss" (no signal selected by the multiplexer value) -> count
+    errors = attr.ib(factory=collections.Counter)  # type: typing.Counter[str]
+    # payload length -> count
+    lengths = attr.ib(factory=collections.Counter)  # type: typing.Counter[int]
+
+    def as_dict(self):  # type: () -> typing.Dict[str, typing.Any]
+        return {
+            "decode_count": self.decode_count,
+            "decode_time": self.decode_time,
+            "encode_count": self.encode_count,
+            "encode_time": self.encode_time,
+            "errors": dict(self.errors),
+            "lengths": dict(self.lengths),
+        }
+
+
+@attr.s
+class Profiler(object):
+    """
+    Decode and encode counters per frame name.
+
+    If a callback is given, it is called with `snapshot` at most every interval seconds
+    (checked when a message is recorded) and by `report`.
+    """
+
+    callback = attr.ib(default=None)  # type: typing.Optional[typing.Callable[[typing.Dict[str, typing.Any]], typing.Any]]
+    interval = attr.ib(default=10.0)  # type: float
+    frames = attr.ib(factory=dict)  # type: typing.Dict[str, FrameStats]
+    unknown_ids = attr.ib(factory=collections.Counter)  # type: typing.Counter[int]
+    _next_report = attr.ib(default=0.0)  # type: float
+
+    def stats(self, frame):  # type: (canmatrix.Frame) -> FrameStats
+        stats = self.frames.get(frame.name)
+        if stats is None:
+            stats = self.frames[frame.name] = FrameStats()
+        return stats
+
+    def record_decode(self, frame, duration, length, decoded):
+        # type: (canmatrix.Frame, float, int, typing.Any) -> None
+        stats = self.stats(frame)
+        stats.decode_count += 1
+        stats.decode_time += duration
+        stats.lengths[length] += 1
+        if decoded is not None and frame.is_multiplexed and not frame.is_pdu_container:
+            codec = frame.codec
+            # static signals (and the root multiplexer for complex multiplexing) only
+            minimum = len(codec.static_indices) + (1 if codec.complex_multiplexed else 0)
+            if isinstance(decoded, tuple):
+                selected = sum(value is not None for value in decoded)
+            else:
+                selected = len(decoded)
+            if selected <= minimum:
+                stats.errors["mux_miss"] += 1
+        self._check_report()
+
+    def record_encode(self, frame, duration):  # type: (canmatrix.Frame, float) -> None
+        stats = self.stats(frame)
+        stats.encode_count += 1
+        stats.encode_time += duration
+        self._check_report()
+
+    def record_error(self, frame, error, length=None):
+        # type: (canmatrix.Frame, typing.Union[str, Exception], typing.Optional[int]) -> None
+        """Count an error of a frame.
+
+        :param frame: frame
+        :param error: exception or error name
+        :param length: payload length, counted in the length histogram if given
+        """
+        stats = self.stats(frame)
+        stats.errors[error if isinstance(error, str) else type(error).__name__] += 1
+        if length is not None:
+            stats.lengths[length] += 1
+        self._check_report()
+
+    def record_unknown_id(self, arbitration_id):  # type: (typing.Union[int, canmatrix.ArbitrationId]) -> None
+        """Count a message without frame.
+
+        :param arbitration_id: ArbitrationId or compound integer
+        """
+        if not isinstance(arbitration_id, int):
+            arbitration_id = arbitration_id.to_compound_integer()
+        self.unknown_ids[arbitration_id] += 1
+        self._check_report()
+
+    def _check_report(self):  # type: () -> None
+        if self.callback is not None:
+            now = time.monotonic()
+            if now >= self._next_report:
+                self._next_report = now + self.interval
+                self.callback(self.snapshot())
+
+    def report(self):  # type: () -> None
+        """Call the callback with the current snapshot."""
+        if self.callback is not None:
+            self._next_report = time.monotonic() + self.interval
+            self.callback(self.snapshot())
+
+    def snapshot(self):  # type: () -> typing.Dict[str, typing.Any]
+        """Get all counters as dictionary (of builtin types only).
+
+        :return: {"frames": {frame name: {"decode_count", "decode_time", "encode_count", "encode_time",
+            "errors": {error: count}, "lengths": {payload length: count}}}, "unknown_ids": {compound id: count}}
+        """
+        return {
+            "frames": {name: stats.as_dict() for name, stats in self.frames.items()},
+            "unknown_ids": dict(self.unknown_ids),
+        }
+
+    def reset(self):  # type: () -> None
+        """Clear all counters."""
+        self.frames.clear()
+        self.unknown_ids.clear()
+
+
+_originals = {}  # type: typing.Dict[str, typing.Any]
+
+
+def _payload_length(data, offset, length):  # type: (typing.Any, int, typing.Optional[int]) -> int
+    return len(data) - offset if length is None else length
+
+
+def _profiled_methods(profiler):  # type: (Profiler) -> typing.Dict[str, typing.Any]
+    decode = _originals["decode"]
+    decode_values = _originals["decode_values"]
+    encode = _originals["encode"]
+    encode_values = _originals["encode_values"]
+    clock = time.perf_counter
+
+    def profiled_decode(self, data, offset=0, length=None, allow_truncated=False, allow_exceeded=False):
+        start = clock()
+        try:
+            decoded = decode(self, data, offset, length, allow_truncated, allow_exceeded)
+        except Exception as error:
+            profiler.record_error(self, error, _payload_length(data, offset, length))
+            raise
+        profiler.record_decode(self, clock() - start, _payload_length(data, offset, length), decoded)
+        return decoded
+
+    def profiled_decode_values(self, data, mode="phys", as_tuple=False, offset=0, length=None,
+                               allow_truncated=False, allow_exceeded=False):
+        start = clock()
+        try:
+            decoded = decode_values(self, data, mode, as_tuple, offset, length, allow_truncated, allow_exceeded)
+        except Exception as error:
+            profiler.record_error(self, error, _payload_length(data, offset, length))
+            raise
+        profiler.record_decode(self, clock() - start, _payload_length(data, offset, length), decoded)
+        return decoded
+
+    def profiled_encode(self, data=None):
+        start = clock()
+        try:
+            encoded = encode(self, data)
+        except Exception as error:
+            profiler.record_error(self, error)
+            raise
+        profiler.record_encode(self, clock() - start)
+        return encoded
+
+    def profiled_encode_values(self, data, mode="phys", range_policy="clamp", violations=None):
+        start = clock()
+        try:
+            encoded = encode_values(self, data, mode, range_policy, violations)
+        except Exception as error:
+            profiler.record_error(self, error)
+            raise
+        profiler.record_encode(self, clock() - start)
+        return encoded
+
+    methods = {
+        "decode": profiled_decode,
+        "decode_values": profiled_decode_values,
+        "encode": profiled_encode,
+        "encode_values": profiled_encode_values,
+    }
+    for name, method in methods.items():
+        method.__doc__ = _originals[name].__doc__
+        method.__name__ = _originals[name].__name__
+    return methods
+
+
+def enable(callback=None, interval=10.0):
+    # type: (typing.Optional[typing.Callable[[typing.Dict[str, typing.Any]], typing.Any]], float) -> Profiler
+    """Start profiling decoding and encoding of all frames.
+
+    A running profiling is replaced by a new one.
+
+    :param callback: callable(snapshot) called at most every interval seconds, see `Profiler`
+    :param float interval: minimal time between two callback calls in seconds
+    :return: the new profiler
+    """
+    disable()
+    for name in ("decode", "decode_values", "encode", "encode_values"):
+        _originals[name] = _module.Frame.__dict__[name]
+    profiler = Profiler(callback=callback, interval=interval)
+    for name, method in _profiled_methods(profiler).items():
+        setattr(_module.Frame, name, method)
+    _module._profiler = profiler
+    return profiler
+
+
+def disable():  # type: () -> typing.Optional[Profiler]
+    """Stop profiling and restore the original methods.
+
+    :return: the profiler of the stopped profiling (with its counters) or None if profiling was not enabled
+    """
+    profiler = _module._profiler
+    for name, method in _originals.items():
+        setattr(_module.Frame, name, method)
+    _originals.clear()
+    _module._profiler = None
+    return profiler
+
+
+def snapshot():  # type: () -> typing.Dict[str, typing.Any]
+    """Get the counters of the running profiling, see `Profiler.snapshot` (empty if profiling is not enabled)."""
+    profiler = _module._profiler
+    if profiler is None:
+        return {}
+    return profiler.snapshot()
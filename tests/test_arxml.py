@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 import canmatrix.formats.arxml
+import copy
 import decimal
+import io
+
+import lxml.etree
 
 try:
     from pathlib import Path
@@ -50,3 +54,116 @@ def test_decode_compu_method_1():
     assert values == {'0': 'no trailer detected', '1': 'trailer detected'}
     assert factor == 42
     assert offset == 17
+
+
+def test_streaming_load():
+    test_file = "tests/files/arxml/ARXMLContainerTest.arxml"
+    index = canmatrix.formats.arxml.ArxmlIndex.build(test_file)
+    clusters = index.find(["CAN-CLUSTER"])
+    assert [cluster.rpartition("/")[2] for cluster in clusters] == ["New_CanCluster"]
+    keep = index.closure(clusters)
+    assert clusters[0] in keep
+    assert len(keep) < len(index.elements)
+
+    matrix = canmatrix.formats.arxml.load(test_file)
+    streamed = canmatrix.formats.arxml.load(test_file, arxmlStreaming=True)
+    assert list(streamed) == list(matrix)
+    frame = matrix["New_CanCluster"].frames[0]
+    streamed_frame = streamed["New_CanCluster"].frames[0]
+    assert streamed_frame.name == frame.name
+    assert [signal.name for signal in streamed_frame.signals] == [signal.name for signal in frame.signals]
+    assert [pdu.name for pdu in streamed_frame.pdus] == [pdu.name for pdu in frame.pdus]
+
+    assert dict(canmatrix.formats.arxml.load(test_file, arxmlStreaming=True, arxmlClusters=["unknown"])) == {}
+
+
+def test_streaming_load_ecu_extract():
+    test_file = "tests/files/arxml/MyECU.ecuc.arxml"
+    db = canmatrix.formats.arxml.load(test_file, arxmlStreaming=True)['']
+    assert len(db.frames) == 2
+
+
+def test_parallel_load(tmp_path):
+    # second cluster: a copy of the first one
+    tree = lxml.etree.parse("tests/files/arxml/ARXMLContainerTest.arxml")
+    cluster = tree.find(".//{*}CAN-CLUSTER")
+    second_cluster = copy.deepcopy(cluster)
+    second_cluster.find("{*}SHORT-NAME").text += "_copy"
+    cluster.addnext(second_cluster)
+    test_file = str(tmp_path / "two_clusters.arxml")
+    tree.write(test_file)
+
+    sequential = canmatrix.formats.arxml.load(test_file)
+    parallel = canmatrix.formats.arxml.load(test_file, arxmlProcesses=2)
+    assert len(sequential) == 2
+    assert sorted(parallel) == sorted(sequential)
+    for name in sequential:
+        assert sequential[name].frames
+        assert [frame.name for frame in parallel[name]] == [frame.name for frame in sequential[name]]
+        assert [signal.name for frame in parallel[name] for signal in frame] == \
+            [signal.name for frame in sequential[name] for signal in frame]
+        parallel_dbc, sequential_dbc = io.BytesIO(), io.BytesIO()
+        canmatrix.formats.dump(parallel[name], parallel_dbc, "dbc")
+        canmatrix.formats.dump(sequential[name], sequential_dbc, "dbc")
+        assert parallel_dbc.getvalue() == sequential_dbc.getvalue()
+
+
+def test_frame_triggered_twice(tmp_path):
+    # second cluster triggers the same frames with other ids
+    tree = lxml.etree.parse("tests/files/arxml/ARXMLContainerTest.arxml")
+    cluster = tree.find(".//{*}CAN-CLUSTER")
+    second_cluster = copy.deepcopy(cluster)
+    second_cluster.find("{*}SHORT-NAME").text += "_copy"
+    for identifier in second_cluster.iterfind(".//{*}CAN-FRAME-TRIGGERING/{*}IDENTIFIER"):
+        identifier.text = str(int(identifier.text, 0) + 0x100)
+    cluster.addnext(second_cluster)
+    test_file = str(tmp_path / "two_clusters.arxml")
+    tree.write(test_file)
+
+    matrix = canmatrix.formats.arxml.load(test_file)
+    first, second = matrix["New_CanCluster"], matrix["New_CanCluster_copy"]
+    assert [frame.name for frame in first] == [frame.name for frame in second]
+    for first_frame, second_frame in zip(first, second):
+        assert second_frame.arbitration_id.id == first_frame.arbitration_id.id + 0x100
+        assert second_frame.attributes == first_frame.attributes
+        for first_signal, second_signal in zip(first_frame, second_frame):
+            assert first_signal is not second_signal
+            assert first_signal.attributes is not second_signal.attributes
+            assert (first_signal.name, first_signal.start_bit, first_signal.size, first_signal.values) == \
+                (second_signal.name, second_signal.start_bit, second_signal.size, second_signal.values)
+        for first_pdu, second_pdu in zip(first_frame.pdus, second_frame.pdus):
+            assert [signal.name for signal in first_pdu.signals] == [signal.name for signal in second_pdu.signals]
+            assert not set(map(id, first_pdu.signals)) & set(map(id, second_pdu.signals))
+
+
+def test_earxml_caches():
+    ea = canmatrix.formats.arxml.Earxml()
+    ea.open("tests/files/arxml/ARXMLContainerTest.arxml")
+    root_triggerings = ea.root.findall(".//" + ea.ns + "CAN-FRAME-TRIGGERING")
+    assert ea.findall("CAN-FRAME-TRIGGERING") == root_triggerings
+    assert ea.find("CAN-FRAME-TRIGGERING") is root_triggerings[0]
+    assert ea.find("UNKNOWN-TAG") is None
+
+    triggering = root_triggerings[0]
+    path = ea.get_short_name_path_of_element(triggering)
+    assert ea.get_short_name_path(path) is triggering
+    reference = ea.find("FRAME-REF", triggering)
+    assert ea.get_short_name_path_of_element(reference) == path
+    assert ea.get_referencable_parent(reference) is triggering
+    assert ea.get_element_name(triggering) == path.rpartition("/")[2]
+
+
+def test_selector():
+    assert canmatrix.formats.arxml.compile_selector(">>FRAME-PORT-REF/COMMUNICATION-DIRECTION:IN/..") == [
+        (">>", "FRAME-PORT-REF"), ("/", "COMMUNICATION-DIRECTION"), (":", "IN"), ("/", "..")]
+    assert canmatrix.formats.arxml.compile_selector("IGNORED#A|B") == [("#", ("A", "B"))]
+
+    ea = canmatrix.formats.arxml.Earxml()
+    ea.open("tests/files/arxml/ARXMLContainerTest.arxml")
+    triggerings = ea.selector(ea.root, "//CAN-PHYSICAL-CHANNEL//CAN-FRAME-TRIGGERING")
+    assert triggerings == ea.findall("CAN-FRAME-TRIGGERING")
+    frames = ea.selector(ea.root, "//CAN-FRAME-TRIGGERING>FRAME-REF")
+    assert frames == [ea.follow_ref(triggering, "FRAME-REF") for triggering in triggerings]
+    assert ea.selector(frames[0], "<<CAN-FRAME-TRIGGERING") == [triggerings[0]]
+    name = ea.get_short_name(triggerings[0])
+    assert ea.selector(ea.root, "//CAN-FRAME-TRIGGERING#" + name) == [triggerings[0]]
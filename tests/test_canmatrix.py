@@ -296,6 +296,24 @@ def test_signal_encode_named_value(some_signal):
     assert some_signal.phys2raw("Error") == 254
 
 
+def test_signal_value_index_follows_add_values(some_signal):
+    some_signal.add_values(255, "Init")
+    assert some_signal.phys2raw("Init") == 255
+    some_signal.add_values(254, "Error")
+    some_signal.add_values(253, "Init")  # duplicate description, first one wins
+    assert some_signal.value_index == {"Init": 255, "Error": 254}
+    some_signal.values = {1: "One"}
+    assert some_signal.phys2raw("One") == 1
+
+
+def test_signal_convert_columns(some_signal):
+    some_signal.add_values(255, "Init")
+    some_signal.add_values(254, "Error")
+    assert some_signal.phys2raw_many(["Error", "Init", 3]) == [254, 255, some_signal.phys2raw(3)]
+    assert some_signal.raw2phys_many([254, 300], decode_to_str=True) == ["Error", 450]
+    assert some_signal.raw2phys_many([254]) == [some_signal.raw2phys(254)]
+
+
 def test_signal_encode_invalid_named_value(some_signal):
     with pytest.raises(decimal.InvalidOperation):
         some_signal.phys2raw("wrong")
@@ -973,6 +991,30 @@ def test_canmatrix_remove_frame(empty_matrix, empty_frame):
     assert len(empty_matrix.frames) == 1
 
 
+def test_canmatrix_frame_index_follows_changes(empty_matrix):
+    f1 = canmatrix.Frame(name="F1", arbitration_id=canmatrix.ArbitrationId(0x100))
+    f2 = canmatrix.Frame(name="F2", arbitration_id=canmatrix.ArbitrationId(0x100, extended=True))
+    empty_matrix.add_frame(f1)
+    empty_matrix.frames.append(f2)  # like the dbc loader
+    assert empty_matrix.frame_by_id(canmatrix.ArbitrationId(0x100)) is f1
+    assert empty_matrix.frame_by_id(canmatrix.ArbitrationId(0x100, extended=True)) is f2
+
+    f1.arbitration_id.id = 0x200  # like --changeFrameId
+    assert empty_matrix.frame_by_id(canmatrix.ArbitrationId(0x100)) is None
+    assert empty_matrix.frame_by_id(canmatrix.ArbitrationId(0x200)) is f1
+
+    f2.arbitration_id = canmatrix.ArbitrationId(0x18FEF100, extended=True)
+    assert empty_matrix.frame_by_pgn(0xFEF1) is f2
+
+    empty_matrix.rename_frame("F1", "F3")
+    assert empty_matrix.get_frame_by_name("F3") is f1
+    empty_matrix.del_frame("F3")
+    assert empty_matrix.frame_by_id(canmatrix.ArbitrationId(0x200)) is None
+    assert "F3" not in empty_matrix.frames_dict_name
+    empty_matrix.remove_frame(f2)
+    assert empty_matrix.frame_by_pgn(0xFEF1) is None
+
+
 def test_canmatrix_rename_ecu_by_name(empty_matrix):
     ecu = canmatrix.Ecu(name="old_name")
     empty_matrix.add_ecu(ecu)
@@ -1142,3 +1184,15 @@ def test_frame_compress():
     assert frame.signal_by_name("Sig2").start_bit == 12
     assert frame.signal_by_name("Sig3").start_bit == 21
     assert frame.signal_by_name("Sig4").start_bit == 26
+
+
+def test_canmatrix_get_frame_by_pgn_and_source(empty_matrix):
+    f1 = canmatrix.Frame(name="F1", arbitration_id=canmatrix.ArbitrationId(0x18EF1001, extended=True))
+    f2 = canmatrix.Frame(name="F2", arbitration_id=canmatrix.ArbitrationId(0x18EF2002, extended=True))
+    empty_matrix.add_frame(f1)
+    empty_matrix.add_frame(f2)
+    assert canmatrix.ArbitrationId.normalize_pgn(0xEF30) == canmatrix.ArbitrationId.from_pgn(0xEF30).pgn == 0xEF00
+    assert canmatrix.ArbitrationId.normalize_pgn(0x1FEF1) == canmatrix.ArbitrationId.from_pgn(0x1FEF1).pgn
+    assert empty_matrix.frame_by_pgn(0xEF30) is f1
+    assert empty_matrix.frame_by_pgn(0xEF30, source=0x02) is f2
+    assert empty_matrix.frame_by_pgn(0xEF00, source=0x03) is f1
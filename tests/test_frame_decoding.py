@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
+import collections
 import pytest
 import canmatrix.formats
 import os.path
 import textwrap
 import io
+import random
 
 from canmatrix.convert import convert_pdu_container_to_multiplexed
 
@@ -123,6 +125,31 @@ def test_decode_complex_multiplexed():
     assert "MAF_air_flow_rate" not in decoded
 
 
+def test_encode_complex_multiplexed():
+    dbc = io.BytesIO(textwrap.dedent(u'''\
+    BO_ 2024 OBD2: 8 Vector__XXX
+    SG_ ParameterID_Service01 m1M : 23|8@0+ (1,0) [0|0] "" Vector__XXX
+    SG_ Vehicle_speed m13 : 31|8@0+ (1,0) [0|0] "" Vector__XXX
+    SG_ service M : 11|4@0+ (1,0) [0|0] "" Vector__XXX
+    SG_ MAF_air_flow_rate m16 : 31|16@0+ (0.01,0) [0|0] "grams/sec" Vector__XXX
+
+    SG_MUL_VAL_ 2024 ParameterID_Service01 service 1-1;
+    SG_MUL_VAL_ 2024 Vehicle_speed ParameterID_Service01 13-13;
+    SG_MUL_VAL_ 2024 MAF_air_flow_rate ParameterID_Service01 16-20;
+    ''').encode('utf-8'))
+    frame = canmatrix.formats.dbc.load(dbc, dbcImportEncoding="utf8").frame_by_id(canmatrix.ArbitrationId(2024))
+
+    data = frame.encode({"service": 1, "ParameterID_Service01": 13, "Vehicle_speed": 0x55, "MAF_air_flow_rate": 0x1234})
+    decoded = frame.decode(data)
+    assert list(decoded) == ["service", "ParameterID_Service01", "Vehicle_speed"]
+    assert decoded["Vehicle_speed"].raw_value == 0x55
+
+    data = frame.encode({"service": 1, "ParameterID_Service01": 18, "Vehicle_speed": 0x55, "MAF_air_flow_rate": 0x1234})
+    decoded = frame.decode(data)
+    assert list(decoded) == ["service", "ParameterID_Service01", "MAF_air_flow_rate"]
+    assert decoded["MAF_air_flow_rate"].raw_value == 0x1234
+
+
 def test_decode_pdu_container():
     frame_id = canmatrix.ArbitrationId(id=10, extended=False)
     frame = canmatrix.Frame(
@@ -269,3 +296,381 @@ def test_decoding_between_multiplexed_and_container_pdu():
     decoded = new_frame.decode(data)
     assert decoded["s11"].raw_value == 125
     assert decoded["s12"].raw_value == 200
+
+
+def test_codec_matches_bitstring_decoding():
+    rand = random.Random(42)
+    frame = canmatrix.Frame(name="random", size=8)
+    for index in range(40):
+        size = rand.choice([1, 3, 7, 8, 12, 16, 32, 64])
+        is_float = size in [32, 64] and rand.random() < 0.3
+        frame.add_signal(canmatrix.Signal(
+            name="sig%d" % index,
+            start_bit=rand.randint(0, 64 - size),
+            size=size,
+            is_little_endian=rand.random() < 0.5,
+            is_signed=rand.random() < 0.5,
+            is_float=is_float,
+        ))
+    for _ in range(50):
+        data = bytearray(rand.getrandbits(8) for _ in range(8))
+        little, big = frame.bytes_to_bitstrings(data)
+        expected = frame.bitstring_to_signal_list(frame.signals, big, little, 64)
+        decoded = frame.unpack(data)
+        for signal, value in zip(frame.signals, expected):
+            if value != value:  # NaN
+                assert decoded[signal.name].raw_value != decoded[signal.name].raw_value
+            else:
+                assert decoded[signal.name].raw_value == value
+
+
+def test_codec_rebuilt_on_signal_change():
+    cm = load_dbc()
+    frame = cm.frame_by_id(canmatrix.ArbitrationId(2))
+    frame_data = bytearray([12, 0, 5, 112, 3, 0, 31, 131])
+    codec = frame.codec
+    assert frame.codec is codec
+    assert frame.decode(frame_data)["secSig12"].raw_value == 12
+
+    frame.signal_by_name("secSig12").start_bit += 1
+    assert frame.codec is not codec
+    assert frame.decode(frame_data)["secSig12"].raw_value == 6
+
+    frame.add_signal(canmatrix.Signal("newSig", start_bit=0, size=8, is_signed=False))
+    assert frame.decode(frame_data)["newSig"].raw_value == 12
+
+
+def test_decode_many_matches_decode():
+    numpy = pytest.importorskip("numpy")
+    cm = load_dbc()
+    rand = random.Random(1)
+    for frame_id in [1, 2, 3, 4]:
+        frame = cm.frame_by_id(canmatrix.ArbitrationId(frame_id))
+        rows = [bytearray(rand.getrandbits(8) for _ in range(frame.size)) for _ in range(20)]
+        decoded_many = frame.decode_many(numpy.array(rows, dtype=numpy.uint8))
+        physical_many = frame.decode_many(b"".join(b"\0" + row for row in rows), physical=True,
+                                          stride=frame.size + 1, offset=1)
+        for index, row in enumerate(rows):
+            decoded = frame.decode(row)
+            for signal in frame.signals:
+                values = decoded_many[signal.name]
+                if signal.name in decoded:
+                    assert values[index] == decoded[signal.name].raw_value or numpy.isnan(values[index])
+                    assert physical_many[signal.name][index] == pytest.approx(
+                        float(decoded[signal.name].phys_value), nan_ok=True)
+                else:
+                    assert values.mask[index]
+
+
+def test_encode_many_matches_encode():
+    numpy = pytest.importorskip("numpy")
+    cm = load_dbc()
+    rand = random.Random(2)
+    for frame_id in [1, 2, 3, 4]:
+        frame = cm.frame_by_id(canmatrix.ArbitrationId(frame_id))
+        rows = [frame.decode(bytearray(rand.getrandbits(8) for _ in range(frame.size))) for _ in range(20)]
+        rows = [{name: signal.raw_value for name, signal in row.items()} for row in rows]
+        columns = {signal.name: [row.get(signal.name, 0) for row in rows] for signal in frame.signals}
+        encoded = frame.encode_many(columns)
+        assert encoded.shape == (len(rows), frame.size)
+        for index, row in enumerate(rows):
+            assert bytes(encoded[index]) == bytes(frame.encode(row))
+
+    frame = cm.frame_by_id(canmatrix.ArbitrationId(2))
+    physical = {signal.name: [float(signal.raw2phys(3)), float(signal.raw2phys(1))] for signal in frame.signals}
+    encoded = frame.encode_many(physical, physical=True)
+    assert bytes(encoded[0]) == bytes(frame.encode({signal.name: 3 for signal in frame.signals}))
+    assert bytes(encoded[1]) == bytes(frame.encode({signal.name: 1 for signal in frame.signals}))
+
+
+def test_iter_decode_stream():
+    cm = load_dbc()
+    messages = [
+        (0.1, canmatrix.ArbitrationId(1), bytearray([141, 0, 16, 1, 0, 130, 1, 0])),
+        (0.2, 0x7FF, bytearray(8)),  # unknown
+        (0.3, 2, bytearray([12, 0, 5, 112, 3, 0, 31, 131])),
+        (0.4, 2, bytearray([12, 0, 5])),  # too short
+        (0.5, 4, bytearray([0x38, 0x63, 0x8A, 0x1E, 0x18, 0x20, 0x20])),
+    ]
+    decoded = list(cm.iter_decode(iter(messages)))
+    assert [message.timestamp for message in decoded] == [0.1, 0.3, 0.5]
+    assert decoded[0].signals["sig1"].raw_value == 35
+    assert decoded[1].frame.name == cm.frame_by_id(canmatrix.ArbitrationId(2)).name
+    assert "muxSig1" not in decoded[2].signals
+
+    decoded = list(cm.iter_decode(messages, unknown_id="yield", wrong_length="yield", signals=["secSig12"]))
+    assert [message.frame is None for message in decoded] == [False, True, False, False, False]
+    assert decoded[2].signals == {"secSig12": decoded[2].signals["secSig12"]}
+    assert decoded[3].signals is None
+
+    decoded = list(cm.iter_decode(messages, wrong_length="pad", frames=[decoded[2].frame.name]))
+    assert [message.timestamp for message in decoded] == [0.3, 0.4]
+    assert decoded[1].signals["secSig12"].raw_value == 12
+
+    with pytest.raises(canmatrix.DecodingUnknownId):
+        list(cm.iter_decode(messages, unknown_id="raise"))
+    with pytest.raises(canmatrix.DecodingFrameLength):
+        list(cm.iter_decode(messages, wrong_length="raise"))
+
+
+def test_iter_decode_batches():
+    cm = load_dbc()
+    messages = [
+        (0.1, 4, bytearray([0x38, 0x63, 0x8A, 0x7E, 0x00, 0x20, 0x00])),
+        (0.2, 4, bytearray([0x38, 0x63, 0x8A, 0x1E, 0x18, 0x20, 0x20])),
+        (0.3, 4, bytearray([0x38, 0x63, 0x8A, 0x1E, 0x18, 0x20, 0x20])),
+    ]
+    batches = list(cm.iter_decode_batches(messages, batch_size=2))
+    assert len(batches) == 2
+    columns = batches[0][cm.frame_by_id(canmatrix.ArbitrationId(4)).name]
+    assert columns["timestamp"] == [0.1, 0.2]
+    assert columns["myMuxer"] == [0, 1]
+    assert columns["muxSig1"] == [0x38, None]
+    assert columns["muxSig5"] == [None, -6]
+
+
+def test_decode_parallel_matches_iter_decode():
+    import canmatrix.parallel
+    from canmatrix.parallel import parse_candump_line
+
+    cm = load_dbc()
+    rand = random.Random(4)
+    messages = []
+    for index in range(500):
+        frame = rand.choice([frame for frame in cm.frames if not frame.is_pdu_container])
+        data = bytes(bytearray(rand.getrandbits(8) for _ in range(frame.size)))
+        messages.append((index * 0.01, frame.arbitration_id.to_compound_integer(), data))
+    messages.append((5.0, 0x7FF, bytes(8)))  # unknown id
+
+    expected = [
+        (message.timestamp, message.arbitration_id, message.frame.name,
+         {name: value.phys_value for name, value in message.signals.items()})
+        for message in cm.iter_decode(messages)
+    ]
+    decoded = list(canmatrix.parallel.decode_parallel(cm, messages, processes=2, chunk_size=64, physical=True))
+    assert decoded == expected
+
+    lines = ["({:.6f}) can0 {:03X}#{}\n".format(timestamp, can_id, data.hex().upper())
+             for timestamp, can_id, data in messages]
+    decoded = list(canmatrix.parallel.decode_parallel(
+        cm, lines, processes=2, chunk_size=64, parser=parse_candump_line, unknown_id="yield"))
+    assert [message[0] for message in decoded] == pytest.approx([message[0] for message in messages])
+    assert decoded[-1][2:] == (None, None)
+    assert parse_candump_line("(1.5) can0 12345678##1AABB") == (1.5, 0x92345678, b"\xAA\xBB")
+
+
+def test_decode_values_matches_decode():
+    cm = load_dbc()
+    rand = random.Random(7)
+    for frame in cm.frames:
+        if frame.is_pdu_container:
+            continue
+        for _ in range(20):
+            data = bytearray(rand.getrandbits(8) for _ in range(frame.size))
+            decoded = frame.decode(data)
+            assert frame.decode_values(data, "raw") == {name: value.raw_value for name, value in decoded.items()}
+            physical = frame.decode_values(data)
+            assert sorted(physical) == sorted(decoded)
+            for name, value in decoded.items():
+                assert physical[name] == pytest.approx(float(value.phys_value), nan_ok=True)
+            named = frame.decode_values(data, "named")
+            for name, value in decoded.items():
+                if isinstance(value.named_value, str):
+                    assert named[name] == value.named_value
+            values = frame.decode_values(data, "raw", as_tuple=True)
+            assert values == tuple(
+                decoded[signal.name].raw_value if signal.name in decoded else None for signal in frame.signals)
+
+    frame = cm.frame_by_id(canmatrix.ArbitrationId(1))
+    with pytest.raises(canmatrix.DecodingFrameLength):
+        frame.decode_values(bytearray(2))
+    signal = frame.signals[0]
+    signal.add_values(1, "one")
+    assert frame.decode_values(bytearray([141, 0, 16, 1, 0, 130, 1, 0]), "named")[signal.name] == "one"
+
+
+def test_float_scaling():
+    cm = load_dbc()
+    fast = canmatrix.formats.loadp_flat("tests/files/dbc/test_frame_decoding.dbc", float_scaling=True)
+    exported = io.BytesIO()
+    fast_exported = io.BytesIO()
+    canmatrix.formats.dump(cm, exported, "dbc")
+    canmatrix.formats.dump(fast, fast_exported, "dbc")
+    assert fast_exported.getvalue() == exported.getvalue()
+
+    rand = random.Random(8)
+    for frame in cm.frames:
+        if frame.is_pdu_container:
+            continue
+        fast_frame = fast.frame_by_name(frame.name)
+        for _ in range(20):
+            data = bytearray(rand.getrandbits(8) for _ in range(frame.size))
+            decoded = frame.decode(data)
+            fast_decoded = fast_frame.decode(data)
+            for name, value in decoded.items():
+                assert isinstance(fast_decoded[name].phys_value, float)
+                assert fast_decoded[name].phys_value == pytest.approx(float(value.phys_value), nan_ok=True)
+                assert fast_decoded[name].named_value == value.named_value or \
+                    fast_decoded[name].named_value == pytest.approx(float(value.named_value), nan_ok=True)
+            if not frame.is_complex_multiplexed:
+                physical = {name: value.phys_value for name, value in decoded.items()}
+                assert fast_frame.encode(physical) == frame.encode(physical)
+
+
+def test_decode_from_buffer(tmp_path):
+    import mmap
+
+    cm = load_dbc()
+    frame = cm.frame_by_id(canmatrix.ArbitrationId(4))
+    payloads = [
+        bytearray([0x38, 0x63, 0x8A, 0x7E, 0x00, 0x20, 0x00]),
+        bytearray([0x38, 0x63, 0x8A, 0x1E, 0x18, 0x20, 0x20]),
+    ]
+    trace = tmp_path / "trace.bin"
+    trace.write_bytes(b"\x00" + b"".join(bytes(payload) for payload in payloads))
+
+    with open(str(trace), "rb") as trace_file:
+        buffer = mmap.mmap(trace_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            messages = [(0.0, 4, (buffer, 1, 7)), (0.1, 4, (buffer, 8, 7))]
+            for message, payload in zip(cm.iter_decode(messages), payloads):
+                assert message.signals == frame.decode(payload)
+            assert frame.decode_values(buffer, offset=8, length=7) == frame.decode_values(payloads[1])
+            assert frame.decode(memoryview(buffer)[1:8]) == frame.decode(payloads[0])
+
+            truncated = frame.decode(buffer, offset=1, length=5, allow_truncated=True)
+            assert truncated == frame.decode(payloads[0][:5] + b"\xFF\xFF")
+            exceeded = frame.decode(buffer, offset=1, allow_exceeded=True)
+            assert exceeded == frame.decode(payloads[0])
+            with pytest.raises(canmatrix.DecodingFrameLength):
+                frame.decode(buffer, offset=1, length=5)
+        finally:
+            buffer.close()
+
+
+def test_decode_pdu_container_codec():
+    frame = canmatrix.Frame(name="container", size=16)
+    frame.add_signal(canmatrix.Signal(name="Header_ID", start_bit=0, size=24, is_little_endian=True))
+    frame.add_signal(canmatrix.Signal(name="Header_DLC", start_bit=24, size=8, is_little_endian=True))
+    pdu1 = canmatrix.Pdu(name="pdu1", id=0x123456, size=2)
+    pdu1.add_signal(canmatrix.Signal(name="s11", start_bit=0, size=12, is_little_endian=True))
+    pdu2 = canmatrix.Pdu(name="pdu2", id=0x10, size=3)
+    pdu2.add_signal(canmatrix.Signal(name="s21", start_bit=0, size=16, is_little_endian=False, is_signed=False))
+    frame.add_pdu(pdu1)
+    frame.add_pdu(pdu2)
+    payload = bytes([0x56, 0x34, 0x12, 2, 0x21, 0x03, 0x10, 0, 0, 3, 0xAB, 0xCD, 0xEF, 0, 0, 0])
+    expected = {
+        "pdus": [{"pdu1": {"s11": 0x321}}, {"pdu2": {"s21": 0xABCD}}],
+        "Header_ID": [0x123456, 0x10],
+        "Header_DLC": [2, 3],
+    }
+
+    def raw(decoded):
+        return {
+            "pdus": [{name: {s: v.raw_value for s, v in values.items()} for name, values in pdu.items()}
+                     for pdu in decoded["pdus"]],
+            "Header_ID": [v.raw_value for v in decoded["Header_ID"]],
+            "Header_DLC": [v.raw_value for v in decoded["Header_DLC"]],
+        }
+
+    assert raw(frame.decode(payload)) == expected
+    # decoded at an offset in a larger buffer
+    assert raw(frame.decode(memoryview(b"\x00" * 5 + payload + b"\x00"), offset=5, length=16)) == expected
+
+    # codec follows changes of the PDUs
+    pdu2.id = 0x11
+    decoded = frame.decode(payload)
+    assert decoded["pdus"][1] is None
+
+
+@pytest.mark.parametrize("little_endian, header_sizes", [(False, (24, 8)), (True, (24, 8)), (False, (32, 32))])
+def test_encode_pdu_container(little_endian, header_sizes):
+    frame = canmatrix.Frame(name="container", size=24)
+    frame.add_signal(canmatrix.Signal(
+        name="Header_ID", start_bit=0, size=header_sizes[0], is_little_endian=little_endian, is_signed=False))
+    frame.add_signal(canmatrix.Signal(
+        name="Header_DLC", start_bit=header_sizes[0], size=header_sizes[1], is_little_endian=little_endian,
+        is_signed=False))
+    pdu1 = canmatrix.Pdu(name="pdu1", id=0x1234, size=2)
+    pdu1.add_signal(canmatrix.Signal(name="s11", start_bit=0, size=12, is_little_endian=True, is_signed=False))
+    pdu1.add_signal(canmatrix.Signal(name="s12", start_bit=12, size=4, is_little_endian=True, is_signed=False,
+                                     values={3: "three"}))
+    pdu2 = canmatrix.Pdu(name="pdu2", id=0x10, size=3)
+    pdu2.add_signal(canmatrix.Signal(name="s21", start_bit=0, size=16, is_little_endian=False, is_signed=False))
+    frame.add_pdu(pdu1)
+    frame.add_pdu(pdu2)
+
+    encoded = frame.encode({"pdu2": {"s21": 0xABCD}, "pdu1": {"s11": 0x321, "s12": "three"}})
+    assert len(encoded) == frame.size
+    decoded = frame.decode(encoded)
+    assert decoded["pdus"][0]["pdu2"]["s21"].raw_value == 0xABCD
+    assert decoded["pdus"][1]["pdu1"]["s11"].raw_value == 0x321
+    assert decoded["pdus"][1]["pdu1"]["s12"].raw_value == 3
+    assert [signal.raw_value for signal in decoded["Header_DLC"]][:2] == [3, 2]
+
+    buffer = bytearray(b"\xAA" * (2 * frame.size))
+    frame.encode_into(buffer, [("pdu2", {"s21": 0xABCD}), ("pdu1", {"s11": 0x321, "s12": 3})], offset=frame.size)
+    assert buffer[:frame.size] == b"\xAA" * frame.size
+    assert buffer[frame.size:] == encoded
+
+    with pytest.raises(canmatrix.EncodingConatainerPdu):
+        frame.encode({"unknown": {}})
+    with pytest.raises(canmatrix.EncodingConatainerPdu):
+        frame.encode([("pdu2", {})] * 5)
+
+
+def test_encode_values_range_policies():
+    frame = canmatrix.Frame(name="frame", size=2)
+    frame.add_signal(canmatrix.Signal(
+        name="temperature", start_bit=0, size=8, is_signed=False, factor=0.5, offset=-40, min=-40, max=60))
+    frame.add_signal(canmatrix.Signal(
+        name="state", start_bit=8, size=4, is_signed=False, values={1: "On", 2: "Off"}))
+
+    encoded = frame.encode_values({"temperature": 20, "state": "Off"})
+    assert encoded == frame.encode({"temperature": frame.signal_by_name("temperature").phys2raw(20), "state": 2})
+    assert frame.decode_values(encoded, mode="named") == {"temperature": 20, "state": "Off"}
+
+    violations = collections.Counter()
+    encoded = frame.encode_values({"temperature": 100, "state": 1}, violations=violations)
+    assert frame.decode_values(encoded)["temperature"] == 60
+    assert violations == {"temperature": 1}
+    encoded = frame.encode_values({"temperature": 70, "state": 20}, range_policy="count", violations=violations)
+    assert frame.decode_values(encoded, mode="raw") == {"temperature": 220, "state": 4}
+    assert violations == {"temperature": 2, "state": 1}
+    assert frame.encode_values({"temperature": -50}, range_policy="ignore") == frame.encode({"temperature": -20})
+    with pytest.raises(canmatrix.EncodingValueOutOfRange):
+        frame.encode_values({"temperature": -41}, range_policy="raise")
+    assert frame.encode_values({"temperature": 160}, mode="raw") == frame.encode({"temperature": 160})
+
+
+def test_compile_codecs_cache(tmp_path, monkeypatch):
+    import canmatrix.cache
+
+    monkeypatch.setenv("CANMATRIX_CACHE_DIR", str(tmp_path))
+    cm = load_dbc()
+    assert load_dbc().fingerprint() == cm.fingerprint()
+    assert cm.compile_codecs(source="test_frame_decoding.dbc") is False
+    assert len(canmatrix.cache.entries("codecs-")) == 1
+
+    loaded = load_dbc()
+    assert loaded.compile_codecs(source="test_frame_decoding.dbc") is True
+    rand = random.Random(9)
+    for frame in loaded.frames:
+        if frame.is_pdu_container:
+            continue
+        assert frame._codec is not None
+        original = cm.frame_by_name(frame.name)
+        for _ in range(20):
+            data = bytearray(rand.getrandbits(8) for _ in range(frame.size))
+            assert frame.decode_values(data, "raw") == original.decode_values(data, "raw")
+
+    # a changed database replaces the entry of the same source
+    changed = load_dbc()
+    changed.frames[0].signals[0].factor = 2
+    assert changed.fingerprint() != cm.fingerprint()
+    assert changed.compile_codecs(source="test_frame_decoding.dbc") is False
+    assert len(canmatrix.cache.entries("codecs-")) == 1
+    assert cm.compile_codecs(source="other.dbc") is False
+    assert len(canmatrix.cache.entries("codecs-")) == 2
+    cm.compile_codecs(max_entries=1)
+    assert len(canmatrix.cache.entries("codecs-")) == 1
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import io
+import random
 # import os.path
 import textwrap
 
@@ -204,3 +205,28 @@ def test_sym():
             print(h(encoded))
             print(h(expected))
             assert encoded == expected
+
+
+def test_codec_matches_bitstring_encoding():
+    rand = random.Random(42)
+    frame = canmatrix.Frame(name="random", size=8)
+    for index in range(20):
+        size = rand.choice([1, 3, 7, 8, 12, 16, 32, 64])
+        frame.add_signal(canmatrix.Signal(
+            name="sig%d" % index,
+            start_bit=rand.randint(0, 64 - size),
+            size=size,
+            is_little_endian=rand.random() < 0.5,
+            is_signed=rand.random() < 0.5,
+            is_float=size in [32, 64] and rand.random() < 0.3,
+        ))
+    for _ in range(50):
+        data = {}
+        for signal in frame.signals:
+            if rand.random() < 0.7:
+                if signal.is_float:
+                    data[signal.name] = rand.uniform(-1000, 1000)
+                else:
+                    data[signal.name] = rand.randint(-(1 << (signal.size - 1)), (1 << signal.size) - 1)
+        assert frame.signals_to_bytes(data) == frame._signals_to_bytes_bitstring(data)
+
@@ -65,4 +65,70 @@ def test_j1939_decoder():
     for arb_id, (asc_data, expected) in test_frames.items():
         (type, signals) = t.decode(canmatrix.ArbitrationId(id=arb_id, extended=True),
                                    bytearray.fromhex(asc_data), matrix)
-        assert expected in type
\ No newline at end of file
+        assert expected in type
+
+def test_j1939_transport_sessions():
+    reassembler = canmatrix.j1939_decoder.TransportReassembler(timeout=1.0, max_sessions=2)
+
+    def process(can_id, data, timestamp):
+        return reassembler.process(canmatrix.ArbitrationId(id=can_id, extended=True), bytearray(data), timestamp)
+
+    # interleaved BAM of two sources
+    assert process(0x18ECFF01, [0x20, 9, 0, 2, 0xff, 0x20, 0xff, 0], 0.0)[0] == canmatrix.j1939_decoder.BAM
+    assert process(0x18ECFF02, [0x20, 8, 0, 2, 0xff, 0x21, 0xff, 0], 0.0)[0] == canmatrix.j1939_decoder.BAM
+    assert process(0x18EBFF01, [1, 1, 2, 3, 4, 5, 6, 7], 0.1)[0] == canmatrix.j1939_decoder.DATA
+    assert process(0x18EBFF02, [1, 11, 12, 13, 14, 15, 16, 17], 0.1)[0] == canmatrix.j1939_decoder.DATA
+    event, session = process(0x18EBFF01, [2, 8, 9, 0xff, 0xff, 0xff, 0xff, 0xff], 0.2)
+    assert event == canmatrix.j1939_decoder.COMPLETE
+    assert session.pgn == 0xFF20
+    assert bytes(session.payload) == bytes(range(1, 10))
+    event, session = process(0x18EBFF02, [2, 18, 0xff, 0xff, 0xff, 0xff, 0xff, 0xff], 0.2)
+    assert event == canmatrix.j1939_decoder.COMPLETE
+    assert bytes(session.payload) == bytes(range(11, 19))
+    assert not reassembler.sessions
+
+    # RTS/CTS, packets are placed by sequence number
+    assert process(0x18EC1003, [0x10, 10, 0, 2, 0xff, 0x00, 0xef, 0], 1.0)[0] == canmatrix.j1939_decoder.RTS
+    assert process(0x18EC0310, [0x11, 2, 1, 0xff, 0xff, 0x00, 0xef, 0], 1.0)[0] == canmatrix.j1939_decoder.CTS
+    assert process(0x18EB1003, [2, 8, 9, 10, 0xff, 0xff, 0xff, 0xff], 1.1)[0] == canmatrix.j1939_decoder.DATA
+    event, session = process(0x18EB1003, [1, 1, 2, 3, 4, 5, 6, 7], 1.1)
+    assert event == canmatrix.j1939_decoder.COMPLETE
+    assert bytes(session.payload) == bytes(range(1, 11))
+
+    # timeout and session limit
+    process(0x18ECFF04, [0x20, 9, 0, 2, 0xff, 0x20, 0xff, 0], 2.0)
+    assert process(0x18EBFF04, [1, 1, 2, 3, 4, 5, 6, 7], 3.5)[0] is None
+    for source in (5, 6, 7):
+        process(0x18ECFF00 | source, [0x20, 9, 0, 2, 0xff, 0x20, 0xff, 0], 4.0)
+    assert sorted(key[0] for key in reassembler.sessions) == [6, 7]
+
+
+def test_j1939_decoder_transported_frame():
+    t = canmatrix.j1939_decoder.j1939_decoder()
+    # EEC1 (PGN 0xF004) sent by BAM
+    t.decode(canmatrix.ArbitrationId(id=0x18ECFF00, extended=True),
+             bytearray([0x20, 8, 0, 2, 0xff, 0x04, 0xf0, 0]), timestamp=0.0)
+    t.decode(canmatrix.ArbitrationId(id=0x18EBFF00, extended=True),
+             bytearray.fromhex("01F4DEDE3028FFF0"), timestamp=0.0)
+    (type, signals) = t.decode(canmatrix.ArbitrationId(id=0x18EBFF00, extended=True),
+                               bytearray.fromhex("02FFFFFFFFFFFFFF"), timestamp=0.0)
+    assert "BAM last data" in type
+    expected = t.j1939_db.frame_by_pgn(0xF004).decode(bytearray.fromhex("F4DEDE3028FFF0FF"))
+    assert {name: value.raw_value for name, value in signals.items()} == \
+        {name: value.raw_value for name, value in expected.items()}
+
+
+def test_j1939_db_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("CANMATRIX_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(canmatrix.j1939_decoder, "_j1939_db", None)
+    parsed = canmatrix.j1939_decoder.load_j1939_db()
+    assert canmatrix.j1939_decoder.j1939_decoder.j1939_db is parsed
+    assert len(list(tmp_path.iterdir())) == 1
+
+    monkeypatch.setattr(canmatrix.j1939_decoder, "_j1939_db", None)
+    cached = canmatrix.j1939_decoder.load_j1939_db()
+    assert cached is not parsed
+    assert [frame.name for frame in cached] == [frame.name for frame in parsed]
+    data = bytearray.fromhex("F4DEDE3028FFF0FF")
+    assert {name: value.raw_value for name, value in cached.frame_by_pgn(0xF004).decode(data).items()} == \
+        {name: value.raw_value for name, value in parsed.frame_by_pgn(0xF004).decode(data).items()}
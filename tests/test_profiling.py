@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import canmatrix.formats
+import canmatrix.profiling
+
+
+def load_dbc():
+    return canmatrix.formats.loadp_flat("tests/files/dbc/test_frame_decoding.dbc")
+
+
+def test_profiling_counters():
+    cm = load_dbc()
+    decode = canmatrix.Frame.decode
+    reports = []
+    profiler = canmatrix.profiling.enable(callback=reports.append, interval=3600)
+    try:
+        messages = [
+            (0.1, 1, bytearray([141, 0, 16, 1, 0, 130, 1, 0])),
+            (0.2, 0x7FF, bytearray(8)),  # unknown
+            (0.3, 2, bytearray([12, 0, 5])),  # too short
+            (0.4, 4, bytearray([0x38, 0x63, 0x8A, 0x1E, 0x18, 0x20, 0x20])),
+            (0.5, 4, bytearray([0x38, 0x63, 0x8A, 0x1E, 0x18, 0x20, 0x40])),  # no signal for this mux value
+        ]
+        assert len(list(cm.iter_decode(messages))) == 3
+        frame = cm.frame_by_id(canmatrix.ArbitrationId(1))
+        frame.encode({"sig0": 1})
+        with pytest.raises(canmatrix.DecodingFrameLength):
+            frame.decode(bytearray(3))
+        snapshot = canmatrix.profiling.snapshot()
+    finally:
+        assert canmatrix.profiling.disable() is profiler
+    assert canmatrix.Frame.decode is decode
+    assert canmatrix.profiling.snapshot() == {}
+
+    frames = snapshot["frames"]
+    assert frames["testFrame1"]["decode_count"] == 1
+    assert frames["testFrame1"]["encode_count"] == 1
+    assert frames["testFrame1"]["errors"] == {"DecodingFrameLength": 1}
+    assert frames["testFrame1"]["lengths"] == {8: 1, 3: 1}
+    assert frames["testFrame2"]["errors"] == {"DecodingFrameLength": 1}
+    assert frames["muxTestFrame"]["decode_count"] == 2
+    assert frames["muxTestFrame"]["errors"] == {"mux_miss": 1}
+    assert frames["muxTestFrame"]["decode_time"] > 0
+    assert snapshot["unknown_ids"] == {0x7FF: 1}
+    # callback is called on the first record, then every interval
+    assert len(reports) == 1
+
+    profiler.report()
+    assert reports[-1] == snapshot